@@ -176,6 +176,10 @@ def config_mem(options, system):
 
     if options.pim_baremetal or options.pim_se:
         from pim import PIM
+        if options.pim_placement == "channel" and \
+            (opt_tlm_memory or opt_external_memory_system):
+            from m5.util import fatal
+            fatal("PIM channel placement requires gem5 memory controllers")
         subsystem = PIM.build_pim_mem_subsystem(options, system)
         xbar = subsystem.xbar
     else:
@@ -283,14 +287,15 @@ def config_mem(options, system):
     subsystem.mem_ctrls = mem_ctrls
 
     # Connect the controllers to the membus
+    if options.pim_baremetal or options.pim_se:
+        PIM.connect_pim_mem_ctrls(options, subsystem, xbar)
+        return
+
     for i in range(len(subsystem.mem_ctrls)):
-        if options.pim_baremetal or options.pim_se:
-            subsystem.mem_ctrls[i].port = xbar.master
+        if opt_mem_type == "HMC_2500_1x32":
+            subsystem.mem_ctrls[i].port = xbar[i/4].master
+            # Set memory device size. There is an independent controller
+            # for each vault. All vaults are same size.
+            subsystem.mem_ctrls[i].device_size = options.hmc_dev_vault_size
         else:
-            if opt_mem_type == "HMC_2500_1x32":
-                subsystem.mem_ctrls[i].port = xbar[i/4].master
-                # Set memory device size. There is an independent controller
-                # for each vault. All vaults are same size.
-                subsystem.mem_ctrls[i].device_size = options.hmc_dev_vault_size
-            else:
-                subsystem.mem_ctrls[i].port = xbar.master
+            subsystem.mem_ctrls[i].port = xbar.master
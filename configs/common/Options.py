@@ -294,6 +294,10 @@ def addCommonOptions(parser):
     parser.add_option("--restore-simpoint-checkpoint", action="store_true",
         help="restore from a simpoint checkpoint taken with " +
              "--take-simpoint-checkpoints")
+    parser.add_option("--fork-samples", action="store", type="int",
+        help="instead of taking the checkpoints of " +
+             "--take-simpoint-checkpoints, fork a simulator at every " +
+             "simpoint that runs it with --cpu-type, <N> at a time")
 
     # Checkpointing options
     ###Note that performing checkpointing via python script files will override
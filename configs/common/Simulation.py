@@ -42,7 +42,9 @@
 from __future__ import print_function
 from __future__ import absolute_import
 
+import os
 import sys
+import traceback
 from os import getcwd
 from os.path import join as joinpath
 
@@ -82,7 +84,7 @@ def setCPUClass(options):
         if options.restore_with_cpu != options.cpu_type:
             CPUClass = TmpClass
             TmpClass, test_mem_mode = getCPUClass(options.restore_with_cpu)
-    elif options.fast_forward:
+    elif options.fast_forward or options.fork_samples:
         CPUClass = TmpClass
         TmpClass = AtomicSimpleCPU
         test_mem_mode = 'atomic'
@@ -391,6 +393,142 @@ def takeSimpointCheckpoints(simpoints, interval_length, cptdir):
     print("%d checkpoints taken" % num_checkpoints)
     sys.exit(code)
 
+def parseLastDump(filename):
+    """Returns the stats of the last dump of a stats file as a dict."""
+    dump = {}
+    for line in open(filename):
+        if line.startswith("---------- Begin Simulation Statistics"):
+            dump = {}
+            continue
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        try:
+            dump[fields[0]] = float(fields[1])
+        except ValueError:
+            pass
+    return dump
+
+def runSimpointSample(testsys, switch_cpu_list, warmup_length,
+                      interval_length):
+    """Runs a simpoint in a forked simulator with the detailed cpus and
+       returns the exit code of the simulator."""
+    m5.switchCpus(testsys, switch_cpu_list, verbose=False)
+    cpu = switch_cpu_list[0][1]
+
+    if warmup_length:
+        cpu.scheduleInstStop(0, warmup_length, "simpoint warmup done")
+        exit_event = m5.simulate()
+        if exit_event.getCause() != "simpoint warmup done":
+            print('Exiting @ tick %i because %s' %
+                  (m5.curTick(), exit_event.getCause()))
+            return 1
+        print("Warmed up! Dumping and resetting stats!")
+        m5.stats.dump()
+
+    # The child carries the stats of the fast-forward, the sample starts
+    # from clean stats as if it was restored from a checkpoint
+    m5.stats.reset()
+
+    cpu.scheduleInstStop(0, interval_length, "simpoint sample done")
+    exit_event = m5.simulate()
+    print('Exiting @ tick %i because %s' %
+          (m5.curTick(), exit_event.getCause()))
+    if exit_event.getCause() != "simpoint sample done":
+        return 1
+    return exit_event.getCode()
+
+def forkSimpointSamples(options, testsys, switch_cpu_list, simpoints,
+                        interval_length):
+    """Fast forwards to every simpoint and forks a simulator that runs it.
+
+       At most options.fork_samples forked simulators run at the same
+       time. Every one writes its stats to the sample_<N> subdirectory of
+       the output directory, and their weighted average is written to
+       simpoint_stats.txt once all simpoints are done.
+    """
+    m5.disableAllListeners()
+
+    samples = {}
+    running = {}
+    failed = []
+
+    def wait():
+        pid, status = os.wait()
+        index = running.pop(pid)
+        if status:
+            failed.append(index)
+            print("Sample #%d failed" % index)
+        else:
+            print("Sample #%d done" % index)
+
+    last_start_inst_count = -1
+    exit_cause = "simpoint starting point found"
+    code = 0
+    for index, simpoint in enumerate(simpoints):
+        interval, weight, starting_inst_count, actual_warmup_length = simpoint
+        if starting_inst_count != last_start_inst_count:
+            exit_event = m5.simulate()
+
+            # skip checkpoint instructions should they exist
+            while exit_event.getCause() == "checkpoint":
+                print("Found 'checkpoint' exit event...ignoring...")
+                exit_event = m5.simulate()
+
+            exit_cause = exit_event.getCause()
+            code = exit_event.getCode()
+            if exit_cause != "simpoint starting point found":
+                break
+        last_start_inst_count = starting_inst_count
+
+        while len(running) >= options.fork_samples:
+            wait()
+
+        outdir = joinpath(m5.options.outdir, "sample_%02d" % index)
+        pid = m5.fork(outdir.replace("%", "%%"))
+        if pid == 0:
+            # The forked simulator must never get back into this loop, not
+            # even on an exception. The stats of the sample are dumped when
+            # it exits.
+            try:
+                code = runSimpointSample(testsys, switch_cpu_list,
+                                         actual_warmup_length,
+                                         interval_length)
+            except:
+                traceback.print_exc()
+                os._exit(1)
+            sys.exit(code)
+        print("Sample #%d forked. start inst:%d weight:%f" %
+              (index, starting_inst_count, weight))
+        samples[index] = (outdir, weight)
+        running[pid] = index
+
+    while running:
+        wait()
+
+    # Weighted average of the stats of the samples
+    totals = {}
+    weights = {}
+    for index, (outdir, weight) in sorted(samples.items()):
+        if index in failed:
+            continue
+        for name, value in parseLastDump(joinpath(outdir, "stats.txt")).\
+                items():
+            if value != value:
+                continue
+            totals[name] = totals.get(name, 0.0) + weight * value
+            weights[name] = weights.get(name, 0.0) + weight
+
+    stats_file = open(joinpath(m5.options.outdir, "simpoint_stats.txt"), "w")
+    for name in sorted(totals):
+        print("%-50s %20.6f" % (name, totals[name] / weights[name]),
+              file=stats_file)
+    stats_file.close()
+
+    print('Exiting @ tick %i because %s' % (m5.curTick(), exit_cause))
+    print("%d samples run, %d failed" % (len(samples), len(failed)))
+    sys.exit(code or int(bool(failed)))
+
 def restoreSimpointCheckpoint():
     exit_event = m5.simulate()
     exit_cause = exit_event.getCause()
@@ -450,6 +588,12 @@ def run(options, root, testsys, cpu_class):
     if options.repeat_switch and options.take_checkpoints:
         fatal("Can't specify both --repeat-switch and --take-checkpoints")
 
+    if options.fork_samples != None and options.fork_samples < 1:
+        fatal("--fork-samples must be at least 1")
+
+    if options.fork_samples and options.take_simpoint_checkpoints == None:
+        fatal("--fork-samples requires --take-simpoint-checkpoints")
+
     np = options.num_cpus
     switch_cpus = None
 
@@ -611,16 +755,20 @@ def run(options, root, testsys, cpu_class):
 
     if hasattr(options, "pim_se") and \
         options.pim_se and options.checkpoint_restore == None:
-        # Map SPM address range to SE PIM
-        root.pim_system.cpu.workload[0].map(
-            long(root.pim_system.spm.range.start),
-            long(root.pim_system.spm.range.start),
-            long(root.pim_system.spm.range.size()),
-            False)
-        # Map all system address range to SE PIM
-        for r in testsys.mem_ranges:
-            root.pim_system.cpu.workload[0].map(long(r.start), long(r.start),
-                                                long(r.size()), False)
+        spm = root.pim_system.spm
+        window_size = long(spm.range.size()) / spm.num_windows
+        for i, cpu in enumerate(root.pim_system.cpu):
+            # Map the SPM window of the PIM CPU to the SPM start address,
+            # so that every kernel instance sees its own registers
+            cpu.workload[0].map(
+                long(spm.range.start),
+                long(spm.range.start) + (i % spm.num_windows) * window_size,
+                window_size,
+                False)
+            # Map all system address range to SE PIM
+            for r in testsys.mem_ranges:
+                cpu.workload[0].map(long(r.start), long(r.start),
+                                    long(r.size()), False)
 
     # Initialization is complete.  If we're not in control of simulation
     # (that is, if we're a slave simulator acting as a component in another
@@ -664,7 +812,11 @@ def run(options, root, testsys, cpu_class):
         fatal("Bad maxtick (%d) specified: " \
               "Checkpoint starts starts from tick: %d", maxtick, cpt_starttick)
 
-    if options.standard_switch or cpu_class:
+    if options.fork_samples:
+        # The cpus are switched in the forked simulators
+        if not cpu_class:
+            fatal("--fork-samples requires a cpu to switch to")
+    elif options.standard_switch or cpu_class:
         if options.standard_switch:
             print("Switch at instruction count:%s" %
                     str(testsys.cpu[0].max_insts_any_thread))
@@ -715,7 +867,11 @@ def run(options, root, testsys, cpu_class):
 
     # Take SimPoint checkpoints
     elif options.take_simpoint_checkpoints != None:
-        takeSimpointCheckpoints(simpoints, interval_length, cptdir)
+        if options.fork_samples:
+            forkSimpointSamples(options, testsys, switch_cpu_list, simpoints,
+                                interval_length)
+        else:
+            takeSimpointCheckpoints(simpoints, interval_length, cptdir)
 
     # Restore from SimPoint checkpoints
     elif options.restore_simpoint_checkpoint != None:
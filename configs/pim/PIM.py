@@ -18,6 +18,21 @@ def define_options(parser):
     parser.add_option("--pim-se", action="store_true",
                       help="Build PIM system in SE mode system")
 
+    parser.add_option("--pim-num-cpus", action="store", type="int",
+                      default=1,
+                      help="Number of PIM CPUs, every CPU runs its own "
+                           "instance of the PIM kernel")
+    parser.add_option("--pim-cpus-per-channel", action="store", type="int",
+                      default=None,
+                      help="Number of PIM CPUs per memory channel, "
+                           "overrides --pim-num-cpus")
+    parser.add_option("--pim-spm-shared", action="store_true",
+                      help="Let all PIM CPUs share one SPM and its "
+                           "registers instead of giving every CPU its own "
+                           "SPM window of --pim-spm-size (not supported "
+                           "with several PIM CPUs yet, as the PIM kernel "
+                           "does not arbitrate the shared registers)")
+
     parser.add_option("--pim-cpu-clock", action="store", type="string",
                       default=params.CPU_CLK,
                       help = "Clock for blocks running at PIM CPU speed")
@@ -29,6 +44,13 @@ def define_options(parser):
                       default=params.L1_DCACHE_SIZE,
                       help = "PIM L1 d-cache size")
 
+    parser.add_option("--pim-placement", type="choice", default="shared",
+                      choices=["shared", "channel"],
+                      help="Attach PIM to the host memory through the "
+                           "shared memsubsystem crossbar, or through one "
+                           "crossbar and bridge per memory channel so that "
+                           "PIM accesses bypass the memsubsystem crossbar")
+
     parser.add_option("--pim-bandwidth-ratio", action="store",
                       type="int",
                       default=params.BANDWIDTH_RATIO,
@@ -46,13 +68,35 @@ def define_options(parser):
     parser.add_option("--pim-spm-reg-flush-size", action="store", type="long",
                       default=None,
                       help="Specify the SPM flush size reg address for PIM")
+    parser.add_option("--pim-spm-flush-ring-addr", action="store",
+                      type="long", default=None,
+                      help="Specify the SPM flush descriptor ring address "
+                           "for PIM, enables the batched cache flush")
+    parser.add_option("--pim-spm-flush-ring-entries", action="store",
+                      type="int", default=64,
+                      help="Number of descriptors in the SPM flush ring")
+    parser.add_option("--pim-spm-reg-flush-ring-count", action="store",
+                      type="long", default=None,
+                      help="Specify the SPM flush ring count reg address "
+                           "for PIM")
+    parser.add_option("--pim-spm-reg-cmd-addr", action="store", type="long",
+                      default=None,
+                      help="Specify the SPM command reg address for PIM, "
+                           "enables the per command profiling of the PIM "
+                           "kernel")
+    parser.add_option("--pim-cmd-trace", action="store", type="string",
+                      default=None,
+                      help="Write a binary per command trace of the PIM "
+                           "kernel to this file in the output directory")
 
     parser.add_option("--pim-se-mem-start", action="store", type="long",
                       default=None,
                       help="Specify the SE memory start address for PIM")
     parser.add_option("--pim-se-mem-size", action="store", type="string",
                       default=None,
-                      help="Specify the SE memory size for PIM")
+                      help="Specify the SE memory size of every PIM CPU, "
+                           "the SE memory holds one such region per PIM "
+                           "CPU")
 
     parser.add_option("--pim-kernel", action="store", type="string",
                       default=None,
@@ -63,10 +107,12 @@ def define_options(parser):
                       help="Read stdin from a file")
     parser.add_option("--pim-se-output", action="store", type="string",
                       default=params.SE_OUTPUT,
-                      help="Redirect stdout to a file")
+                      help="Redirect stdout to a file, suffixed with "
+                           ".cpu<N> for every PIM CPU if there are several")
     parser.add_option("--pim-se-errout", action="store", type="string",
                       default=params.SE_ERROUT,
-                      help="Redirect stderr to a file")
+                      help="Redirect stderr to a file, suffixed with "
+                           ".cpu<N> for every PIM CPU if there are several")
 
 ##
 ## PIM Related Class
@@ -82,6 +128,14 @@ class PIMBus(NoncoherentXBar):
     badaddr_responder = BadAddr(warn_access = "warn")
     default = Self.badaddr_responder.pio
 
+class PIMChannelXBar(NoncoherentXBar):
+    ideal = True
+
+    frontend_latency = params.BUS_FRONTEND_LATENCY_IDEAL
+    forward_latency = params.BUS_FORWARD_LATENCY_IDEAL
+    response_latency = params.BUS_RESPONSE_LATENCY_IDEAL
+    width = params.BUS_WIDTH_IDEAL
+
 class PIMBridge(Bridge):
     ideal = True
 
@@ -109,6 +163,40 @@ class PIMSESystem(System):
 ##
 ## PIM Function
 ##
+def get_pim_num_cpus(options):
+    if options.pim_cpus_per_channel is not None:
+        return options.pim_cpus_per_channel * options.mem_channels
+    return options.pim_num_cpus
+
+##
+## The SPM holds one window of --pim-spm-size per PIM CPU, or a single
+## window shared by all PIM CPUs with --pim-spm-shared
+##
+def get_pim_spm_windows(options):
+    if options.pim_spm_shared:
+        return 1
+    return get_pim_num_cpus(options)
+
+def get_pim_spm_size(options):
+    return convert.toMemorySize(options.pim_spm_size) * \
+        get_pim_spm_windows(options)
+
+##
+## The processes of all PIM CPUs allocate their pages from the one SE memory,
+## which holds --pim-se-mem-size per PIM CPU
+##
+def get_pim_se_mem_size(options):
+    return convert.toMemorySize(options.pim_se_mem_size) * \
+        get_pim_num_cpus(options)
+
+##
+## Every PIM CPU writes its own stdout and stderr file if there are several
+##
+def get_pim_se_file(name, cpu, num_cpus):
+    if num_cpus == 1 or name in ('cout', 'stdout', 'cerr', 'stderr'):
+        return name
+    return "%s.cpu%d" % (name, cpu)
+
 def build_pim_mem_subsystem(options, sys):
     if not hasattr(sys, 'membus'):
         fatal("Host system doesn't has attribute 'membus'")
@@ -119,7 +207,7 @@ def build_pim_mem_subsystem(options, sys):
                                      delay = params.BRIDGE_MEMSUBSYSTEM_DELAY)
     sys.memsubsystem.bridge.ranges = sys.mem_ranges
     sys.memsubsystem.bridge.ranges.append(
-        AddrRange(options.pim_spm_start, size = options.pim_spm_size))
+        AddrRange(options.pim_spm_start, size = get_pim_spm_size(options)))
 
     sys.memsubsystem.xbar_clk_domain = SrcClockDomain(clock = '0.1GHz',
                                        voltage_domain = VoltageDomain())
@@ -140,6 +228,25 @@ def build_pim_mem_subsystem(options, sys):
 
     return sys.memsubsystem
 
+##
+## With --pim-placement=channel every memory controller sits behind its own
+## crossbar, which merges the host requests from the memsubsystem crossbar
+## with the PIM requests from the bridge of that channel
+##
+def connect_pim_mem_ctrls(options, subsystem, xbar):
+    if options.pim_placement != "channel":
+        for mem_ctrl in subsystem.mem_ctrls:
+            mem_ctrl.port = xbar.master
+        return
+
+    subsystem.channel_xbars = [PIMChannelXBar()
+                               for mem_ctrl in subsystem.mem_ctrls]
+
+    for mem_ctrl, channel_xbar in zip(subsystem.mem_ctrls,
+                                      subsystem.channel_xbars):
+        xbar.master = channel_xbar.slave
+        channel_xbar.master = mem_ctrl.port
+
 def build_pim_system(options):
     (CPUClass, MemMode, FutureClass) = Simulation.setCPUClass(options)
 
@@ -159,6 +266,16 @@ def build_pim_system(options):
     if options.pim_spm_reg_flush_size is None:
         fatal("SPM flush size reg is not set")
 
+    # PIM CPU check
+    num_cpus = get_pim_num_cpus(options)
+    if num_cpus < 1:
+        fatal("Number of PIM CPUs must be positive")
+    if options.pim_baremetal and num_cpus > 1:
+        fatal("Multiple PIM CPUs are only supported in SE mode")
+    if options.pim_spm_shared and num_cpus > 1:
+        fatal("Multiple PIM CPUs cannot share the SPM registers, every "
+              "PIM kernel would run every command")
+
     # PIM SE memory check
     if options.pim_se and options.pim_se_mem_size is None:
         fatal("SE memory size is not set")
@@ -204,8 +321,7 @@ def build_pim_system(options):
 
         spm_start = options.pim_spm_start
         if spm_start is None:
-            spm_start = se_mem_start + \
-                convert.toMemorySize(options.pim_se_mem_size)
+            spm_start = se_mem_start + get_pim_se_mem_size(options)
         #print(type(spm_start))
         #print(type(se_mem_start))
         #print(type(convert.toMemorySize(options.pim_se_mem_size)))
@@ -213,16 +329,17 @@ def build_pim_system(options):
         if spm_start <= se_mem_start:
             fatal("The starting address of SPM needs to be larger than the "
                   "starting address of SE memory")
-        elif spm_start < se_mem_start + \
-            convert.toMemorySize(options.pim_se_mem_size):
+        elif spm_start < se_mem_start + get_pim_se_mem_size(options):
             fatal("The starting address of SPM cannot overlap with the SE "
                   "memory range")
 
         self.mem_ranges = [AddrRange(se_mem_start,
-                                     size = options.pim_se_mem_size)]
+                                     size = get_pim_se_mem_size(options))]
 
         self.spm = ScratchpadMemory(range = AddrRange(spm_start, size = \
-                                                      options.pim_spm_size))
+                                                get_pim_spm_size(options)),
+                                    num_windows = \
+                                        get_pim_spm_windows(options))
         #print('spm: ' + str(AddrRange(spm_start, size = options.pim_spm_size))
         self.spm.in_addr_map = False
         self.spm.conf_table_reported = False
@@ -252,32 +369,52 @@ def build_pim_system(options):
                                          voltage_domain =
                                          self.cpu_voltage_domain)
 
-    self.cpu = CPUClass(clk_domain = self.cpu_clk_domain, cpu_id = 0,
-                        numThreads = 1)
+    self.cpu = [CPUClass(clk_domain = self.cpu_clk_domain, cpu_id = i,
+                         numThreads = 1) for i in xrange(num_cpus)]
 
-    self.cpu.createThreads()
+    for cpu in self.cpu:
+        cpu.createThreads()
 
-    self.cpu.createInterruptController()
+        cpu.createInterruptController()
 
-    self.cpu.connectAllPorts(self.pimbus)
+        cpu.connectAllPorts(self.pimbus)
 
     self.spm.support_flush = True
     self.spm.reg_flush_addr = options.pim_spm_reg_flush_addr
     self.spm.reg_flush_size = options.pim_spm_reg_flush_size
 
+    if options.pim_spm_flush_ring_addr is not None:
+        if options.pim_spm_reg_flush_ring_count is None:
+            fatal("SPM flush ring count reg is not set")
+        self.spm.flush_ring_addr = options.pim_spm_flush_ring_addr
+        self.spm.flush_ring_entries = options.pim_spm_flush_ring_entries
+        self.spm.reg_flush_ring_count = options.pim_spm_reg_flush_ring_count
+
+    if options.pim_spm_reg_cmd_addr is not None:
+        self.spm.profile_cmds = True
+        self.spm.reg_cmd_addr = options.pim_spm_reg_cmd_addr
+        self.spm.pim_cpus = self.cpu
+        if options.pim_cmd_trace is not None:
+            self.spm.cmd_trace_file = options.pim_cmd_trace
+    elif options.pim_cmd_trace is not None:
+        fatal("PIM command trace requires the SPM command reg address")
+
     if options.pim_baremetal:
         self.kernel = options.pim_kernel
     if options.pim_se:
-        process = Process(cmd = [options.pim_kernel])
+        for i, cpu in enumerate(self.cpu):
+            process = Process(cmd = [options.pim_kernel], pid = 100 + i)
 
-        if options.pim_se_input != None:
-            process.input = options.pim_se_input
-        if options.pim_se_output != None:
-            process.output = options.pim_se_output
-        if options.pim_se_errout != None:
-            process.errout = options.pim_se_errout
+            if options.pim_se_input != None:
+                process.input = options.pim_se_input
+            if options.pim_se_output != None:
+                process.output = get_pim_se_file(options.pim_se_output, i,
+                                                 num_cpus)
+            if options.pim_se_errout != None:
+                process.errout = get_pim_se_file(options.pim_se_errout, i,
+                                                 num_cpus)
 
-        self.cpu.workload = [process]
+            cpu.workload = [process]
 
     return self
 
@@ -295,10 +432,25 @@ def connect_to_host_system(options, sys, pim_sys):
         fatal("PIM system doesn't has attribute 'pimbus'")
 
     sys.memsubsystem.topimbridge = PIMBridge(ranges = [pim_sys.spm.range])
-    pim_sys.tohostbridge = PIMBridge(ranges = sys.mem_ranges)
 
     sys.memsubsystem.xbar.master = sys.memsubsystem.topimbridge.slave
     sys.memsubsystem.topimbridge.master = pim_sys.pimbus.slave
 
-    pim_sys.pimbus.master = pim_sys.tohostbridge.slave
-    pim_sys.tohostbridge.master = sys.memsubsystem.xbar.slave
+    if options.pim_placement == "channel":
+        if not hasattr(sys.memsubsystem, 'channel_xbars'):
+            fatal("Host mem subsystem doesn't has attribute 'channel_xbars'")
+
+        # One bridge per channel, covering the (interleaved) range of the
+        # memory controller of that channel
+        pim_sys.tohostbridge = [PIMBridge(ranges = [mem_ctrl.range])
+                                for mem_ctrl in sys.memsubsystem.mem_ctrls]
+
+        for bridge, channel_xbar in zip(pim_sys.tohostbridge,
+                                        sys.memsubsystem.channel_xbars):
+            pim_sys.pimbus.master = bridge.slave
+            bridge.master = channel_xbar.slave
+    else:
+        pim_sys.tohostbridge = PIMBridge(ranges = sys.mem_ranges)
+
+        pim_sys.pimbus.master = pim_sys.tohostbridge.slave
+        pim_sys.tohostbridge.master = sys.memsubsystem.xbar.slave
@@ -16,6 +16,7 @@ void init_reg(void)
 {
     REG_FLUSH_ADDR = 0;
     REG_FLUSH_SIZE = 0;
+    REG_FLUSH_RING_COUNT = 0;
     REG_CMD = COMMAND_UNINIT;
     REG_0 = 0;
     REG_1 = 0;
@@ -55,6 +56,7 @@ void kernel_vfs_search_dcache(void)
     const uint64_t hashlen = REG_2;
     volatile const unsigned char *str = (const unsigned char *)REG_3;
     volatile struct dentry_lookup *dentry = NULL;
+    uint32_t flush_count = 0;
 
     for (;
          node && ({node = (struct hlist_bl_node *)virt_to_phys(node);
@@ -75,8 +77,10 @@ void kernel_vfs_search_dcache(void)
 
         volatile const unsigned char *dentry_name = (const unsigned char *)
             virt_to_phys(dentry->d_name.name);
-        clflush((uint64_t)dentry_name, hashlen_len(hashlen));
-        clflush((uint64_t)str, hashlen_len(hashlen));
+        clflush_queue(&flush_count, (uint64_t)dentry_name,
+                      hashlen_len(hashlen));
+        clflush_queue(&flush_count, (uint64_t)str, hashlen_len(hashlen));
+        clflush_commit(&flush_count);
         if (dentry_string_cmp(dentry_name, str, hashlen_len(hashlen)) != 0)
             continue;
 
@@ -89,30 +93,56 @@ void kernel_vfs_search_dcache(void)
     REG_0 = 0;
 }
 
+/**
+ * Pages of a user buffer that are translated and flushed together before
+ * they are copied (at most FILE_COPY_BATCH pages, to keep the stack small)
+ */
+#define FILE_COPY_BATCH 16
+
+struct page_copy {
+    uint64_t dst_phys_addr;
+    uint64_t src_phys_addr;
+    uint16_t size;
+};
+
 void kernel_nova_file_r(void)
 {
     pgdval_t pgdval = REG_0;
     uint64_t dst_virt_addr = REG_1;
     uint64_t src_phys_addr = REG_2;
     uint64_t size = REG_3;
+    struct page_copy copies[FILE_COPY_BATCH];
+    uint32_t flush_count = 0;
 
     while (size) {
-        uint16_t round_max = PAGE_SIZE - (dst_virt_addr & ~PAGE_MASK);
-        uint16_t round_size;
-        uint64_t dst_phys_addr = user_virt_to_phys(pgdval, dst_virt_addr,
-                                                   clflush);
-
-        if (size <= round_max)
-            round_size = size;
-        else
-            round_size = round_max;
-        size -= round_size;
-
-        clflush(dst_phys_addr, round_size);
-        memcpy_v((void *)dst_phys_addr, (void *)src_phys_addr, round_size);
-
-        dst_virt_addr += round_size;
-        src_phys_addr += round_size;
+        int n, i;
+
+        for (n = 0; size && n < FILE_COPY_BATCH; n++) {
+            uint16_t round_max = PAGE_SIZE - (dst_virt_addr & ~PAGE_MASK);
+            uint16_t round_size;
+            uint64_t dst_phys_addr = user_virt_to_phys(pgdval, dst_virt_addr,
+                                                       clflush);
+
+            if (size <= round_max)
+                round_size = size;
+            else
+                round_size = round_max;
+            size -= round_size;
+
+            clflush_queue(&flush_count, dst_phys_addr, round_size);
+            copies[n].dst_phys_addr = dst_phys_addr;
+            copies[n].src_phys_addr = src_phys_addr;
+            copies[n].size = round_size;
+
+            dst_virt_addr += round_size;
+            src_phys_addr += round_size;
+        }
+
+        clflush_commit(&flush_count);
+
+        for (i = 0; i < n; i++)
+            memcpy_v((void *)copies[i].dst_phys_addr,
+                     (void *)copies[i].src_phys_addr, copies[i].size);
     }
 }
 
@@ -122,24 +152,38 @@ void kernel_nova_file_w(void)
     uint64_t dst_phys_addr = REG_1;
     uint64_t src_virt_addr = REG_2;
     uint64_t size = REG_3;
+    struct page_copy copies[FILE_COPY_BATCH];
+    uint32_t flush_count = 0;
 
     while (size) {
-        uint16_t round_max = PAGE_SIZE - (src_virt_addr & ~PAGE_MASK);
-        uint16_t round_size;
-        uint64_t src_phys_addr = user_virt_to_phys(pgdval, src_virt_addr,
-                                                   clflush);
-
-        if (size <= round_max)
-            round_size = size;
-        else
-            round_size = round_max;
-        size -= round_size;
-
-        clflush(src_phys_addr, round_size);
-        memcpy_v((void *)dst_phys_addr, (void *)src_phys_addr, round_size);
-
-        dst_phys_addr += round_size;
-        src_virt_addr += round_size;
+        int n, i;
+
+        for (n = 0; size && n < FILE_COPY_BATCH; n++) {
+            uint16_t round_max = PAGE_SIZE - (src_virt_addr & ~PAGE_MASK);
+            uint16_t round_size;
+            uint64_t src_phys_addr = user_virt_to_phys(pgdval, src_virt_addr,
+                                                       clflush);
+
+            if (size <= round_max)
+                round_size = size;
+            else
+                round_size = round_max;
+            size -= round_size;
+
+            clflush_queue(&flush_count, src_phys_addr, round_size);
+            copies[n].dst_phys_addr = dst_phys_addr;
+            copies[n].src_phys_addr = src_phys_addr;
+            copies[n].size = round_size;
+
+            dst_phys_addr += round_size;
+            src_virt_addr += round_size;
+        }
+
+        clflush_commit(&flush_count);
+
+        for (i = 0; i < n; i++)
+            memcpy_v((void *)copies[i].dst_phys_addr,
+                     (void *)copies[i].src_phys_addr, copies[i].size);
     }
 }
 
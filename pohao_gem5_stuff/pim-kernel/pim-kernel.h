@@ -30,6 +30,32 @@ static inline void clflush(uint64_t addr, uint32_t size)
     REG_FLUSH_SIZE = size;
 }
 
+/**
+ * Batched flush: clflush_queue() adds a range to the flush ring and
+ * clflush_commit() flushes all queued ranges at once. A full ring is
+ * committed before queueing. The number of queued ranges is kept by the
+ * caller (in a local, so that the kernel needs no .bss that would not fit
+ * the PIM memory).
+ */
+static inline void clflush_commit(uint32_t *count)
+{
+    if (*count) {
+        REG_FLUSH_RING_COUNT = *count;
+        *count = 0;
+    }
+}
+
+static inline void clflush_queue(uint32_t *count, uint64_t addr,
+                                 uint32_t size)
+{
+    if (*count == FLUSH_RING_ENTRIES)
+        clflush_commit(count);
+
+    FLUSH_RING[*count].addr = addr;
+    FLUSH_RING[*count].size = size;
+    (*count)++;
+}
+
 /**
  * Input:
  *     REG 0: root physical address
@@ -14,4 +14,17 @@
 #define REG_2          *((volatile uint64_t *)0x45000001d)
 #define REG_3          *((volatile uint64_t *)0x450000025)
 
+/**
+ * Flush descriptor ring (must match the flush ring params of the SPM)
+ */
+struct flush_desc {
+    uint64_t addr;
+    uint32_t size;
+    uint32_t reserved;
+};
+
+#define REG_FLUSH_RING_COUNT *((volatile uint32_t *)0x450000030)
+#define FLUSH_RING           ((volatile struct flush_desc *)0x450000040)
+#define FLUSH_RING_ENTRIES   64
+
 #endif /* __REGS_H__ */
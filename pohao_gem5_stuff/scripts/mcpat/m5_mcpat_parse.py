@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python2
 
 """
 SYNOPSIS
@@ -90,52 +90,42 @@ class Component:
         self.power_xml_filter = False
         self.translated_statistics_order = []
 
-    def formXml(self, parent_node, doc):
-        new_component = doc.createElement("component")
-        parent_node.appendChild(new_component)
-        new_component.setAttribute("id", self.id)
-        new_component.setAttribute("name", self.name)
+    def formXml(self, writer):
+        writer.startElement("component", id = self.id, name = self.name)
 
         # Add params settings
         for param_key in self.params:
-            new_param = doc.createElement("param")
-            new_param.setAttribute("name", param_key)
-            new_param.setAttribute("value", self.params[param_key])
-            new_component.appendChild(new_param)
+            writer.element("param", name = param_key,
+                           value = self.params[param_key])
 
         # Add statistics
         for stat_key in self.statistics:
-            new_stat = doc.createElement("stat")
-            new_stat.setAttribute("name", stat_key)
-            new_stat.setAttribute("value", self.statistics[stat_key])
-            new_component.appendChild(new_stat)
+            writer.element("stat", name = stat_key,
+                           value = self.statistics[stat_key])
 
         # Add architectural stats for this level
         for child in self.children:
-            child.formXml(new_component, doc)
+            child.formXml(writer)
 
-    def formXmlPower(self, parent_node, doc, options):
+        writer.endElement()
+
+    def formXmlPower(self, writer, options):
         if self.power_xml_filter == True:
             return
 
-        new_component = doc.createElement("component")
-        parent_node.appendChild(new_component)
-        new_component.setAttribute("id", self.id if self.re_id == None else self.re_id)
-        new_component.setAttribute("name", self.name if self.re_name == None else self.re_name)
+        writer.startElement("component",
+            id = self.id if self.re_id == None else self.re_id,
+            name = self.name if self.re_name == None else self.re_name)
 
         # Add params settings
         for param_key in self.translated_params_order:
-            new_param = doc.createElement("param")
-            new_param.setAttribute("name", param_key)
-            new_param.setAttribute("value", self.translated_params[param_key])
-            new_component.appendChild(new_param)
+            writer.element("param", name = param_key,
+                           value = self.translated_params[param_key])
 
         # Add statistics
         for stat_key in self.translated_statistics_order:
-            new_stat = doc.createElement("stat")
-            new_stat.setAttribute("name", stat_key)
-            new_stat.setAttribute("value", self.translated_statistics[stat_key])
-            new_component.appendChild(new_stat)
+            writer.element("stat", name = stat_key,
+                           value = self.translated_statistics[stat_key])
 
         # Update child & re-order children for xml output for system
         if self.name == options.system_name:
@@ -170,7 +160,9 @@ class Component:
             self.children = new_children
 
         for child in self.children:
-            child.formXmlPower(new_component, doc, options)
+            child.formXmlPower(writer, options)
+
+        writer.endElement()
 
     ## checkToFilter() is responsible for seeing the current component should
     ## be filtered from the power xml file
@@ -208,6 +200,54 @@ class Component:
             self.re_name = self.name.replace(options.l1_cache_cpu_name, "core")
             self.re_id = self.id.replace(options.l1_cache_cpu_name, "core")
 
+##
+## class XmlWriter writes an xml document element by element straight to a
+## file. Its output is the same as xml.dom.minidom's toprettyxml(), so the
+## whole document never has to be built in memory: attributes are sorted by
+## name, children are indented by a tab and elements without children are
+## closed with "/>".
+##
+class XmlWriter:
+    INDENT = "\t"
+
+    def __init__(self, f):
+        self.f = f
+        self.open_tags = []
+        self.start_pending = False # the last start tag is not closed yet
+        f.write('<?xml version="1.0" ?>\n')
+
+    @staticmethod
+    def escape(data):
+        # minidom writes nothing for an empty (or zero) value
+        if not data:
+            return ""
+        return str(data).replace("&", "&amp;").replace("<", "&lt;"). \
+                         replace("\"", "&quot;").replace(">", "&gt;")
+
+    def startElement(self, tag, **attrs):
+        if self.start_pending:
+            self.f.write(">\n")
+
+        self.f.write("%s<%s" % (XmlWriter.INDENT * len(self.open_tags), tag))
+        for name in sorted(attrs):
+            self.f.write(" %s=\"%s\"" % (name, XmlWriter.escape(attrs[name])))
+
+        self.open_tags.append(tag)
+        self.start_pending = True
+
+    def endElement(self):
+        tag = self.open_tags.pop()
+        if self.start_pending:
+            self.f.write("/>\n")
+            self.start_pending = False
+        else:
+            self.f.write("%s</%s>\n" % (XmlWriter.INDENT * len(self.open_tags),
+                                        tag))
+
+    def element(self, tag, **attrs):
+        self.startElement(tag, **attrs)
+        self.endElement()
+
 ##
 ## class Translator is used for finding and adding params and stats
 ## to the xml. Define a translator for each unique component in your system
@@ -947,7 +987,7 @@ def tryGrabComponentStat(component, stat, conversion = "int"):
 ## This code is the least generic and will likely needed to be changed by new
 ## users. If there is a bug, it probably in this function ... X_X
 ##
-def generateCalcStats(cht, sht, options):
+def generateCalcStats(cht, options):
     fastest_clock = None
 
     num_cores = 0
@@ -1261,20 +1301,19 @@ def generateCalcStats(cht, sht, options):
     cht[options.system_name].params["homogeneous_L1Directories"] = homogeneous_L1Directories
     cht[options.system_name].params["homogeneous_L2Directories"] = homogeneous_L2Directories
     cht[options.system_name].params["homogeneous_nocs"] = homogeneous_nocs
-    cht[options.system_name].statistics["total_cycles"] = str(int(sht["%s.sim_ticks" % options.system_name]) / int(fastest_clock))
+    cht[options.system_name].statistics["total_cycles"] = str(int(cht[options.system_name].statistics["sim_ticks"]) / int(fastest_clock))
 
 ##
 ## Function - createComponentTree
 ## createComponentTree() does the following:
 ## * Creates a tree of components by looking at the config.ini parameter
 ##   children for each component
-## * Stats are added to each component as appropriate
 ## * Missing stats are generated
 ## * Component translator is set
 ## * The translator grabs all relevant stats and params for the component and
 ##   renames from M5 names to McPat names
 ##
-def createComponentTree(cht, sht, options):
+def createComponentTree(cht, options):
     # Create a component tree by looking at the children parameter
     for key in cht:
         component = cht[key]
@@ -1292,33 +1331,6 @@ def createComponentTree(cht, sht, options):
 
                 component.children.append(cht[child_id])
 
-    # Add all statistics to right component
-    for key in sht:
-        stat_val = sht[key]
-        temp = key.split('.')
-        num_fields = len(temp)
-        prefix_id = None
-
-        # Find the longest prefix that matches a component id
-        for x in xrange(num_fields, 0, -1):
-            prefix_id = genId(temp[0:x])
-            if cht.has_key(prefix_id):
-                break
-
-        # Add the statistic to the right component
-        stat_id = genId(temp[x:num_fields])
-        if len(stat_id) < 1:
-            panic("parsed invalid stat %s" % key)
-
-        # For all those stats that don't have a component, add it to root
-        # component
-        if not cht.has_key(prefix_id):
-            prefix_id = "root"
-            stat_id = genId(temp)
-
-        component = cht[prefix_id]
-        component.statistics[stat_id] = stat_val
-
     # Filter out unwanted component info in power.xml
     for key in cht:
         cur_component = cht[key]
@@ -1326,7 +1338,7 @@ def createComponentTree(cht, sht, options):
         cur_component.checkToRenameReid(options)
 
     # Generate calculated statistics
-    generateCalcStats(cht, sht, options)
+    generateCalcStats(cht, options)
 
     # Set component types
     for id in cht:
@@ -1343,14 +1355,9 @@ def createComponentTree(cht, sht, options):
 ## form for power.xml
 ##
 def genComponentXml(root_component, out_path, options):
-    import xml.dom.minidom
-    doc = xml.dom.minidom.Document()
-
-    root_component.formXml(doc, doc)
-
     print("Writing %s..." % out_path)
     f = open(out_path, 'w')
-    f.write(doc.toprettyxml())
+    root_component.formXml(XmlWriter(f))
     f.close()
 
 ##
@@ -1359,37 +1366,82 @@ def genComponentXml(root_component, out_path, options):
 ## McPat
 ##
 def genPowerXml(root_component, out_path, options):
-    import xml.dom.minidom
-    doc = xml.dom.minidom.Document()
-
-    root_component.formXmlPower(doc, doc, options)
-
     print("Writing %s..." % out_path)
     f = open(out_path, 'w')
-    f.write(doc.toprettyxml())
+    root_component.formXmlPower(XmlWriter(f), options)
     f.close()
 
 ##
-## Function - parseSystemConfig
-## parseSystemConfig() is repsonsible for creating a component dictionary,
-## a statisitic dictionary, and then using this two structures to build a an
-## internal tree of component objects that contain fields with their parameters
-## and statistics.
-## @stats_filepath string to the stats filepath
-## @config_filepath string to the config.ini filepath
-## @summary_filepath path to put the summary.xml file that is the intermediate
-##                   of the power.xml file
-## @power_filepath path to put the power.xml file
-## @options
+## class ComponentTrie is a prefix trie over the component ids of config.ini.
+## It resolves a stat key to the component that owns it with a single walk
+## over the dotted fields of the key, instead of probing every prefix.
+## Resolutions are memoized, so every dump after the first one only costs a
+## dict lookup per stat.
 ##
-def parseSystemConfig(stats_filepath, config_filepath, summary_filepath,
-                      power_filepath, options):
-    # cht dictionary that contains all component keys and their associated objects
+class ComponentTrie:
+    COMPONENT_ID = None # key under which a trie node stores its component id
+
+    def __init__(self, cht):
+        self.root = {}
+        self.resolved = {}
+        for comp_id in cht:
+            self.insert(comp_id)
+
+    def insert(self, comp_id):
+        node = self.root
+        for field in comp_id.split('.'):
+            node = node.setdefault(field, {})
+        node[ComponentTrie.COMPONENT_ID] = comp_id
+
+    ##
+    ## resolve(key) returns the (component id, stat id) pair for the longest
+    ## component id that prefixes key. Stats without a component go to root.
+    ##
+    def resolve(self, key):
+        try:
+            return self.resolved[key]
+        except KeyError:
+            pass
+
+        fields = key.split('.')
+        num_fields = len(fields)
+        comp_id = None
+        depth = 0
+
+        node = self.root
+        for x in xrange(num_fields):
+            node = node.get(fields[x])
+            if node is None:
+                break
+            if node.has_key(ComponentTrie.COMPONENT_ID):
+                comp_id = node[ComponentTrie.COMPONENT_ID]
+                depth = x + 1
+
+        if comp_id == None:
+            res = ("root", key)
+        elif depth == num_fields:
+            panic("parsed invalid stat %s" % key)
+        else:
+            res = (comp_id, genId(fields[depth:num_fields]))
+
+        self.resolved[key] = res
+        return res
+
+# <stat name> <value> at the beginning of a stats.txt line
+STAT_LINE_RE = re.compile(r"([\w\.:]+)\s+([\w\.]+)\s")
+
+# Lines that enclose every dump in a stats file
+DUMP_BEGIN = "---------- Begin Simulation Statistics ----------"
+DUMP_END = "---------- End Simulation Statistics   ----------"
+
+##
+## Function - parseComponents
+## parseComponents() reads config.ini and returns the component dictionary
+## that maps every component id to its Component object.
+##
+def parseComponents(config_filepath):
     cht = {}
-    # sht dictionary that contains all stat keys and their associated stat objects
-    sht = {}
 
-    # Parse the configuration file & add all the components to the dictionary
     curr_component = None # current component
     params = {} # params set for the current config
     cf = open(config_filepath, 'r')
@@ -1417,23 +1469,138 @@ def parseSystemConfig(stats_filepath, config_filepath, summary_filepath,
                           curr_component))
     cf.close()
 
-    # Parse the stats file & add all the statistics to the dictionary
-    sf = open(stats_filepath, 'r')
+    return cht
+
+##
+## Function - indexDumps
+## indexDumps() scans the stats file once and returns the file offset of the
+## begin line of every dump in it.
+##
+def indexDumps(stats_filepath):
+    offsets = []
+    offset = 0
+
+    sf = open(stats_filepath, 'rb')
     for line in sf:
-        match = re.match(("(%s[\w\.:]*)\s+([\w\.]+)\s+" % options.system_name),
-                         line)
-        if match:
-            sht[match.group(1)] = match.group(2)
-            continue
+        if line.startswith(DUMP_BEGIN):
+            offsets.append(offset)
+        offset += len(line)
+    sf.close()
+
+    return offsets
+
+##
+## Function - parseDumps
+## parseDumps() turns a comma separated list of dump numbers and ranges (e.g.
+## "0,2-5") into a set of dump numbers. It raises ValueError for an illegal
+## or reversed range, so that the option can be checked before the stats file
+## is read.
+##
+def parseDumps(dumps_option):
+    selected = set()
+    for field in dumps_option.split(','):
+        try:
+            if '-' in field:
+                first, last = field.split('-', 1)
+                first, last = int(first), int(last)
+            else:
+                first = last = int(field)
+        except ValueError:
+            raise ValueError("illegal dump selection %s" % field)
+        if first > last:
+            raise ValueError("reversed dump range %s" % field)
+        selected.update(xrange(first, last + 1))
+
+    return selected
+
+##
+## Function - selectDumps
+## selectDumps() turns the --dumps option, "all" or a comma separated list of
+## dump numbers and ranges (e.g. "0,2-5"), into a sorted list of dump numbers.
+##
+def selectDumps(dumps_option, num_dumps):
+    if dumps_option == "all":
+        return range(num_dumps)
 
-        match = re.match(r"^(?!pim_system)([\w\.:]*)\s+([\w\.]+)\s+", line)
-        if match:
-            sht[options.system_name + "." + match.group(1)] = match.group(2)
+    try:
+        selected = parseDumps(dumps_option)
+    except ValueError, e:
+        panic(str(e))
+
+    for dump in selected:
+        if dump < 0 or dump >= num_dumps:
+            panic("dump %d does not exist, the stats file has %d dumps" %
+                  (dump, num_dumps))
+
+    return sorted(selected)
+
+##
+## Function - streamStats
+## streamStats() is a generator over the (stat key, value) pairs of a stats
+## file. It reads one line at a time, so memory does not grow with the size of
+## the file. Stats of the pim_system are skipped and stats outside of the
+## system (e.g. sim_ticks) are prefixed with the system name.
+## @dump_offset if given, only the dump that begins at this offset is read
+##
+def streamStats(stats_filepath, options, dump_offset = None):
+    system_name = options.system_name
+    system_prefix = system_name + "."
+    match_line = STAT_LINE_RE.match
+
+    sf = open(stats_filepath, 'rb')
+    if dump_offset != None:
+        sf.seek(dump_offset)
+        sf.readline()
+
+    for line in sf:
+        if dump_offset != None and (line.startswith(DUMP_END) or
+                                    line.startswith(DUMP_BEGIN)):
+            break
+
+        match = match_line(line)
+        if not match:
             continue
+
+        key = match.group(1)
+        if key.startswith(system_name):
+            yield (key, match.group(2))
+        elif not key.startswith("pim_system"):
+            yield (system_prefix + key, match.group(2))
     sf.close()
 
+##
+## Function - parseStats
+## parseStats() streams the stats file, or one dump of it, and adds every
+## statistic straight to the component that owns it.
+##
+def parseStats(stats_filepath, cht, trie, options, dump_offset = None):
+    for key, value in streamStats(stats_filepath, options, dump_offset):
+        comp_id, stat_id = trie.resolve(key)
+        cht[comp_id].statistics[stat_id] = value
+
+##
+## Function - parseSystemConfig
+## parseSystemConfig() is repsonsible for creating a component dictionary,
+## adding the statistics of the stats file to their components, and then
+## using this structure to build an internal tree of component objects that
+## contain fields with their parameters and statistics.
+## @stats_filepath string to the stats filepath
+## @config_filepath string to the config.ini filepath
+## @summary_filepath path to put the summary.xml file that is the intermediate
+##                   of the power.xml file
+## @power_filepath path to put the power.xml file
+## @options
+##
+def parseSystemConfig(stats_filepath, config_filepath, summary_filepath,
+                      power_filepath, options):
+    # cht dictionary that contains all component keys and their associated objects
+    cht = parseComponents(config_filepath)
+
+    # Parse the stats file & add all the statistics to their components
+    parseStats(stats_filepath, cht, ComponentTrie(cht), options)
+
     # Put all the components into a tree
-    createComponentTree(cht, sht, options)
+    createComponentTree(cht, options)
 
     # Generate the intermediate xml summary.xml
     genComponentXml(cht['root'], summary_filepath, options)
@@ -1441,6 +1608,36 @@ def parseSystemConfig(stats_filepath, config_filepath, summary_filepath,
     # Generate the McPat power.xml
     genPowerXml(cht['root'], power_filepath, options)
 
+##
+## Function - parseSystemConfigDumps
+## parseSystemConfigDumps() is the per dump version of parseSystemConfig(). The
+## dump boundaries of the stats file are indexed once, then each selected dump
+## is read on its own and gets its own summary.xml and power.xml.
+## @filepath_format format string with a dump number and a file suffix that
+##                  gives the output paths of every dump
+##
+def parseSystemConfigDumps(stats_filepath, config_filepath, filepath_format,
+                           options):
+    offsets = indexDumps(stats_filepath)
+    if not offsets:
+        panic("no dumps found in stats file %s" % stats_filepath)
+
+    trie = None
+    for dump in selectDumps(options.dumps, len(offsets)):
+        # The component tree is modified while generating the xml, so every
+        # dump starts from a freshly parsed configuration
+        cht = parseComponents(config_filepath)
+        if trie == None:
+            trie = ComponentTrie(cht)
+
+        print("Processing dump %d ..." % dump)
+        parseStats(stats_filepath, cht, trie, options, offsets[dump])
+        createComponentTree(cht, options)
+        genComponentXml(cht['root'], filepath_format %
+                        (dump, options.summary_file_suffix), options)
+        genPowerXml(cht['root'], filepath_format %
+                    (dump, options.power_file_suffix), options)
+
 ##
 ## Funtion - run
 ## run() is repsonsible for creating paths to all important files, and calling
@@ -1465,8 +1662,14 @@ def run(options):
 
     print("Processing stats file %s with config file %s ..." %
           (stats_filepath, config_filepath))
-    parseSystemConfig(stats_filepath, config_filepath, summary_filepath,
-                      power_filepath, options)
+    if options.dumps:
+        filepath_format = os.path.join(STATS_FILE_DIR, STATS_FILE_BASENAME +
+                                                       "_dump%d_%s")
+        parseSystemConfigDumps(stats_filepath, config_filepath,
+                               filepath_format, options)
+    else:
+        parseSystemConfig(stats_filepath, config_filepath, summary_filepath,
+                          power_filepath, options)
 
 def main(options):
     run(options)
@@ -1521,9 +1724,23 @@ if __name__ == '__main__':
                           action = 'store',
                           default = 'power.xml',
                           help = "the suffix of the power output file name")
+        parser.add_option('-d', '--dumps',
+                          action = 'store',
+                          default = None,
+                          help = """generate one summary and power file per
+                                    stats dump instead of merging all dumps,
+                                    either for "all" dumps or for a comma
+                                    separated list of dump numbers and ranges
+                                    counted from 0 (e.g. "0,2-5")""")
 
         (options, args) = parser.parse_args()
 
+        if options.dumps and options.dumps != "all":
+            try:
+                parseDumps(options.dumps)
+            except ValueError, e:
+                parser.error(str(e))
+
         main(options)
 
     # Ctrl-C
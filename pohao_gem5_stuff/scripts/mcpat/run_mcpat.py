@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+
+"""
+SYNOPSIS
+
+    run_mcpat.py [-h] [-j JOBS] [...] result_dir [result_dir ...]
+
+DESCRIPTION
+
+    run_mcpat.py drives the whole McPAT flow for a tree of gem5 result
+    directories. Every directory below result_dir that holds a stats file and
+    a config.ini is a run:
+
+    1. m5_mcpat_parse.py generates the power.xml of every run (or of every
+       dump of every run with --dumps), skipping runs whose power.xml is
+       newer than their stats and config files.
+    2. McPAT is run over a process pool, once per distinct power.xml. Results
+       are cached under --cache_dir by a hash of the normalized power.xml and
+       the McPAT flags, so identical configurations are never run twice, not
+       even across invocations.
+    3. The McPAT output of every power.xml is written next to it with the
+       _mcpat suffix (like gen_power.sh does), and the processor totals of all
+       runs are collected into one CSV or JSON table.
+"""
+
+import sys
+import os
+import argparse
+import hashlib
+import json
+import multiprocessing
+import subprocess
+import glob
+
+PARSER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      "m5_mcpat_parse.py")
+MCPAT_SUFFIX = "_mcpat"
+
+# Processor level results of McPAT, in the order they are printed
+RESULT_KEYS = ["Area", "Peak Power", "Total Leakage", "Peak Dynamic",
+               "Subthreshold Leakage", "Gate Leakage", "Runtime Dynamic"]
+
+def find_runs(result_dirs, stats_filename, config_filename):
+    runs = []
+    for result_dir in result_dirs:
+        for dirpath, dirnames, filenames in os.walk(result_dir):
+            if stats_filename in filenames and config_filename in filenames:
+                runs.append(dirpath)
+            dirnames.sort()
+    return sorted(runs)
+
+def is_up_to_date(target, sources):
+    if not os.path.isfile(target):
+        return False
+    mtime = os.path.getmtime(target)
+    for source in sources:
+        if os.path.getmtime(source) > mtime:
+            return False
+    return True
+
+def power_xml_paths(stats_filepath, args):
+    if args.dumps:
+        pattern = "%s_dump*_%s" % (stats_filepath, args.power_file_suffix)
+        return sorted(glob.glob(pattern))
+    return ["%s_%s" % (stats_filepath, args.power_file_suffix)]
+
+##
+## Function - gen_power_xml
+## gen_power_xml() runs m5_mcpat_parse.py for one run directory. It is the
+## worker of the first pool, so it returns its result instead of raising.
+##
+def gen_power_xml(job):
+    run, args = job
+    stats_filepath = os.path.join(run, args.stats_filename)
+    config_filepath = os.path.join(run, args.config_filename)
+
+    paths = power_xml_paths(stats_filepath, args)
+    sources = [stats_filepath, config_filepath]
+    if paths and all(is_up_to_date(path, sources) for path in paths):
+        return (run, paths, None)
+
+    # m5_mcpat_parse.py is Python 2 only, it is not run with the interpreter
+    # of this script
+    cmd = [args.parser_python, PARSER,
+           "--stats_filename", stats_filepath,
+           "--config_filename", config_filepath,
+           "--power_file_suffix", args.power_file_suffix]
+    if args.dumps:
+        cmd += ["--dumps", args.dumps]
+    cmd += args.parser_args
+
+    proc = subprocess.Popen(cmd, stdout = subprocess.PIPE,
+                            stderr = subprocess.STDOUT)
+    output = proc.communicate()[0]
+    # m5_mcpat_parse.py reports a panic on stdout with a non zero exit code
+    if proc.returncode != 0:
+        return (run, [], output)
+
+    return (run, power_xml_paths(stats_filepath, args), None)
+
+def mcpat_flags(args):
+    return ["-print_level", str(args.print_level),
+            "-opt_for_clk", str(args.opt_for_clk)]
+
+##
+## Function - power_xml_hash
+## power_xml_hash() hashes a power.xml after dropping indentation and empty
+## lines, together with the McPAT flags that change its output.
+##
+def power_xml_hash(power_filepath, args):
+    h = hashlib.sha1()
+    h.update(" ".join(mcpat_flags(args)).encode())
+    with open(power_filepath, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                h.update(line)
+                h.update(b"\n")
+    return h.hexdigest()
+
+def cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, digest[:2], digest + MCPAT_SUFFIX)
+
+##
+## Function - run_mcpat
+## run_mcpat() runs McPAT on one power.xml and stores its output in the cache.
+## The output is written to a temporary file first, so a crashed or killed
+## run never leaves a truncated cache entry behind.
+##
+def run_mcpat(job):
+    digest, power_filepath, args = job
+    out_path = cache_path(args.cache_dir, digest)
+    tmp_path = "%s.%d.tmp" % (out_path, os.getpid())
+
+    with open(tmp_path, 'wb') as out:
+        ret = subprocess.call([args.mcpat, "-infile", power_filepath] +
+                              mcpat_flags(args), stdout = out)
+    if ret != 0:
+        os.remove(tmp_path)
+        return (digest, "mcpat exited with %d on %s" % (ret, power_filepath))
+
+    os.rename(tmp_path, out_path)
+    return (digest, None)
+
+##
+## Function - parse_mcpat_output
+## parse_mcpat_output() returns the processor level results of a McPAT output,
+## which are the first occurrence of every key in RESULT_KEYS.
+##
+def parse_mcpat_output(filename):
+    results = {}
+    with open(filename, 'r') as f:
+        for line in f:
+            if '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            key = key.strip()
+            if key in RESULT_KEYS and key not in results:
+                results[key] = value.split()[0]
+                if len(results) == len(RESULT_KEYS):
+                    break
+    return results
+
+def write_table(rows, columns, output):
+    if output.endswith(".json"):
+        with open(output, 'w') as f:
+            json.dump(rows, f, indent = 4, sort_keys = True)
+        return
+
+    import csv
+    with open(output, 'w') as f:
+        writer = csv.DictWriter(f, fieldnames = columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = __doc__,
+        formatter_class = argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument("result_dirs", nargs = "+", metavar = "result_dir",
+                        help = "directory tree holding gem5 result directories")
+    parser.add_argument("-j", "--jobs", type = int,
+                        default = multiprocessing.cpu_count(),
+                        help = "number of parallel parser and McPAT processes")
+    parser.add_argument("--mcpat", default = "./pohao_gem5_stuff/mcpat/mcpat",
+                        help = "path to the McPAT binary")
+    parser.add_argument("--print_level", type = int, default = 0,
+                        help = "McPAT -print_level")
+    parser.add_argument("--opt_for_clk", type = int, default = 0,
+                        help = "McPAT -opt_for_clk")
+    parser.add_argument("--cache_dir", default = "mcpat_cache",
+                        help = "directory of the McPAT result cache")
+    parser.add_argument("-s", "--stats_filename", default = "stats.txt",
+                        help = "the name of the stats file of every run")
+    parser.add_argument("-c", "--config_filename", default = "config.ini",
+                        help = "the name of the config file of every run")
+    parser.add_argument("--power_file_suffix", default = "power.xml",
+                        help = "the suffix of the power file name")
+    parser.add_argument("-d", "--dumps", default = None,
+                        help = "passed to m5_mcpat_parse.py to get one "
+                               "power.xml per stats dump")
+    parser.add_argument("--parser_python", default = "python2",
+                        help = "the Python 2 interpreter to run "
+                               "m5_mcpat_parse.py with")
+    parser.add_argument("--parser_args", default = "",
+                        help = "extra arguments for m5_mcpat_parse.py")
+    parser.add_argument("-o", "--output", default = "mcpat_results.csv",
+                        help = "consolidated result table, written as JSON "
+                               "if the name ends with .json and CSV otherwise")
+
+    args = parser.parse_args()
+    args.parser_args = args.parser_args.split()
+
+    if not os.path.isfile(args.mcpat):
+        sys.exit("%s not exist!" % args.mcpat)
+
+    runs = find_runs(args.result_dirs, args.stats_filename,
+                     args.config_filename)
+    if not runs:
+        sys.exit("no runs found in %s" % " ".join(args.result_dirs))
+
+    pool = multiprocessing.Pool(args.jobs)
+
+    # Generate the power.xml of every run
+    power_files = []
+    for run, paths, error in pool.imap(gen_power_xml,
+                                       [(run, args) for run in runs]):
+        if error != None:
+            print("Warning: unable to generate power.xml for %s:\n%s" %
+                  (run, error))
+            continue
+        power_files += [(run, path) for path in paths]
+
+    # Run McPAT once for every distinct power.xml that is not cached yet
+    digests = {}
+    jobs = {}
+    for run, path in power_files:
+        digest = power_xml_hash(path, args)
+        digests[path] = digest
+        if digest not in jobs and \
+           not os.path.isfile(cache_path(args.cache_dir, digest)):
+            jobs[digest] = (digest, path, args)
+
+    print("%d power.xml files, %d distinct, %d not cached" %
+          (len(power_files), len(set(digests.values())), len(jobs)))
+
+    for digest in jobs:
+        subdir = os.path.dirname(cache_path(args.cache_dir, digest))
+        if not os.path.isdir(subdir):
+            os.makedirs(subdir)
+
+    failed = set()
+    for digest, error in pool.imap_unordered(run_mcpat, jobs.values()):
+        if error != None:
+            print("Warning: %s" % error)
+            failed.add(digest)
+
+    pool.close()
+    pool.join()
+
+    # Write the McPAT output next to every power.xml and collect the results
+    rows = []
+    for run, path in power_files:
+        digest = digests[path]
+        if digest in failed:
+            continue
+
+        cached = cache_path(args.cache_dir, digest)
+        with open(cached, 'rb') as src:
+            with open(path + MCPAT_SUFFIX, 'wb') as dst:
+                dst.write(src.read())
+
+        row = {"run": run, "power_xml": os.path.basename(path),
+               "hash": digest, "cached": digest not in jobs}
+        row.update(parse_mcpat_output(cached))
+        rows.append(row)
+
+    columns = ["run", "power_xml", "hash", "cached"] + RESULT_KEYS
+    write_table(rows, columns, args.output)
+    print("Writing %s..." % args.output)
+
+if __name__ == "__main__":
+    main()
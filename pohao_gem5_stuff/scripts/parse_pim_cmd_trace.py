@@ -0,0 +1,73 @@
+#!/usr/bin/python
+
+import sys
+import argparse
+import struct
+
+# Record of one PIM kernel command invocation, written by ScratchpadMemory
+# (see CmdRecord in src/mem/scratchpad_mem.hh)
+RECORD = struct.Struct("<BBQQQIQQQ")
+FIELDS = ["cmd", "window", "start_tick", "end_tick", "pim_cycles", "flushes",
+          "flush_bytes", "host_bytes_read", "host_bytes_written"]
+
+# enum command_type of pohao_gem5_stuff/pim-kernel/pim-kernel.h
+CMD_NAMES = ["uninit", "init", "nop", "nova_search_rbtree",
+             "vfs_search_dcache", "nova_file_r", "nova_file_w"]
+
+def read_trace(filename):
+    f = open(filename, 'rb')
+    while True:
+        buf = f.read(RECORD.size * 4096)
+        if not buf:
+            break
+        if len(buf) % RECORD.size:
+            sys.exit("truncated record in %s" % filename)
+        for offset in range(0, len(buf), RECORD.size):
+            yield RECORD.unpack_from(buf, offset)
+    f.close()
+
+def cmd_name(cmd):
+    return CMD_NAMES[cmd] if cmd < len(CMD_NAMES) else str(cmd)
+
+def print_records(filename):
+    print(",".join(FIELDS))
+    for record in read_trace(filename):
+        print(",".join([cmd_name(record[0])] + [str(v) for v in record[1:]]))
+
+def print_summary(filename):
+    summary = {}
+    for record in read_trace(filename):
+        totals = summary.setdefault(record[0], [0, 0] + [0] * 5)
+        totals[0] += 1
+        totals[1] += record[3] - record[2]
+        for i in range(4, len(FIELDS)):
+            totals[i - 2] += record[i]
+
+    print("cmd,invocations,wait_ticks,avg_wait_ticks,pim_cycles,"
+          "avg_pim_cycles,flushes,flush_bytes,host_bytes_read,"
+          "host_bytes_written")
+    for cmd in sorted(summary):
+        totals = summary[cmd]
+        count = totals[0]
+        print("%s,%d,%d,%.1f,%d,%.1f,%d,%d,%d,%d" %
+              (cmd_name(cmd), count, totals[1], float(totals[1]) / count,
+               totals[2], float(totals[2]) / count, totals[3], totals[4],
+               totals[5], totals[6]))
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description = "Print the binary PIM kernel command trace "
+                      "(--pim-cmd-trace) as CSV")
+    parser.add_argument("trace", help = "PIM command trace file")
+    parser.add_argument("-a", "--all", action = "store_true",
+                        help = "print every invocation instead of a summary "
+                               "per command")
+    args = parser.parse_args(argv[1:])
+
+    if args.all:
+        print_records(args.trace)
+    else:
+        print_summary(args.trace)
+
+if __name__ == "__main__":
+    main(sys.argv)
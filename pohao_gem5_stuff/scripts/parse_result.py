@@ -2,211 +2,161 @@
 
 import sys
 import os
+import argparse
+import csv
+import fnmatch
 import xml.etree.ElementTree
 
 SUMMARY_SUFFIX = "_summary.xml"
 MCPAT_SUFFIX = "_power.xml_mcpat"
 
-def parse_summary(filename):
-    root = xml.etree.ElementTree.parse(filename).getroot()
-
-    # system
-    for stat in root.findall('component/stat'):
-        if stat.get('name') == "sim_ticks":
-            print("system.sim_ticks (ps)\t%s" % stat.get('value'))
-            break
-
-    # itb
-    for component in root.findall('component/component/component'):
-        if component.get('id') == "system.cpu.itb":
-            rdAccesses = ""
-            wrAccesses = ""
-            total_accesses = ""
-            rdMisses = ""
-            wrMisses = ""
-            total_misses = ""
-            for stat in component.findall('stat'):
-                if (stat.get('name') == "rdAccesses"):
-                    rdAccesses = stat.get('value')
-                if (stat.get('name') == "wrAccesses"):
-                    wrAccesses = stat.get('value')
-                if (stat.get('name') == "total_accesses"):
-                    total_accesses = stat.get('value')
-                if (stat.get('name') == "rdMisses"):
-                    rdMisses = stat.get('value')
-                if (stat.get('name') == "wrMisses"):
-                    wrMisses = stat.get('value')
-                if (stat.get('name') == "total_misses"):
-                    total_misses = stat.get('value')
-
-            print("system.cpu.itb.rdAccesses\t%s" % rdAccesses)
-            print("system.cpu.itb.wrAccesses\t%s" % wrAccesses)
-            print("system.cpu.itb.total_accesses\t%s" % total_accesses)
-            print("system.cpu.itb.rdMisses\t%s" % rdMisses)
-            print("system.cpu.itb.wrMisses\t%s" % wrMisses)
-            print("system.cpu.itb.total_misses\t%s" % total_misses)
-            print("system.cpu.itb.total_miss_rate\t%s" % (float(total_misses) / float(total_accesses)))
-
-            break
-
-    # dtb
-    for component in root.findall('component/component/component'):
-        if component.get('id') == "system.cpu.dtb":
-            rdAccesses = ""
-            wrAccesses = ""
-            total_accesses = ""
-            rdMisses = ""
-            wrMisses = ""
-            total_misses = ""
-            for stat in component.findall('stat'):
-                if (stat.get('name') == "rdAccesses"):
-                    rdAccesses = stat.get('value')
-                if (stat.get('name') == "wrAccesses"):
-                    wrAccesses = stat.get('value')
-                if (stat.get('name') == "total_accesses"):
-                    total_accesses = stat.get('value')
-                if (stat.get('name') == "rdMisses"):
-                    rdMisses = stat.get('value')
-                if (stat.get('name') == "wrMisses"):
-                    wrMisses = stat.get('value')
-                if (stat.get('name') == "total_misses"):
-                    total_misses = stat.get('value')
-
-            print("system.cpu.dtb.rdAccesses\t%s" % rdAccesses)
-            print("system.cpu.dtb.wrAccesses\t%s" % wrAccesses)
-            print("system.cpu.dtb.total_accesses\t%s" % total_accesses)
-            print("system.cpu.dtb.rdMisses\t%s" % rdMisses)
-            print("system.cpu.dtb.wrMisses\t%s" % wrMisses)
-            print("system.cpu.dtb.total_misses\t%s" % total_misses)
-            print("system.cpu.dtb.total_miss_rate\t%s" % (float(total_misses) / float(total_accesses)))
-
-            break
-
-    # icache
-    for component in root.findall('component/component/component'):
-        if component.get('id') == "system.cpu.icache":
-            demand_hits = ""
-            demand_misses = ""
-            demand_accesses = ""
-            demand_miss_rate = ""
-            for stat in component.findall('stat'):
-                if (stat.get('name') == "demand_hits::total"):
-                    demand_hits = stat.get('value')
-                if (stat.get('name') == "demand_misses::total"):
-                    demand_misses = stat.get('value')
-                if (stat.get('name') == "demand_accesses::total"):
-                    demand_accesses = stat.get('value')
-                if (stat.get('name') == "demand_miss_rate::total"):
-                    demand_miss_rate = stat.get('value')
-
-            print("system.cpu.icache.demand_hits::total\t%s" % demand_hits)
-            print("system.cpu.icache.demand_misses::total\t%s" % demand_misses)
-            print("system.cpu.icache.demand_accesses::total\t%s" % demand_accesses)
-            print("system.cpu.icache.demand_miss_rate::total\t%s" % demand_miss_rate)
-
-            break
-
-    # dcache
-    for component in root.findall('component/component/component'):
-        if component.get('id') == "system.cpu.dcache":
-            demand_hits = ""
-            demand_misses = ""
-            demand_accesses = ""
-            demand_miss_rate = ""
-            for stat in component.findall('stat'):
-                if (stat.get('name') == "demand_hits::total"):
-                    demand_hits = stat.get('value')
-                if (stat.get('name') == "demand_misses::total"):
-                    demand_misses = stat.get('value')
-                if (stat.get('name') == "demand_accesses::total"):
-                    demand_accesses = stat.get('value')
-                if (stat.get('name') == "demand_miss_rate::total"):
-                    demand_miss_rate = stat.get('value')
-
-            print("system.cpu.dcache.demand_hits::total\t%s" % demand_hits)
-            print("system.cpu.dcache.demand_misses::total\t%s" % demand_misses)
-            print("system.cpu.dcache.demand_accesses::total\t%s" % demand_accesses)
-            print("system.cpu.dcache.demand_miss_rate::total\t%s" % demand_miss_rate)
-
-            break
-
-    # l2
-    for component in root.findall('component/component'):
-        if component.get('id') == "system.l2":
-            demand_hits = ""
-            demand_misses = ""
-            demand_accesses = ""
-            demand_miss_rate = ""
-            for stat in component.findall('stat'):
-                if (stat.get('name') == "demand_hits::total"):
-                    demand_hits = stat.get('value')
-                if (stat.get('name') == "demand_misses::total"):
-                    demand_misses = stat.get('value')
-                if (stat.get('name') == "demand_accesses::total"):
-                    demand_accesses = stat.get('value')
-                if (stat.get('name') == "demand_miss_rate::total"):
-                    demand_miss_rate = stat.get('value')
-
-            print("system.l2.demand_hits::total\t%s" % demand_hits)
-            print("system.l2.demand_misses::total\t%s" % demand_misses)
-            print("system.l2.demand_accesses::total\t%s" % demand_accesses)
-            print("system.l2.demand_miss_rate::total\t%s" % demand_miss_rate)
-
-            break
-
-    # mc
-    for component in root.findall('component/component'):
-        if component.get('id') == "system.mc":
-            mem_reads = ""
-            mem_writes = ""
-            mem_accesses = ""
-            for stat in component.findall('stat'):
-                if (stat.get('name') == "mem_reads"):
-                    mem_reads = stat.get('value')
-                if (stat.get('name') == "mem_writes"):
-                    mem_writes = stat.get('value')
-                if (stat.get('name') == "mem_accesses"):
-                    mem_accesses = stat.get('value')
-
-            print("system.mc.mem_reads\t%s" % mem_reads)
-            print("system.mc.mem_writes\t%s" % mem_writes)
-            print("system.mc.mem_accesses\t%s" % mem_accesses)
-
-            break
+# Wanted stats of the summary xml. Every entry is a component id pattern, in
+# fnmatch syntax so that e.g. system.cpu*.dcache matches every core, and the
+# names of the stats wanted from every matching component. A * only matches
+# within one component name, so system.l2[0-9]* matches the L2 banks but not
+# their children such as system.l20.tags.
+TLB_STATS = ["rdAccesses", "wrAccesses", "total_accesses",
+             "rdMisses", "wrMisses", "total_misses"]
+CACHE_STATS = ["demand_hits::total", "demand_misses::total",
+               "demand_accesses::total", "demand_miss_rate::total"]
+
+WANTED_STATS = [
+    ("system", ["sim_ticks"]),
+    ("system.cpu*.itb", TLB_STATS),
+    ("system.cpu*.dtb", TLB_STATS),
+    ("system.cpu*.icache", CACHE_STATS),
+    ("system.cpu*.dcache", CACHE_STATS),
+    ("system.l2", CACHE_STATS),
+    ("system.l2[0-9]*", CACHE_STATS),
+    ("system.mc", ["mem_reads", "mem_writes", "mem_accesses"]),
+]
+
+def miss_rate(stats):
+    return float(stats["total_misses"]) / float(stats["total_accesses"])
+
+# Stats calculated from the stats of a component: component id pattern, stat
+# name and a function of the stats of the component
+CALCULATED_STATS = [
+    ("system.cpu*.itb", "total_miss_rate", miss_rate),
+    ("system.cpu*.dtb", "total_miss_rate", miss_rate),
+]
+
+# Processor level results of the McPAT output
+MCPAT_RESULTS = [("Total Leakage", "Total Leakage (W)"),
+                 ("Runtime Dynamic", "Runtime Dynamic (W)")]
+
+##
+## index_summary() reads a summary xml in one pass and returns a dict that maps
+## every component id to a dict of its stats.
+##
+def index_summary(filename):
+    index = {}
+    components = [] # stats dicts of the enclosing components
+
+    for event, elem in xml.etree.ElementTree.iterparse(filename,
+                                                       ("start", "end")):
+        if elem.tag == "component":
+            if event == "start":
+                components.append(index.setdefault(elem.get('id'), {}))
+            else:
+                components.pop()
+                elem.clear()
+        elif elem.tag == "stat" and event == "start":
+            components[-1][elem.get('name')] = elem.get('value')
+
+    return index
+
+def match_components(ids, pattern):
+    depth = pattern.count('.')
+    return [comp_id for comp_id in fnmatch.filter(ids, pattern)
+            if comp_id.count('.') == depth]
+
+def select_stats(index):
+    row = []
+    ids = sorted(index)
+
+    for pattern, names in WANTED_STATS:
+        for comp_id in match_components(ids, pattern):
+            stats = index[comp_id]
+            for name in names:
+                row.append(("%s.%s" % (comp_id, name), stats.get(name, "")))
+
+    for pattern, name, func in CALCULATED_STATS:
+        for comp_id in match_components(ids, pattern):
+            try:
+                value = func(index[comp_id])
+            except (KeyError, ValueError, ZeroDivisionError):
+                value = ""
+            row.append(("%s.%s" % (comp_id, name), value))
+
+    return row
 
 def parse_mcpat(filename):
-    f = open(filename, 'r')
+    row = []
+    wanted = dict(MCPAT_RESULTS)
 
+    f = open(filename, 'r')
     for s in f:
-        if s.find('Total Leakage') != -1:
-            leakage = s.split("=")[1].split(" ")[1]
-            print("Total Leakage (W)\t%s" % leakage)
-        if s.find('Runtime Dynamic') != -1:
-            dynamic = s.split("=")[1].split(" ")[1]
-            print("Runtime Dynamic (W)\t%s" % dynamic)
-            break
-
+        if '=' not in s:
+            continue
+        key = s.split("=")[0].strip()
+        if key in wanted:
+            row.append((wanted.pop(key), s.split("=")[1].split(" ")[1]))
+            if not wanted:
+                break
     f.close()
 
-def main(argv):
-    # Check argv
-    if len(argv) != 2:
-        sys.exit("Usage: %s stats_filename" % argv[0])
+    return row
 
-    # Check file
-    STATS_FILE = argv[1]
-    SUMMARY_FILE = "%s%s" % (STATS_FILE, SUMMARY_SUFFIX)
-    MCPAT_FILE = "%s%s" % (STATS_FILE, MCPAT_SUFFIX)
+def stats_path(path, stats_filename):
+    if os.path.isdir(path):
+        return os.path.join(path, stats_filename)
+    return path
 
-    if os.path.isfile(SUMMARY_FILE) == False:
-        sys.exit("summary file %s not exist!" % SUMMARY_FILE)
-
-    if os.path.isfile(MCPAT_FILE) == False:
-        sys.exit("mcpat file %s not exist!" % MCPAT_FILE)
-
-    # Start
-    parse_summary(SUMMARY_FILE)
-    parse_mcpat(MCPAT_FILE)
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description = "Collect the wanted stats of the summary xml and the "
+                      "McPAT output of many results into one wide CSV table")
+    parser.add_argument("results", nargs = "+", metavar = "result",
+                        help = "stats file or result directory")
+    parser.add_argument("-s", "--stats_filename", default = "stats.txt",
+                        help = "the name of the stats file in a result "
+                               "directory")
+    parser.add_argument("-o", "--output", default = None,
+                        help = "output CSV file (default: stdout)")
+    args = parser.parse_args(argv[1:])
+
+    rows = []
+    columns = ["result"]
+    seen = set(columns)
+
+    for result in args.results:
+        STATS_FILE = stats_path(result, args.stats_filename)
+        SUMMARY_FILE = "%s%s" % (STATS_FILE, SUMMARY_SUFFIX)
+        MCPAT_FILE = "%s%s" % (STATS_FILE, MCPAT_SUFFIX)
+
+        if os.path.isfile(SUMMARY_FILE) == False:
+            sys.exit("summary file %s not exist!" % SUMMARY_FILE)
+
+        if os.path.isfile(MCPAT_FILE) == False:
+            sys.exit("mcpat file %s not exist!" % MCPAT_FILE)
+
+        row = [("result", result)]
+        row += select_stats(index_summary(SUMMARY_FILE))
+        row += parse_mcpat(MCPAT_FILE)
+
+        for column, value in row:
+            if column not in seen:
+                seen.add(column)
+                columns.append(column)
+        rows.append(dict(row))
+
+    out = sys.stdout if args.output == None else open(args.output, 'w')
+    writer = csv.DictWriter(out, fieldnames = columns)
+    writer.writeheader()
+    writer.writerows(rows)
+    if out != sys.stdout:
+        out.close()
 
 if __name__ == "__main__":
     main(sys.argv)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+"""
+SYNOPSIS
+
+    sweep_pim.py [-h] [-j JOBS] [...] -p VAR=VALUE[,VALUE...] [-p ...]
+
+DESCRIPTION
+
+    sweep_pim.py runs x86_fs_with_se_pim.sh for every point of a parameter
+    grid and collects the results into one table. It must be run from the
+    gem5 root directory, like the run script itself.
+
+    1. Every -p option names a setting of the run script, e.g.
+       -p PIM_CPU_CLOCK=1GHz,1.5GHz,2GHz -p PIM_BANDWIDTH_RATIO=4,8 is a grid
+       of six points. Every point runs in its own output directory below
+       --outdir and restores the shared checkpoint of --checkpoint_dir.
+       Checkpoints taken by a point are written to its own output directory,
+       never to --checkpoint_dir.
+    2. The points run over a process pool, one gem5 process per point. A
+       point that already finished (it has a sweep_point.json) is skipped,
+       so an interrupted sweep is resumed by running it again.
+    3. run_mcpat.py generates the summary xml and the McPAT output of every
+       point, then the stats of parse_result.py and the McPAT results of all
+       points are written into one CSV table together with their settings.
+"""
+
+import sys
+import os
+import re
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import subprocess
+import csv
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SCRIPTS_DIR)
+import parse_result
+
+RUN_SCRIPT = os.path.join(SCRIPTS_DIR, "run", "x86_fs_with_se_pim.sh")
+RUN_MCPAT = os.path.join(SCRIPTS_DIR, "mcpat", "run_mcpat.py")
+POINT_FILE = "sweep_point.json"
+LOG_FILE = "sweep.log"
+CHECKPOINT_DIR = "checkpoints"
+
+def parse_grid(params, script):
+    grid = []
+    with open(script, 'r') as f:
+        text = f.read()
+
+    for param in params:
+        if '=' not in param:
+            sys.exit("invalid parameter %s, expected VAR=VALUE[,VALUE...]" %
+                     param)
+        var, values = param.split('=', 1)
+        # Only the settings read from the environment can be swept
+        if ("%s=${%s:-" % (var, var)) not in text and \
+           ("%s=${%s-" % (var, var)) not in text:
+            sys.exit("%s is not a setting of %s" % (var, script))
+        grid.append((var, values.split(',')))
+
+    return grid
+
+def point_name(point):
+    name = []
+    for var, value in point:
+        # Use the file name of paths, e.g. of the workload SCRIPT
+        short = os.path.basename(value.rstrip('/')) or value
+        short = re.sub(r"[^\w.+-]", "_", short)
+        # Values that were shortened could collide, tell them apart by a
+        # hash of the whole value
+        if short != value:
+            short += "-" + hashlib.md5(value.encode()).hexdigest()[:8]
+        name.append("%s-%s" % (var, short))
+    return "_".join(name)
+
+##
+## Function - point_checkpoint_dir
+## gem5 restores from and writes new checkpoints to the same --checkpoint-dir.
+## Every point gets its own checkpoint directory below its output directory,
+## holding links to the checkpoints of the shared directory, so that points
+## restore the shared checkpoints but never write into the shared directory.
+##
+def point_checkpoint_dir(outdir, checkpoint_dir):
+    cptdir = os.path.join(outdir, CHECKPOINT_DIR)
+    if not os.path.isdir(cptdir):
+        os.makedirs(cptdir)
+
+    for name in os.listdir(checkpoint_dir):
+        link = os.path.join(cptdir, name)
+        if name.startswith("cpt.") and not os.path.lexists(link):
+            os.symlink(os.path.abspath(os.path.join(checkpoint_dir, name)),
+                       link)
+
+    return cptdir
+
+def gen_points(grid):
+    names = [var for var, values in grid]
+    for values in itertools.product(*[values for var, values in grid]):
+        yield list(zip(names, values))
+
+##
+## Function - run_point
+## run_point() runs gem5 for one point of the grid. It is the worker of the
+## pool, so it returns its result instead of raising.
+##
+def run_point(job):
+    point, outdir, args = job
+
+    env = dict(os.environ)
+    # Unattended points don't write a debug trace unless it is swept
+    env["DEBUG_FLAGS"] = ""
+    env.update(point)
+    env["OUTDIR"] = outdir
+    env["CHECKPOINT_DIR"] = point_checkpoint_dir(outdir, args.checkpoint_dir)
+    env["CHECKPOINT_RESTORE"] = str(args.checkpoint_restore)
+
+    with open(os.path.join(outdir, LOG_FILE), 'w') as log:
+        ret = subprocess.call(["bash", args.script], env = env,
+                              stdout = log, stderr = subprocess.STDOUT)
+    if ret != 0:
+        return (outdir, "gem5 exited with %d, see %s" %
+                (ret, os.path.join(outdir, LOG_FILE)))
+
+    # Written last, it marks the point as finished
+    with open(os.path.join(outdir, POINT_FILE), 'w') as f:
+        json.dump(dict(point), f, indent = 4, sort_keys = True)
+
+    return (outdir, None)
+
+def collect_row(outdir, point, stats_filename):
+    stats_file = os.path.join(outdir, stats_filename)
+    summary_file = stats_file + parse_result.SUMMARY_SUFFIX
+    mcpat_file = stats_file + parse_result.MCPAT_SUFFIX
+
+    row = [("point", os.path.basename(outdir))] + list(point)
+    if os.path.isfile(summary_file):
+        row += parse_result.select_stats(
+            parse_result.index_summary(summary_file))
+    if os.path.isfile(mcpat_file):
+        row += parse_result.parse_mcpat(mcpat_file)
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = __doc__,
+        formatter_class = argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument("-p", "--param", action = "append", default = [],
+                        metavar = "VAR=VALUE[,VALUE...]",
+                        help = "values of a setting of the run script, can "
+                               "be given many times to form a grid")
+    parser.add_argument("-j", "--jobs", type = int,
+                        default = multiprocessing.cpu_count(),
+                        help = "number of parallel gem5 processes")
+    parser.add_argument("--script", default = RUN_SCRIPT,
+                        help = "run script of a single point")
+    parser.add_argument("--outdir", default = "pim_sweep",
+                        help = "directory holding the output directory of "
+                               "every point")
+    parser.add_argument("--checkpoint_dir", default = "pim_m5out",
+                        help = "directory of the shared restore checkpoint")
+    parser.add_argument("--checkpoint_restore", type = int, default = 3,
+                        help = "number of the checkpoint to restore")
+    parser.add_argument("--mcpat", default = "./pohao_gem5_stuff/mcpat/mcpat",
+                        help = "path to the McPAT binary")
+    parser.add_argument("--no_mcpat", action = "store_true",
+                        help = "collect the gem5 results only")
+    parser.add_argument("-s", "--stats_filename", default = "stats.txt",
+                        help = "the name of the stats file of every point")
+    parser.add_argument("-o", "--output", default = None,
+                        help = "results table (default: "
+                               "OUTDIR/sweep_results.csv)")
+
+    args = parser.parse_args()
+
+    if not args.param:
+        sys.exit("no parameters to sweep, use -p VAR=VALUE[,VALUE...]")
+    if not os.path.isdir(args.checkpoint_dir):
+        sys.exit("checkpoint directory %s not exist!" % args.checkpoint_dir)
+
+    grid = parse_grid(args.param, args.script)
+    points = [(point, os.path.join(args.outdir, point_name(point)))
+              for point in gen_points(grid)]
+
+    jobs = [(point, outdir, args) for point, outdir in points
+            if not os.path.isfile(os.path.join(outdir, POINT_FILE))]
+    print("%d points, %d to run" % (len(points), len(jobs)))
+
+    failed = set()
+    if jobs:
+        pool = multiprocessing.Pool(min(args.jobs, len(jobs)))
+        for outdir, error in pool.imap_unordered(run_point, jobs):
+            if error != None:
+                print("Warning: %s: %s" % (outdir, error))
+                failed.add(outdir)
+            else:
+                print("Finished %s" % outdir)
+        pool.close()
+        pool.join()
+
+    finished = [outdir for point, outdir in points if outdir not in failed]
+
+    if finished and not args.no_mcpat:
+        ret = subprocess.call([sys.executable, RUN_MCPAT,
+                               "-j", str(args.jobs),
+                               "--mcpat", args.mcpat,
+                               "-s", args.stats_filename,
+                               "-o", os.path.join(args.outdir,
+                                                  "mcpat_results.csv")] +
+                              finished)
+        if ret != 0:
+            print("Warning: run_mcpat.py exited with %d" % ret)
+
+    rows = []
+    columns = []
+    seen = set()
+    for point, outdir in points:
+        if outdir in failed:
+            continue
+        row = collect_row(outdir, point, args.stats_filename)
+        for column, value in row:
+            if column not in seen:
+                seen.add(column)
+                columns.append(column)
+        rows.append(dict(row))
+
+    output = args.output
+    if output == None:
+        output = os.path.join(args.outdir, "sweep_results.csv")
+    with open(output, 'w') as f:
+        writer = csv.DictWriter(f, fieldnames = columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Writing %s..." % output)
+
+    if failed:
+        sys.exit("%d points failed" % len(failed))
+
+if __name__ == "__main__":
+    main()
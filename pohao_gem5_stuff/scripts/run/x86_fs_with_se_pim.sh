@@ -24,46 +24,58 @@ GEM5_TARGET=./build/$ARCH/gem5.$GEM5_BIN_TYPE
 FS_CONFIG=./configs/example/fs.py
 
 
-OUTDIR=pim_m5out
-DEBUG_FLAGS=ScratchpadMemory,PseudoInst #NoncoherentXBar # CacheFlushRange
+# Every setting below can be overridden from the environment, see sweep_pim.py
+OUTDIR=${OUTDIR:-pim_m5out}
+# Checkpoints are restored from and written to CHECKPOINT_DIR
+CHECKPOINT_DIR=${CHECKPOINT_DIR:-$OUTDIR}
+CHECKPOINT_RESTORE=${CHECKPOINT_RESTORE:-3}
+# Set DEBUG_FLAGS to an empty value to turn the debug trace off
+DEBUG_FLAGS=${DEBUG_FLAGS-ScratchpadMemory,PseudoInst} #NoncoherentXBar # CacheFlushRange
 
 
-NUM_CPUS=1
-CPU_TYPE=AtomicSimpleCPU # AtomicSimpleCPU TimingSimpleCPU DerivO3CPU X86KvmCPU
-RESTORE_CPU_TYPE=AtomicSimpleCPU
-CPU_CLOCK=2GHz
+NUM_CPUS=${NUM_CPUS:-1}
+CPU_TYPE=${CPU_TYPE:-AtomicSimpleCPU} # AtomicSimpleCPU TimingSimpleCPU DerivO3CPU X86KvmCPU
+RESTORE_CPU_TYPE=${RESTORE_CPU_TYPE:-AtomicSimpleCPU}
+CPU_CLOCK=${CPU_CLOCK:-2GHz}
 
 
-L1I_SIZE=32kB
-L1D_SIZE=32kB
-L2_SIZE=1MB
+L1I_SIZE=${L1I_SIZE:-32kB}
+L1D_SIZE=${L1D_SIZE:-32kB}
+L2_SIZE=${L2_SIZE:-1MB}
 
 
-MEM_TYPE=DDR4_2400_8x8
-MEM_CHANNELS=1
-MEM_SIZE=16GB
-NVM_TYPE=PCM_LPDDR2_400_8x8
+MEM_TYPE=${MEM_TYPE:-DDR4_2400_8x8}
+MEM_CHANNELS=${MEM_CHANNELS:-1}
+MEM_SIZE=${MEM_SIZE:-16GB}
+NVM_TYPE=${NVM_TYPE:-PCM_LPDDR2_400_8x8}
 
 # Must match the memmap in the kernel cmdline (?G!?G). Be careful with x86 3G hole
-NVM_START=0x240000000 # 9G
-NVM_SIZE=8GB
-
-
-PIM_CPU_CLOCK=1.5GHz
-PIM_L1I_CACHE_SIZE=4kB
-PIM_L1D_CACHE_SIZE=4kB
-PIM_BANDWIDTH_RATIO=8
-PIM_SPM_START=0x450000000 # Must be after the SE memory range
-PIM_SPM_SIZE=4kB # The minimum memory size is page size, but it won't actually be used so much
-PIM_SPM_REG_FLUSH_ADDR=0x450000000
-PIM_SPM_REG_FLUSH_SIZE=0x450000008
-PIM_SE_MEM_START=0x440000000 # Must be after the host physical memory range
+NVM_START=${NVM_START:-0x240000000} # 9G
+NVM_SIZE=${NVM_SIZE:-8GB}
+
+
+PIM_NUM_CPUS=${PIM_NUM_CPUS:-1} # One SPM window of PIM_SPM_SIZE per PIM CPU
+PIM_CPU_CLOCK=${PIM_CPU_CLOCK:-1.5GHz}
+PIM_L1I_CACHE_SIZE=${PIM_L1I_CACHE_SIZE:-4kB}
+PIM_L1D_CACHE_SIZE=${PIM_L1D_CACHE_SIZE:-4kB}
+PIM_BANDWIDTH_RATIO=${PIM_BANDWIDTH_RATIO:-8}
+PIM_PLACEMENT=${PIM_PLACEMENT:-shared} # shared, channel
+PIM_SPM_START=${PIM_SPM_START:-0x450000000} # Must be after the SE memory range
+PIM_SPM_SIZE=${PIM_SPM_SIZE:-4kB} # The minimum memory size is page size, but it won't actually be used so much
+PIM_SPM_REG_FLUSH_ADDR=${PIM_SPM_REG_FLUSH_ADDR:-0x450000000}
+PIM_SPM_REG_FLUSH_SIZE=${PIM_SPM_REG_FLUSH_SIZE:-0x450000008}
+PIM_SPM_REG_CMD_ADDR=${PIM_SPM_REG_CMD_ADDR:-0x45000000c}
+PIM_SPM_REG_FLUSH_RING_COUNT=${PIM_SPM_REG_FLUSH_RING_COUNT:-0x450000030}
+PIM_SPM_FLUSH_RING_ADDR=${PIM_SPM_FLUSH_RING_ADDR:-0x450000040}
+PIM_SPM_FLUSH_RING_ENTRIES=${PIM_SPM_FLUSH_RING_ENTRIES:-64}
+PIM_CMD_TRACE=${PIM_CMD_TRACE:-pim_cmd_trace.bin}
+PIM_SE_MEM_START=${PIM_SE_MEM_START:-0x440000000} # Must be after the host physical memory range
 #PIM_SE_MEM_SIZE=256kB # if cache, The minimum memory size of DDR4_2400_8x8 is 256kB, but it won't actually be used so much
-PIM_SE_MEM_SIZE=16kB # if no cache
-PIM_KERNEL=./pohao_gem5_stuff/pim-kernel/pim-kernel
-PIM_SE_INPUT=''
-PIM_SE_OUTPUT=pim-stdout
-PIM_SE_ERROUT=pim-errout
+PIM_SE_MEM_SIZE=${PIM_SE_MEM_SIZE:-16kB} # if no cache
+PIM_KERNEL=${PIM_KERNEL:-./pohao_gem5_stuff/pim-kernel/pim-kernel}
+PIM_SE_INPUT=${PIM_SE_INPUT:-''}
+PIM_SE_OUTPUT=${PIM_SE_OUTPUT:-pim-stdout}
+PIM_SE_ERROUT=${PIM_SE_ERROUT:-pim-errout}
 
 
 # /lib/modules/4.18.0+/kernel/fs/nova/nova.ko
@@ -74,18 +86,18 @@ PIM_SE_ERROUT=pim-errout
 # ./pohao_gem5_stuff/workloads/real/fileserver.f
 # ../f_create.tar
 # ../nova_module/base_cpu/nova.ko
-SCRIPT=./pohao_gem5_stuff/workloads/metadata/createfiles.f
+SCRIPT=${SCRIPT:-./pohao_gem5_stuff/workloads/metadata/createfiles.f}
 
 
-KERNEL=x86_64-vmlinux-4.18.0-nova-pohao
-CMDLINE="earlyprintk=ttyS0 console=ttyS0 lpj=7999923 root=/dev/hda1 dhash_entries=16 nokaslr norandmaps memmap=8G!9G"
-DISK_IMAGE=0215-x86-ubuntu-14.04.6.img
+KERNEL=${KERNEL:-x86_64-vmlinux-4.18.0-nova-pohao}
+CMDLINE=${CMDLINE:-"earlyprintk=ttyS0 console=ttyS0 lpj=7999923 root=/dev/hda1 dhash_entries=16 nokaslr norandmaps memmap=8G!9G"}
+DISK_IMAGE=${DISK_IMAGE:-0215-x86-ubuntu-14.04.6.img}
 #DISK_IMAGE=x86-ubuntu-14.04.6-withmicro.img
 
 
 "$GEM5_TARGET" \
     --outdir="$OUTDIR" \
-    --debug-flags="$DEBUG_FLAGS" \
+    ${DEBUG_FLAGS:+"--debug-flags=$DEBUG_FLAGS"} \
     "$FS_CONFIG" \
     --num-cpus="$NUM_CPUS" \
     --cpu-type="$CPU_TYPE" \
@@ -104,21 +116,29 @@ DISK_IMAGE=0215-x86-ubuntu-14.04.6.img
     --nvm-start="$NVM_START" \
     --nvm-size="$NVM_SIZE" \
     --pim-se \
+    --pim-num-cpus="$PIM_NUM_CPUS" \
     --pim-cpu-clock="$PIM_CPU_CLOCK" \
     `#--pim-l1i-cache-size="$PIM_L1I_CACHE_SIZE"` \
     `#--pim-l1d-cache-size="$PIM_L1D_CACHE_SIZE"` \
     --pim-bandwidth-ratio="$PIM_BANDWIDTH_RATIO" \
+    --pim-placement="$PIM_PLACEMENT" \
     --pim-spm-start="$PIM_SPM_START" \
     --pim-spm-size="$PIM_SPM_SIZE" \
     --pim-spm-reg-flush-addr="$PIM_SPM_REG_FLUSH_ADDR" \
     --pim-spm-reg-flush-size="$PIM_SPM_REG_FLUSH_SIZE" \
+    --pim-spm-reg-flush-ring-count="$PIM_SPM_REG_FLUSH_RING_COUNT" \
+    --pim-spm-flush-ring-addr="$PIM_SPM_FLUSH_RING_ADDR" \
+    --pim-spm-flush-ring-entries="$PIM_SPM_FLUSH_RING_ENTRIES" \
+    --pim-spm-reg-cmd-addr="$PIM_SPM_REG_CMD_ADDR" \
+    --pim-cmd-trace="$PIM_CMD_TRACE" \
     --pim-se-mem-start="$PIM_SE_MEM_START" \
     --pim-se-mem-size="$PIM_SE_MEM_SIZE" \
     --pim-kernel="$PIM_KERNEL" \
     --pim-se-input="$PIM_SE_INPUT" \
     --pim-se-output="$PIM_SE_OUTPUT" \
     --pim-se-errout="$PIM_SE_ERROUT" \
-    --checkpoint-restore=3 \
+    --checkpoint-dir="$CHECKPOINT_DIR" \
+    --checkpoint-restore="$CHECKPOINT_RESTORE" \
     --restore-with-cpu="$RESTORE_CPU_TYPE" \
     --script="$SCRIPT" \
     --kernel="$KERNEL" \
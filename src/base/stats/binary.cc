@@ -0,0 +1,350 @@
+/*
+ * Copyright (c) 2026 The gem5 Authors
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are
+ * met: redistributions of source code must retain the above copyright
+ * notice, this list of conditions and the following disclaimer;
+ * redistributions in binary form must reproduce the above copyright
+ * notice, this list of conditions and the following disclaimer in the
+ * documentation and/or other materials provided with the distribution;
+ * neither the name of the copyright holders nor the names of its
+ * contributors may be used to endorse or promote products derived from
+ * this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+ * "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+ * LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+ * A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+ * OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+ * SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include "base/stats/binary.hh"
+
+#include <cmath>
+#include <cstring>
+#include <iostream>
+#include <sstream>
+#include <string>
+
+#include "base/logging.hh"
+#include "base/stats/info.hh"
+#include "sim/core.hh"
+
+using namespace std;
+
+namespace Stats {
+
+static const char binaryMagic[] = "gem5stat";
+static const uint32_t binaryVersion = 1;
+
+Binary::Binary()
+    : stream(NULL), rowSize(0), headerWritten(false)
+{
+}
+
+void
+Binary::open(std::ostream &_stream)
+{
+    if (stream)
+        panic("stream already set!");
+
+    stream = &_stream;
+    if (!valid())
+        fatal("Unable to open output stream for writing\n");
+}
+
+bool
+Binary::valid() const
+{
+    return stream != NULL && stream->good();
+}
+
+void
+Binary::begin()
+{
+    values.clear();
+}
+
+void
+Binary::writeHeader()
+{
+    string table;
+    for (const auto &name : names) {
+        table += name;
+        table += '\n';
+    }
+
+    uint32_t count = names.size();
+    uint64_t size = table.size();
+    stream->write(binaryMagic, strlen(binaryMagic));
+    stream->write((const char *)&binaryVersion, sizeof(binaryVersion));
+    stream->write((const char *)&count, sizeof(count));
+    stream->write((const char *)&size, sizeof(size));
+    stream->write(table.data(), table.size());
+}
+
+void
+Binary::end()
+{
+    // The file is recreated empty when the output directory changes,
+    // e.g. in a simulator started by m5.fork(), so the names are kept to
+    // write the header again
+    if (!headerWritten) {
+        rowSize = names.size();
+        headerWritten = true;
+        writeHeader();
+    } else if (values.size() != rowSize) {
+        fatal("The layout of the binary stats changed between dumps\n");
+    } else if (stream->tellp() == 0) {
+        writeHeader();
+    }
+
+    uint64_t tick = curTick();
+    stream->write((const char *)&tick, sizeof(tick));
+    stream->write((const char *)values.data(),
+                  values.size() * sizeof(Result));
+    stream->flush();
+}
+
+bool
+Binary::noOutput(const Info &info)
+{
+    // Unlike the text output, prereq is ignored to keep the layout fixed
+    return !info.flags.isSet(display);
+}
+
+void
+Binary::add(const string &name, Result value)
+{
+    if (!headerWritten)
+        names.push_back(name);
+    values.push_back(value);
+}
+
+void
+Binary::addVector(const string &name, const string &separator,
+                  const vector<string> &subnames, const VResult &vec,
+                  Result total, bool addTotal, bool forceSubnames)
+{
+    size_type size = vec.size();
+    string base = name + separator;
+    bool havesub = !subnames.empty();
+
+    if (size == 1) {
+        if (forceSubnames)
+            add(base + (havesub ? subnames[0] : to_string(0)), vec[0]);
+        else
+            add(name, vec[0]);
+        return;
+    }
+
+    for (off_type i = 0; i < size; ++i) {
+        if (havesub && (i >= subnames.size() || subnames[i].empty()))
+            continue;
+
+        add(base + (havesub ? subnames[i] : to_string(i)), vec[i]);
+    }
+
+    if (addTotal)
+        add(base + "total", total);
+}
+
+void
+Binary::addDist(const string &name, const string &separator,
+                const DistData &data)
+{
+    string base = name + separator;
+
+    if (data.type != Deviation) {
+        add(base + "bucket_size", data.bucket_size);
+        add(base + "min_bucket", data.min);
+        add(base + "max_bucket", data.max);
+    }
+
+    add(base + "samples", data.samples);
+    add(base + "mean", data.samples ? data.sum / data.samples : NAN);
+
+    if (data.type == Hist) {
+        add(base + "gmean",
+            data.samples ? exp(data.logs / data.samples) : NAN);
+    }
+
+    Result stdev = NAN;
+    if (data.samples)
+        stdev = sqrt((data.samples * data.squares - data.sum * data.sum) /
+                     (data.samples * (data.samples - 1.0)));
+    add(base + "stdev", stdev);
+
+    if (data.type == Deviation)
+        return;
+
+    size_t size = data.cvec.size();
+
+    Result total = 0.0;
+    if (data.type == Dist)
+        total += data.underflow;
+    for (off_type i = 0; i < size; ++i)
+        total += data.cvec[i];
+    if (data.type == Dist)
+        total += data.overflow;
+
+    if (data.type == Dist)
+        add(base + "underflows", data.underflow);
+
+    for (off_type i = 0; i < size; ++i) {
+        stringstream namestr;
+        namestr << base;
+        if (data.type == Hist) {
+            // The buckets of a histogram grow between dumps, so they are
+            // named by index, see bucket_size and min_bucket
+            namestr << "bucket_" << i;
+        } else {
+            Counter low = i * data.bucket_size + data.min;
+            Counter high = ::min(low + data.bucket_size - 1.0, data.max);
+            namestr << low;
+            if (low < high)
+                namestr << "-" << high;
+        }
+        add(namestr.str(), data.cvec[i]);
+    }
+
+    if (data.type == Dist) {
+        add(base + "overflows", data.overflow);
+        add(base + "min_value", data.min_val);
+        add(base + "max_value", data.max_val);
+    }
+
+    add(base + "total", total);
+}
+
+void
+Binary::visit(const ScalarInfo &info)
+{
+    if (noOutput(info))
+        return;
+
+    add(info.name, info.result());
+}
+
+void
+Binary::visit(const VectorInfo &info)
+{
+    if (noOutput(info))
+        return;
+
+    vector<string> subnames;
+    for (const auto &subname : info.subnames) {
+        if (!subname.empty()) {
+            subnames = info.subnames;
+            subnames.resize(info.size());
+            break;
+        }
+    }
+
+    addVector(info.name, info.separatorString, subnames, info.result(),
+              info.total(), info.flags.isSet(::Stats::total), false);
+}
+
+void
+Binary::visit(const Vector2dInfo &info)
+{
+    if (noOutput(info))
+        return;
+
+    vector<string> y_subnames;
+    for (off_type i = 0; i < info.y_subnames.size(); ++i) {
+        if (!info.y_subnames[i].empty()) {
+            y_subnames = info.y_subnames;
+            break;
+        }
+    }
+
+    bool havesub = false;
+    for (off_type i = 0; i < info.subnames.size(); ++i)
+        if (!info.subnames[i].empty())
+            havesub = true;
+
+    bool addTotal = info.flags.isSet(::Stats::total);
+    for (off_type i = 0; i < info.x; ++i) {
+        if (havesub && (i >= info.subnames.size() || info.subnames[i].empty()))
+            continue;
+
+        off_type iy = i * info.y;
+        VResult yvec(info.y);
+
+        Result total = 0.0;
+        for (off_type j = 0; j < info.y; ++j) {
+            yvec[j] = info.cvec[iy + j];
+            total += yvec[j];
+        }
+
+        addVector(info.name + "_" +
+                  (havesub ? info.subnames[i] : to_string(i)),
+                  info.separatorString, y_subnames, yvec, total, addTotal,
+                  true);
+    }
+
+    if (addTotal && (info.x > 1)) {
+        addVector(info.name, info.separatorString, vector<string>(1, "total"),
+                  VResult(1, info.total()), 0.0, false, true);
+    }
+}
+
+void
+Binary::visit(const DistInfo &info)
+{
+    if (noOutput(info))
+        return;
+
+    addDist(info.name, info.separatorString, info.data);
+}
+
+void
+Binary::visit(const VectorDistInfo &info)
+{
+    if (noOutput(info))
+        return;
+
+    for (off_type i = 0; i < info.size(); ++i) {
+        addDist(info.name + "_" + (info.subnames[i].empty() ?
+                                   to_string(i) : info.subnames[i]),
+                info.separatorString, info.data[i]);
+    }
+}
+
+void
+Binary::visit(const FormulaInfo &info)
+{
+    visit((const VectorInfo &)info);
+}
+
+void
+Binary::visit(const SparseHistInfo &info)
+{
+    // Sparse histograms have a varying number of entries, which does not
+    // fit into the fixed layout of the rows
+}
+
+Output *
+initBinary(const string &filename)
+{
+    static Binary binary;
+    static bool connected = false;
+
+    if (!connected) {
+        binary.open(*simout.findOrCreate(filename, true)->stream());
+        connected = true;
+    }
+
+    return &binary;
+}
+
+} // namespace Stats
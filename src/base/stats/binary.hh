@@ -0,0 +1,115 @@
+/*
+ * Copyright (c) 2026 The gem5 Authors
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are
+ * met: redistributions of source code must retain the above copyright
+ * notice, this list of conditions and the following disclaimer;
+ * redistributions in binary form must reproduce the above copyright
+ * notice, this list of conditions and the following disclaimer in the
+ * documentation and/or other materials provided with the distribution;
+ * neither the name of the copyright holders nor the names of its
+ * contributors may be used to endorse or promote products derived from
+ * this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+ * "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+ * LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+ * A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+ * OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+ * SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/**
+ * @file
+ * Binary stats output. Every dump is written as a fixed-layout row of
+ * values, so that the stats can be mapped into an array without parsing.
+ *
+ * File layout, in host byte order (util/stats/statsfile.py expects little
+ * endian):
+ *
+ *   magic "gem5stat" | version (uint32) | values per row (uint32)
+ *   name table size (uint64) | name table, '\n' separated
+ *   row 0: tick (uint64) | values (double)
+ *   row 1: ...
+ *
+ * The header is written at the end of the first dump, as the layout of the
+ * rows is only known then, and again whenever the file is recreated (e.g.
+ * by m5.fork()). The names of the values are the ones of the text output,
+ * but all displayed stats are written regardless of their nozero, nonan
+ * and prereq settings so that every row has the same layout.
+ * Sparse histograms have no fixed layout and are not written.
+ */
+
+#ifndef __BASE_STATS_BINARY_HH__
+#define __BASE_STATS_BINARY_HH__
+
+#include <iosfwd>
+#include <string>
+#include <vector>
+
+#include "base/stats/output.hh"
+#include "base/stats/types.hh"
+#include "base/output.hh"
+
+namespace Stats {
+
+struct DistData;
+
+class Binary : public Output
+{
+  protected:
+    std::ostream *stream;
+
+    /** Names of the values of a row, collected during the first dump */
+    std::vector<std::string> names;
+    /** Values of the current dump */
+    std::vector<Result> values;
+    /** Number of values of every row */
+    size_t rowSize;
+    /** Whether the header has been written */
+    bool headerWritten;
+
+  protected:
+    bool noOutput(const Info &info);
+
+    void add(const std::string &name, Result value);
+    void addVector(const std::string &name, const std::string &separator,
+                   const std::vector<std::string> &subnames,
+                   const VResult &vec, Result total, bool addTotal,
+                   bool forceSubnames);
+    void addDist(const std::string &name, const std::string &separator,
+                 const DistData &data);
+    void writeHeader();
+
+  public:
+    Binary();
+
+    void open(std::ostream &stream);
+
+    // Implement Visit
+    virtual void visit(const ScalarInfo &info);
+    virtual void visit(const VectorInfo &info);
+    virtual void visit(const DistInfo &info);
+    virtual void visit(const VectorDistInfo &info);
+    virtual void visit(const Vector2dInfo &info);
+    virtual void visit(const FormulaInfo &info);
+    virtual void visit(const SparseHistInfo &info);
+
+    // Implement Output
+    virtual bool valid() const;
+    virtual void begin();
+    virtual void end();
+};
+
+Output *initBinary(const std::string &filename);
+
+} // namespace Stats
+
+#endif // __BASE_STATS_BINARY_HH__
@@ -13,6 +13,35 @@ class ScratchpadMemory(SimpleMemory):
     latency = '0.12ns'
     bandwidth = '700GB/s'
 
+    ## The SPM can be partitioned into windows of equal size, one per PIM
+    ## CPU. Every window has its own set of registers, at the register
+    ## addresses below plus the offset of the window.
+    num_windows = Param.Unsigned(1, "Number of register windows")
+
     support_flush = Param.Bool(False, "Support cache flush")
     reg_flush_addr = Param.Addr(0, "Flush addr register address")
     reg_flush_size = Param.Addr(0, "Flush size register address")
+
+    ## Batched cache flush. The PIM kernel fills the flush descriptors
+    ## (uint64_t addr, uint32_t size, uint32_t reserved) of the ring and
+    ## writes their number to the ring count register, which flushes all of
+    ## them at once after coalescing adjacent and overlapping ranges.
+    flush_ring_addr = Param.Addr(0, "Flush descriptor ring address")
+    flush_ring_entries = Param.Unsigned(0, "Number of flush descriptors in "
+                                        "the ring, 0 disables the ring")
+    reg_flush_ring_count = Param.Addr(0, "Flush ring count register address")
+
+    ## PIM kernel command profiling. The command values and names match
+    ## enum command_type of pohao_gem5_stuff/pim-kernel/pim-kernel.h.
+    profile_cmds = Param.Bool(False, "Profile the PIM kernel commands")
+    reg_cmd_addr = Param.Addr(0, "Command register address")
+    cmd_names = VectorParam.String(["uninit", "init", "nop",
+                                    "nova_search_rbtree",
+                                    "vfs_search_dcache",
+                                    "nova_file_r", "nova_file_w"],
+                                   "Names of the commands, indexed by value")
+    cmd_done = Param.UInt8(7, "Command value written when a command is done")
+    pim_cpus = VectorParam.BaseCPU([], "PIM CPUs running the commands, "
+                                   "CPU i serves window i % num_windows")
+    cmd_trace_file = Param.String("", "Binary per command trace file, "
+                                  "relative to the output directory")
@@ -88,7 +88,7 @@ Bridge::Bridge(Params *p)
       masterPort(p->name + ".master", *this, slavePort,
                  ticksToCycles(p->ideal ? 0 : p->delay),
                  p->ideal ? (unsigned int)-1 : p->req_size),
-      ideal(p->ideal)
+      ideal(p->ideal), toHost(false)
 {
 }
 
@@ -122,6 +122,8 @@ Bridge::init()
     pimSpm = dynamic_cast<ScratchpadMemory *>
              (SimObject::find("pim_system.spm"));
     fatal_if(!pimSpm, "Cannot find SimObject pim_system.spm");
+
+    toHost = startswith(name(), _pimSystem->name() + ".tohostbridge");
 }
 
 bool
@@ -191,8 +193,7 @@ Bridge::BridgeSlavePort::recvTimingReq(PacketPtr pkt)
     panic_if(pkt->cacheResponding(), "Should not see packets where cache "
              "is responding");
 
-    panic_if(bridge.name() == "pim_system.tohostbridge" &&
-             pkt->masterId() <= 2,
+    panic_if(bridge.toHost && pkt->masterId() <= 2,
              "Should not see packets from master ID %d", pkt->masterId());
 
     // we should not get a new request after committing to retry the
@@ -241,6 +242,9 @@ Bridge::BridgeSlavePort::recvTimingReq(PacketPtr pkt)
 
             masterPort.schedTimingReq(pkt, bridge.clockEdge(delay) +
                                       receive_delay);
+
+            if (bridge.toHost)
+                bridge.pimSpm->recordHostAccess(pkt);
         }
     }
 
@@ -401,10 +405,12 @@ Bridge::BridgeSlavePort::recvAtomic(PacketPtr pkt)
     panic_if(pkt->cacheResponding(), "Should not see packets where cache "
              "is responding");
 
-    panic_if(bridge.name() == "pim_system.tohostbridge" &&
-             pkt->masterId() <= 2,
+    panic_if(bridge.toHost && pkt->masterId() <= 2,
              "Should not see packets from master ID %d", pkt->masterId());
 
+    if (bridge.toHost)
+        bridge.pimSpm->recordHostAccess(pkt);
+
     Tick latency;
     if (bridge.pktFromPIM(pkt) || bridge.pktToPimSpm(pkt))
         latency = 0;
@@ -417,8 +423,7 @@ Bridge::BridgeSlavePort::recvAtomic(PacketPtr pkt)
 void
 Bridge::BridgeSlavePort::recvFunctional(PacketPtr pkt)
 {
-    panic_if(bridge.name() == "pim_system.tohostbridge" &&
-             pkt->masterId() <= 2,
+    panic_if(bridge.toHost && pkt->masterId() <= 2,
              "Should not see packets from master ID %d", pkt->masterId());
 
     pkt->pushLabel(name());
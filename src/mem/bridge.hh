@@ -323,6 +323,8 @@ class Bridge : public ClockedObject
     const bool ideal;
     System *_pimSystem;
     ScratchpadMemory *pimSpm;
+    /** Bridge from the PIM system to the host memory */
+    bool toHost;
     bool pktFromPIM(PacketPtr pkt) const;
     bool pktToPimSpm(PacketPtr pkt) const;
 
@@ -0,0 +1,304 @@
+/*
+ * Copyright (c) 2026 The gem5 Authors
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are
+ * met: redistributions of source code must retain the above copyright
+ * notice, this list of conditions and the following disclaimer;
+ * redistributions in binary form must reproduce the above copyright
+ * notice, this list of conditions and the following disclaimer in the
+ * documentation and/or other materials provided with the distribution;
+ * neither the name of the copyright holders nor the names of its
+ * contributors may be used to endorse or promote products derived from
+ * this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+ * "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+ * LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+ * A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+ * OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+ * SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include "mem/page_store.hh"
+
+#include <sys/stat.h>
+#include <sys/types.h>
+#include <unistd.h>
+#include <zlib.h>
+
+#include <algorithm>
+#include <cassert>
+#include <cerrno>
+#include <cstdio>
+#include <cstring>
+#include <fstream>
+#include <sstream>
+#include <thread>
+#include <vector>
+
+#include "base/logging.hh"
+
+using namespace std;
+
+static const char tableMagic[] = "gem5pgtb";
+static const uint32_t tableVersion = 1;
+
+static inline uint64_t
+rotl64(uint64_t x, int r)
+{
+    return (x << r) | (x >> (64 - r));
+}
+
+static inline uint64_t
+fmix64(uint64_t k)
+{
+    k ^= k >> 33;
+    k *= 0xff51afd7ed558ccdULL;
+    k ^= k >> 33;
+    k *= 0xc4ceb9fe1a85ec53ULL;
+    k ^= k >> 33;
+    return k;
+}
+
+static bool
+isZero(const uint8_t *page, size_t size)
+{
+    const uint64_t *words = (const uint64_t *)page;
+    for (size_t i = 0; i < size / sizeof(uint64_t); ++i) {
+        if (words[i] != 0)
+            return false;
+    }
+    return true;
+}
+
+static void
+makeDir(const string &dir)
+{
+    if (mkdir(dir.c_str(), 0755) != 0 && errno != EEXIST)
+        fatal("Failed to create page pool directory '%s'\n", dir);
+}
+
+/**
+ * Run func(first, last) on the pages of [0, num_pages) split in contiguous
+ * ranges over a number of threads.
+ */
+template <class F>
+static void
+parallelPages(unsigned threads, uint64_t num_pages, F func)
+{
+    if (threads > num_pages)
+        threads = num_pages;
+    if (threads <= 1) {
+        func(0, num_pages);
+        return;
+    }
+
+    vector<thread> workers;
+    uint64_t per_thread = (num_pages + threads - 1) / threads;
+    for (uint64_t first = 0; first < num_pages; first += per_thread) {
+        uint64_t last = min(first + per_thread, num_pages);
+        workers.emplace_back(func, first, last);
+    }
+    for (auto &worker : workers)
+        worker.join();
+}
+
+PageStore::PageStore(const string &pool, unsigned _threads)
+    : _pool(pool), threads(_threads)
+{
+    if (threads == 0)
+        threads = max(thread::hardware_concurrency(), 1U);
+}
+
+PageStore::PageHash
+PageStore::hashPage(const uint8_t *page, size_t size)
+{
+    // MurmurHash3_x64_128, the page size is a multiple of the block size
+    const uint64_t c1 = 0x87c37b91114253d5ULL;
+    const uint64_t c2 = 0x4cf5ad432745937fULL;
+    const uint64_t *blocks = (const uint64_t *)page;
+
+    assert(size % 16 == 0);
+
+    uint64_t h1 = 0;
+    uint64_t h2 = 0;
+    for (size_t i = 0; i < size / 16; ++i) {
+        uint64_t k1 = blocks[i * 2];
+        uint64_t k2 = blocks[i * 2 + 1];
+
+        k1 *= c1; k1 = rotl64(k1, 31); k1 *= c2; h1 ^= k1;
+        h1 = rotl64(h1, 27); h1 += h2; h1 = h1 * 5 + 0x52dce729;
+
+        k2 *= c2; k2 = rotl64(k2, 33); k2 *= c1; h2 ^= k2;
+        h2 = rotl64(h2, 31); h2 += h1; h2 = h2 * 5 + 0x38495ab5;
+    }
+
+    h1 ^= size;
+    h2 ^= size;
+    h1 += h2;
+    h2 += h1;
+    h1 = fmix64(h1);
+    h2 = fmix64(h2);
+    h1 += h2;
+    h2 += h1;
+
+    return PageHash{h1, h2};
+}
+
+string
+PageStore::pagePath(const PageHash &hash) const
+{
+    // The digits are the ones of the hash bytes, h1 and h2 in little endian
+    char digits[33];
+    const uint64_t words[2] = { hash.h1, hash.h2 };
+    for (int i = 0; i < 16; ++i)
+        snprintf(digits + 2 * i, 3, "%02x",
+                 (unsigned)((words[i / 8] >> (8 * (i % 8))) & 0xff));
+
+    return _pool + "/" + string(digits, 2) + "/" + string(digits + 2, 2) +
+        "/" + digits;
+}
+
+void
+PageStore::savePage(const PageHash &hash, const uint8_t *page,
+                    size_t size) const
+{
+    string path = pagePath(hash);
+    if (access(path.c_str(), F_OK) == 0)
+        return;
+
+    makeDir(path.substr(0, _pool.size() + 3));
+    makeDir(path.substr(0, _pool.size() + 6));
+
+    vector<uint8_t> buf(compressBound(size));
+    uLongf buf_size = buf.size();
+    const uint8_t *data = page;
+    size_t data_size = size;
+    if (compress2(buf.data(), &buf_size, page, size, Z_BEST_SPEED) == Z_OK &&
+        buf_size < size) {
+        data = buf.data();
+        data_size = buf_size;
+    }
+
+    // Write to a temporary file and rename it, so that other simulators
+    // sharing the pool never see a partly written page
+    stringstream tmp;
+    tmp << path << ".tmp." << getpid() << "." << this_thread::get_id();
+    ofstream out(tmp.str(), ios::binary);
+    out.write((const char *)data, data_size);
+    out.close();
+    if (!out || rename(tmp.str().c_str(), path.c_str()) != 0)
+        fatal("Write failed on memory page '%s'\n", path);
+}
+
+void
+PageStore::loadPage(const PageHash &hash, uint8_t *page, size_t size) const
+{
+    string path = pagePath(hash);
+    ifstream in(path, ios::binary | ios::ate);
+    if (!in)
+        fatal("Can't open memory page '%s'\n", path);
+
+    size_t file_size = in.tellg();
+    in.seekg(0);
+    if (file_size == size) {
+        in.read((char *)page, size);
+        if (!in)
+            fatal("Read failed on memory page '%s'\n", path);
+        return;
+    }
+
+    vector<uint8_t> buf(file_size);
+    in.read((char *)buf.data(), file_size);
+    uLongf page_size = size;
+    if (!in || uncompress(page, &page_size, buf.data(), file_size) != Z_OK ||
+        page_size != size) {
+        fatal("Read failed on memory page '%s'\n", path);
+    }
+}
+
+void
+PageStore::save(const string &table, const uint8_t *pmem,
+                uint64_t size) const
+{
+    const uint32_t page_size = defaultPageSize;
+    const uint64_t num_pages = size / page_size;
+
+    fatal_if(size % page_size, "Memory size %d is not a multiple of the "
+             "page size\n", size);
+
+    makeDir(_pool);
+
+    vector<PageHash> hashes(num_pages);
+    parallelPages(threads, num_pages, [&](uint64_t first, uint64_t last) {
+        for (uint64_t i = first; i < last; ++i) {
+            const uint8_t *page = pmem + i * page_size;
+            if (isZero(page, page_size)) {
+                hashes[i] = PageHash{0, 0};
+                continue;
+            }
+            hashes[i] = hashPage(page, page_size);
+            savePage(hashes[i], page, page_size);
+        }
+    });
+
+    ofstream out(table, ios::binary);
+    out.write(tableMagic, strlen(tableMagic));
+    out.write((const char *)&tableVersion, sizeof(tableVersion));
+    out.write((const char *)&page_size, sizeof(page_size));
+    out.write((const char *)&num_pages, sizeof(num_pages));
+    for (const auto &hash : hashes) {
+        out.write((const char *)&hash.h1, sizeof(hash.h1));
+        out.write((const char *)&hash.h2, sizeof(hash.h2));
+    }
+    out.close();
+    if (!out)
+        fatal("Write failed on memory page table '%s'\n", table);
+}
+
+void
+PageStore::load(const string &table, uint8_t *pmem, uint64_t size) const
+{
+    ifstream in(table, ios::binary);
+    if (!in)
+        fatal("Can't open memory page table '%s'\n", table);
+
+    char magic[sizeof(tableMagic) - 1];
+    uint32_t version, page_size;
+    uint64_t num_pages;
+    in.read(magic, sizeof(magic));
+    in.read((char *)&version, sizeof(version));
+    in.read((char *)&page_size, sizeof(page_size));
+    in.read((char *)&num_pages, sizeof(num_pages));
+
+    if (!in || memcmp(magic, tableMagic, sizeof(magic)) != 0)
+        fatal("'%s' is not a memory page table\n", table);
+    if (version != tableVersion)
+        fatal("Memory page table '%s' has unsupported version %d\n",
+              table, version);
+    if (num_pages * page_size != size)
+        fatal("Memory page table '%s' has size %d, expected %d\n",
+              table, num_pages * page_size, size);
+
+    vector<PageHash> hashes(num_pages);
+    for (auto &hash : hashes) {
+        in.read((char *)&hash.h1, sizeof(hash.h1));
+        in.read((char *)&hash.h2, sizeof(hash.h2));
+    }
+    if (!in)
+        fatal("Memory page table '%s' is truncated\n", table);
+
+    parallelPages(threads, num_pages, [&](uint64_t first, uint64_t last) {
+        for (uint64_t i = first; i < last; ++i) {
+            if (!hashes[i].zero())
+                loadPage(hashes[i], pmem + i * page_size, page_size);
+        }
+    });
+}
@@ -0,0 +1,120 @@
+/*
+ * Copyright (c) 2026 The gem5 Authors
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are
+ * met: redistributions of source code must retain the above copyright
+ * notice, this list of conditions and the following disclaimer;
+ * redistributions in binary form must reproduce the above copyright
+ * notice, this list of conditions and the following disclaimer in the
+ * documentation and/or other materials provided with the distribution;
+ * neither the name of the copyright holders nor the names of its
+ * contributors may be used to endorse or promote products derived from
+ * this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+ * "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+ * LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+ * A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+ * OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+ * SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+/**
+ * @file
+ * Deduplicated store of the memory images of checkpoints. The memory is
+ * split into fixed-size pages, and only the unique non-zero pages are kept
+ * in a pool directory that can be shared by many checkpoints. A checkpoint
+ * only holds a page table with the hash of every page.
+ *
+ * Pool layout, a page is stored once under the hex digits of its hash:
+ *
+ *   <pool>/<digits 0-1>/<digits 2-3>/<32 hex digits>
+ *
+ * A page file holds the zlib compressed page, or the raw page if it does
+ * not compress. Page table layout, in host byte order
+ * (util/memory_pages.py expects little endian):
+ *
+ *   magic "gem5pgtb" | version (uint32) | page size (uint32)
+ *   number of pages (uint64)
+ *   hash of every page (16 bytes), all zero for a zero page
+ *
+ * The hash is the 128 bit MurmurHash3 (x64 variant, seed 0) of the page,
+ * h1 followed by h2.
+ */
+
+#ifndef __MEM_PAGE_STORE_HH__
+#define __MEM_PAGE_STORE_HH__
+
+#include <cstdint>
+#include <string>
+
+class PageStore
+{
+  public:
+
+    /**
+     * The hash of a page.
+     */
+    struct PageHash
+    {
+        uint64_t h1;
+        uint64_t h2;
+
+        bool zero() const { return h1 == 0 && h2 == 0; }
+    };
+
+    static const uint32_t defaultPageSize = 4096;
+
+    /**
+     * Create a page store.
+     *
+     * @param pool Directory of the page pool
+     * @param threads Number of threads to save and load pages with, 0 for
+     *                one per host CPU
+     */
+    PageStore(const std::string &pool, unsigned threads = 0);
+
+    /**
+     * Store a memory image in the pool and write its page table.
+     *
+     * @param table Path of the page table
+     * @param pmem Memory image
+     * @param size Size of the memory image, a multiple of the page size
+     */
+    void save(const std::string &table, const uint8_t *pmem,
+              uint64_t size) const;
+
+    /**
+     * Load a memory image from a page table and the pool. Zero pages are
+     * not written, so pmem is expected to be zero.
+     *
+     * @param table Path of the page table
+     * @param pmem Memory image
+     * @param size Size of the memory image
+     */
+    void load(const std::string &table, uint8_t *pmem, uint64_t size) const;
+
+    static PageHash hashPage(const uint8_t *page, size_t size);
+
+    const std::string &pool() const { return _pool; }
+
+  private:
+
+    std::string _pool;
+    unsigned threads;
+
+    std::string pagePath(const PageHash &hash) const;
+
+    void savePage(const PageHash &hash, const uint8_t *page,
+                  size_t size) const;
+    void loadPage(const PageHash &hash, uint8_t *page, size_t size) const;
+};
+
+#endif // __MEM_PAGE_STORE_HH__
@@ -0,0 +1,142 @@
+/*
+ * Copyright (c) 2026 The gem5 Authors
+ * All rights reserved.
+ *
+ * Redistribution and use in source and binary forms, with or without
+ * modification, are permitted provided that the following conditions are
+ * met: redistributions of source code must retain the above copyright
+ * notice, this list of conditions and the following disclaimer;
+ * redistributions in binary form must reproduce the above copyright
+ * notice, this list of conditions and the following disclaimer in the
+ * documentation and/or other materials provided with the distribution;
+ * neither the name of the copyright holders nor the names of its
+ * contributors may be used to endorse or promote products derived from
+ * this software without specific prior written permission.
+ *
+ * THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+ * "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+ * LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+ * A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+ * OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+ * SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+ * LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+ * DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+ * THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+ * (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+ * OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+ */
+
+#include <gtest/gtest.h>
+
+#include <sys/stat.h>
+
+#include <cstdlib>
+#include <cstring>
+#include <string>
+#include <vector>
+
+#include "mem/page_store.hh"
+
+namespace {
+
+const size_t pageSize = PageStore::defaultPageSize;
+
+/** A page whose bytes count up from 0, wrapping at 256 */
+std::vector<uint8_t>
+patternPage()
+{
+    std::vector<uint8_t> page(pageSize);
+    for (size_t i = 0; i < pageSize; ++i)
+        page[i] = i & 0xff;
+    return page;
+}
+
+/** A temporary page pool that is removed with all its pages */
+class PageStoreTest : public ::testing::Test
+{
+  protected:
+    std::string dir;
+
+    void
+    SetUp() override
+    {
+        char name[] = "/tmp/page_store.test.XXXXXX";
+        ASSERT_NE(mkdtemp(name), nullptr);
+        dir = name;
+    }
+
+    void
+    TearDown() override
+    {
+        ASSERT_EQ(std::system(("rm -rf '" + dir + "'").c_str()), 0);
+    }
+
+    /**
+     * Save an image with a zero page, two copies of the same page and a
+     * page that does not compress, and load it again.
+     */
+    void
+    roundTrip(unsigned threads)
+    {
+        std::vector<uint8_t> image(4 * pageSize, 0);
+        const std::vector<uint8_t> pattern = patternPage();
+        std::memcpy(&image[pageSize], pattern.data(), pageSize);
+        std::memcpy(&image[2 * pageSize], pattern.data(), pageSize);
+        uint64_t x = 0x123456789abcdefULL;
+        for (size_t i = 3 * pageSize; i < image.size(); ++i) {
+            x ^= x << 13; x ^= x >> 7; x ^= x << 17;
+            image[i] = x;
+        }
+
+        const std::string table = dir + "/system.physmem.store0.pages";
+        PageStore store(dir + "/pool", threads);
+        store.save(table, image.data(), image.size());
+
+        // header (24 bytes) and one hash per page
+        struct stat st;
+        ASSERT_EQ(stat(table.c_str(), &st), 0);
+        EXPECT_EQ(st.st_size, 24 + 4 * 16);
+
+        std::vector<uint8_t> loaded(image.size(), 0);
+        store.load(table, loaded.data(), loaded.size());
+        EXPECT_EQ(loaded, image);
+    }
+};
+
+} // anonymous namespace
+
+/*
+ * The expected values are the ones of the reference MurmurHash3_x64_128,
+ * e.g. hash64() of the Python mmh3 module with seed 0.
+ */
+TEST(PageStoreHash, KnownAnswer)
+{
+    const char *block = "0123456789abcdef";
+    PageStore::PageHash hash =
+        PageStore::hashPage((const uint8_t *)block, 16);
+    EXPECT_EQ(hash.h1, 0x4be06d94cf4ad1a7ULL);
+    EXPECT_EQ(hash.h2, 0x87c35b5c63a708daULL);
+
+    const std::vector<uint8_t> page = patternPage();
+    hash = PageStore::hashPage(page.data(), page.size());
+    EXPECT_EQ(hash.h1, 0xf4c4a803a564957aULL);
+    EXPECT_EQ(hash.h2, 0x836898c60fbb77bbULL);
+    EXPECT_FALSE(hash.zero());
+}
+
+TEST_F(PageStoreTest, RoundTrip)
+{
+    roundTrip(1);
+}
+
+TEST_F(PageStoreTest, RoundTripThreads)
+{
+    roundTrip(4);
+}
+
+TEST_F(PageStoreTest, SharedPool)
+{
+    // A second checkpoint of the same image only adds its page table
+    roundTrip(2);
+    roundTrip(2);
+}
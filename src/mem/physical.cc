@@ -56,6 +56,7 @@
 #include "debug/AddrRanges.hh"
 #include "debug/Checkpoint.hh"
 #include "mem/abstract_mem.hh"
+#include "mem/page_store.hh"
 
 /**
  * On Linux, MAP_NORESERVE allow us to simulate a very large memory
@@ -73,8 +74,11 @@ using namespace std;
 
 PhysicalMemory::PhysicalMemory(const string& _name,
                                const vector<AbstractMemory*>& _memories,
-                               bool mmap_using_noreserve) :
-    _name(_name), size(0), mmapUsingNoReserve(mmap_using_noreserve)
+                               bool mmap_using_noreserve,
+                               const string& page_pool,
+                               unsigned page_threads) :
+    _name(_name), size(0), mmapUsingNoReserve(mmap_using_noreserve),
+    pagePool(page_pool), pageThreads(page_threads)
 {
     if (mmap_using_noreserve)
         warn("Not reserving swap space. May cause SIGSEGV on actual usage\n");
@@ -331,6 +335,40 @@ PhysicalMemory::serializeStore(CheckpointOut &cp, unsigned int store_id,
     string filename = name() + ".store" + to_string(store_id) + ".pmem";
     long range_size = range.size();
 
+    // store the unique pages in the page pool and only a table of
+    // their hashes in the checkpoint
+    if (!pagePool.empty() &&
+        range.size() % PageStore::defaultPageSize == 0) {
+        filename = name() + ".store" + to_string(store_id) + ".pages";
+
+        // a relative pool is relative to the working directory of the
+        // simulator, record it as an absolute path so that the
+        // checkpoint can be restored from anywhere
+        string page_pool = pagePool;
+        if (page_pool[0] != '/') {
+            char cwd[PATH_MAX];
+            if (!getcwd(cwd, sizeof(cwd)))
+                fatal("Can't get the working directory for page pool %s\n",
+                      page_pool);
+            page_pool = string(cwd) + "/" + page_pool;
+        }
+
+        DPRINTF(Checkpoint, "Serializing physical memory %s with size %d "
+                "to page pool %s\n", filename, range_size, page_pool);
+
+        SERIALIZE_SCALAR(store_id);
+        SERIALIZE_SCALAR(filename);
+        SERIALIZE_SCALAR(range_size);
+        SERIALIZE_SCALAR(page_pool);
+
+        PageStore(page_pool, pageThreads).save(
+            CheckpointIn::dir() + "/" + filename, pmem, range.size());
+        return;
+    } else if (!pagePool.empty()) {
+        warn("Memory size of %s is not a multiple of the page size, "
+             "writing a memory image\n", filename);
+    }
+
     DPRINTF(Checkpoint, "Serializing physical memory %s with size %d\n",
             filename, range_size);
 
@@ -405,11 +443,6 @@ PhysicalMemory::unserializeStore(CheckpointIn &cp)
     UNSERIALIZE_SCALAR(filename);
     string filepath = cp.cptDir + "/" + filename;
 
-    // mmap memoryfile
-    gzFile compressed_mem = gzopen(filepath.c_str(), "rb");
-    if (compressed_mem == NULL)
-        fatal("Can't open physical memory checkpoint file '%s'", filename);
-
     // we've already got the actual backing store mapped
     uint8_t* pmem = backingStore[store_id].pmem;
     AddrRange range = backingStore[store_id].range;
@@ -424,6 +457,22 @@ PhysicalMemory::unserializeStore(CheckpointIn &cp)
         fatal("Memory range size has changed! Saw %lld, expected %lld\n",
               range_size, range.size());
 
+    // the memory was stored in a page pool, the pool is recorded as an
+    // absolute path, but a relative pool (e.g. of a checkpoint written
+    // by hand) is relative to the checkpoint directory
+    string page_pool;
+    if (optParamIn(cp, "page_pool", page_pool, false)) {
+        if (page_pool[0] != '/')
+            page_pool = cp.cptDir + "/" + page_pool;
+        PageStore(page_pool, pageThreads).load(filepath, pmem, range.size());
+        return;
+    }
+
+    // mmap memoryfile
+    gzFile compressed_mem = gzopen(filepath.c_str(), "rb");
+    if (compressed_mem == NULL)
+        fatal("Can't open physical memory checkpoint file '%s'", filename);
+
     uint64_t curr_size = 0;
     long* temp_page = new long[chunk_size];
     long* pmem_current;
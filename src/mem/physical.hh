@@ -129,6 +129,13 @@ class PhysicalMemory : public Serializable
     // Let the user choose if we reserve swap space when calling mmap
     const bool mmapUsingNoReserve;
 
+    // Directory of the shared page pool to checkpoint the memory into,
+    // empty to write gzip memory images
+    const std::string pagePool;
+
+    // Number of threads to save and load memory pages with
+    const unsigned pageThreads;
+
     // The physical memory used to provide the memory in the simulated
     // system
     std::vector<BackingStoreEntry> backingStore;
@@ -160,7 +167,9 @@ class PhysicalMemory : public Serializable
      */
     PhysicalMemory(const std::string& _name,
                    const std::vector<AbstractMemory*>& _memories,
-                   bool mmap_using_noreserve);
+                   bool mmap_using_noreserve,
+                   const std::string& page_pool = "",
+                   unsigned page_threads = 0);
 
     /**
      * Unmap all the backing store we have used.
@@ -1,21 +1,71 @@
 #include "mem/scratchpad_mem.hh"
 
+#include <algorithm>
+
+#include "base/callback.hh"
+#include "base/output.hh"
+#include "base/str.hh"
+#include "cpu/base.hh"
 #include "debug/ScratchpadMemory.hh"
 #include "mem/cache/cache.hh"
 #include "mem/packet_access.hh"
+#include "sim/core.hh"
 
 ScratchpadMemory::ScratchpadMemory(const ScratchpadMemoryParams *p) :
     SimpleMemory(p),
+    num_windows(p->num_windows),
+    // num_windows is checked below, don't divide by zero before
+    window_size(p->num_windows ? p->range.size() / p->num_windows : 0),
     support_flush(p->support_flush),
     reg_flush_addr(p->reg_flush_addr),
-    reg_flush_size(p->reg_flush_size)
+    reg_flush_size(p->reg_flush_size),
+    flush_ring_addr(p->flush_ring_addr),
+    flush_ring_entries(p->flush_ring_entries),
+    reg_flush_ring_count(p->reg_flush_ring_count),
+    profile_cmds(p->profile_cmds),
+    reg_cmd_addr(p->reg_cmd_addr),
+    cmd_names(p->cmd_names),
+    cmd_done(p->cmd_done),
+    pimCpus(p->pim_cpus),
+    cmdStates(p->num_windows, CmdState()),
+    cmdTrace(nullptr)
 {
+    if (!num_windows || range.size() % num_windows)
+        fatal("SPM size is not a multiple of the %u windows", num_windows);
+
+    // All registers are given in the first window
+    const AddrRange window(range.start(), range.start() + window_size - 1);
+
     if (support_flush) {
-        if (!range.contains(reg_flush_addr))
+        if (!window.contains(reg_flush_addr))
             fatal("SPM rangs does not contain reg_flush_addr");
-        if (!range.contains(reg_flush_size))
+        if (!window.contains(reg_flush_size))
             fatal("SPM rangs does not contain reg_flush_size");
     }
+
+    if (support_flush && flush_ring_entries) {
+        if (!window.contains(flush_ring_addr) ||
+            !window.contains(flush_ring_addr +
+                             flush_ring_entries * sizeof(FlushDesc) - 1))
+            fatal("SPM rangs does not contain the flush ring");
+        if (!window.contains(reg_flush_ring_count))
+            fatal("SPM rangs does not contain reg_flush_ring_count");
+    }
+
+    if (profile_cmds) {
+        if (!window.contains(reg_cmd_addr))
+            fatal("SPM rangs does not contain reg_cmd_addr");
+        if (cmd_done < cmd_names.size())
+            fatal("cmd_done cannot be the value of a named command");
+
+        if (!p->cmd_trace_file.empty()) {
+            cmdTrace = simout.create(p->cmd_trace_file, true);
+            // The destructor is not called at the end of the simulation,
+            // so close the trace from an exit callback
+            registerExitCallback(new MakeCallback<ScratchpadMemory,
+                &ScratchpadMemory::closeCmdTrace>(this));
+        }
+    }
 }
 
 void
@@ -65,6 +115,202 @@ ScratchpadMemory::init()
         DPRINTF(ScratchpadMemory, "\t%d: %s\n", i, _system->getMasterName(i));
 }
 
+void
+ScratchpadMemory::regStats()
+{
+    SimpleMemory::regStats();
+
+    using namespace Stats;
+
+    if (!profile_cmds)
+        return;
+
+    cmdInvocations
+        .init(cmd_names.size())
+        .name(name() + ".cmd_invocations")
+        .desc("Number of completed PIM kernel commands")
+        .flags(total | nozero | nonan)
+        ;
+    cmdWaitTicks
+        .init(cmd_names.size())
+        .name(name() + ".cmd_wait_ticks")
+        .desc("Ticks from issuing a PIM kernel command to its completion")
+        .flags(total | nozero | nonan)
+        ;
+    cmdPimCycles
+        .init(cmd_names.size())
+        .name(name() + ".cmd_pim_cycles")
+        .desc("PIM CPU cycles spent on PIM kernel commands")
+        .flags(total | nozero | nonan)
+        ;
+    cmdFlushes
+        .init(cmd_names.size())
+        .name(name() + ".cmd_flushes")
+        .desc("Number of host cache flushes requested by PIM kernel "
+              "commands")
+        .flags(total | nozero | nonan)
+        ;
+    cmdFlushBytes
+        .init(cmd_names.size())
+        .name(name() + ".cmd_flush_bytes")
+        .desc("Bytes of host cache flush ranges requested by PIM kernel "
+              "commands")
+        .flags(total | nozero | nonan)
+        ;
+    cmdHostBytesRead
+        .init(cmd_names.size())
+        .name(name() + ".cmd_host_bytes_read")
+        .desc("Bytes of host memory read by PIM kernel commands")
+        .flags(total | nozero | nonan)
+        ;
+    cmdHostBytesWritten
+        .init(cmd_names.size())
+        .name(name() + ".cmd_host_bytes_written")
+        .desc("Bytes of host memory written by PIM kernel commands")
+        .flags(total | nozero | nonan)
+        ;
+    cmdAvgWaitTicks
+        .name(name() + ".cmd_avg_wait_ticks")
+        .desc("Average ticks from issuing a PIM kernel command to its "
+              "completion")
+        .flags(total | nozero | nonan)
+        ;
+    cmdAvgPimCycles
+        .name(name() + ".cmd_avg_pim_cycles")
+        .desc("Average PIM CPU cycles per PIM kernel command")
+        .flags(total | nozero | nonan)
+        ;
+
+    for (int i = 0; i < cmd_names.size(); ++i) {
+        cmdInvocations.subname(i, cmd_names[i]);
+        cmdWaitTicks.subname(i, cmd_names[i]);
+        cmdPimCycles.subname(i, cmd_names[i]);
+        cmdFlushes.subname(i, cmd_names[i]);
+        cmdFlushBytes.subname(i, cmd_names[i]);
+        cmdHostBytesRead.subname(i, cmd_names[i]);
+        cmdHostBytesWritten.subname(i, cmd_names[i]);
+    }
+
+    cmdAvgWaitTicks = cmdWaitTicks / cmdInvocations;
+    cmdAvgPimCycles = cmdPimCycles / cmdInvocations;
+}
+
+void
+ScratchpadMemory::closeCmdTrace()
+{
+    if (cmdTrace) {
+        simout.close(cmdTrace);
+        cmdTrace = nullptr;
+    }
+}
+
+Addr
+ScratchpadMemory::windowBase(const Addr addr) const
+{
+    return (addr - range.start()) / window_size * window_size;
+}
+
+int
+ScratchpadMemory::masterWindow(const MasterID master_id)
+{
+    if (num_windows == 1)
+        return 0;
+
+    auto it = masterWindows.find(master_id);
+    if (it != masterWindows.end())
+        return it->second;
+
+    const std::string master = _system->getMasterName(master_id);
+    int window = -1;
+    for (int i = 0; i < pimCpus.size(); ++i) {
+        if (startswith(master, pimCpus[i]->name() + ".")) {
+            window = i % num_windows;
+            break;
+        }
+    }
+
+    masterWindows[master_id] = window;
+    return window;
+}
+
+BaseCPU *
+ScratchpadMemory::windowCpu(const int window) const
+{
+    return pimCpus.empty() ? nullptr : pimCpus[window % pimCpus.size()];
+}
+
+void
+ScratchpadMemory::profileCmd(const PacketPtr pkt)
+{
+    assert(pkt);
+
+    if (!profile_cmds || !pkt->isWrite())
+        return;
+
+    const Addr base = windowBase(pkt->getAddr());
+    if (!pkt->getAddrRange().contains(reg_cmd_addr + base))
+        return;
+
+    const int window = base / window_size;
+    CmdState &state = cmdStates[window];
+    BaseCPU *cpu = windowCpu(window);
+    const uint8_t cmd =
+        pkt->getConstPtr<uint8_t>()[reg_cmd_addr + base - pkt->getAddr()];
+
+    if (cmd == cmd_done) {
+        if (!state.active)
+            return;
+
+        CmdRecord &rec = state.rec;
+        state.active = false;
+        rec.endTick = curTick();
+        rec.pimCycles = cpu ? cpu->curCycle() - state.startCycle : 0;
+
+        const int i = rec.cmd;
+        ++cmdInvocations[i];
+        cmdWaitTicks[i] += rec.endTick - rec.startTick;
+        cmdPimCycles[i] += rec.pimCycles;
+        cmdFlushes[i] += rec.flushes;
+        cmdFlushBytes[i] += rec.flushBytes;
+        cmdHostBytesRead[i] += rec.hostBytesRead;
+        cmdHostBytesWritten[i] += rec.hostBytesWritten;
+
+        DPRINTF(ScratchpadMemory, "window %d command %s done: %llu ticks, "
+                "%llu PIM cycles, %u flushes\n", window, cmd_names[i],
+                rec.endTick - rec.startTick, rec.pimCycles, rec.flushes);
+
+        if (cmdTrace)
+            cmdTrace->stream()->write((const char *)&rec, sizeof(rec));
+    } else if (cmd < cmd_names.size()) {
+        // A command that never completed (e.g. init) is superseded
+        state.active = true;
+        state.rec = CmdRecord();
+        state.rec.cmd = cmd;
+        state.rec.window = window;
+        state.rec.startTick = curTick();
+        state.startCycle = cpu ? cpu->curCycle() : Cycles(0);
+    }
+}
+
+void
+ScratchpadMemory::recordHostAccess(const PacketPtr pkt)
+{
+    assert(pkt);
+
+    if (!profile_cmds)
+        return;
+
+    const int window = masterWindow(pkt->masterId());
+    if (window < 0 || !cmdStates[window].active)
+        return;
+
+    CmdRecord &rec = cmdStates[window].rec;
+    if (pkt->isRead())
+        rec.hostBytesRead += pkt->getSize();
+    else if (pkt->isWrite())
+        rec.hostBytesWritten += pkt->getSize();
+}
+
 const uint32_t *
 ScratchpadMemory::readMem_l(const Addr addr) const
 {
@@ -93,27 +339,116 @@ ScratchpadMemory::flushSystemDcaches(const Addr addr,
         dcaches[i]->flushCacheRange(addr, size);
 }
 
+unsigned
+ScratchpadMemory::flushRing(const Addr base, const unsigned count) const
+{
+    assert(count > 0 && count <= flush_ring_entries);
+
+    const FlushDesc *ring = (const FlushDesc *)
+        (pmemAddr + (flush_ring_addr + base - range.start()));
+
+    std::vector<AddrRange> ranges;
+    ranges.reserve(count);
+    for (unsigned i = 0; i < count; ++i) {
+        if (ring[i].size)
+            ranges.push_back(RangeSize(ring[i].addr, ring[i].size));
+    }
+
+    if (ranges.empty())
+        return 0;
+
+    // Coalesce overlapping ranges and ranges that touch the same or
+    // adjacent cache lines, so every line is looked up only once
+    std::sort(ranges.begin(), ranges.end(),
+              [](const AddrRange &a, const AddrRange &b)
+              { return a.start() < b.start(); });
+
+    const Addr line_size = _system->cacheLineSize();
+    Addr start = ranges[0].start();
+    Addr end = ranges[0].end();
+    unsigned flushes = 0;
+
+    for (int i = 1; i <= ranges.size(); ++i) {
+        if (i < ranges.size() &&
+            roundDown(ranges[i].start(), line_size) <=
+            roundUp(end + 1, line_size)) {
+            end = std::max(end, ranges[i].end());
+            continue;
+        }
+
+        DPRINTF(ScratchpadMemory, "ring flush %#x-%#x\n", start, end);
+        // Cache::flushCacheRange() takes a 32 bit size
+        Addr left = end - start + 1;
+        for (Addr addr = start; left; ) {
+            const uint32_t size = std::min<Addr>(left, 0x80000000);
+            flushSystemDcaches(addr, size);
+            addr += size;
+            left -= size;
+        }
+        ++flushes;
+
+        if (i < ranges.size()) {
+            start = ranges[i].start();
+            end = ranges[i].end();
+        }
+    }
+
+    return flushes;
+}
+
 bool
-ScratchpadMemory::needFlush(const PacketPtr pkt) const
+ScratchpadMemory::needFlush(const PacketPtr pkt)
 {
     assert(pkt);
 
-    if (!support_flush)
+    if (!support_flush || !pkt->isWrite() ||
+        pkt->getSize() != sizeof(uint32_t))
         return false;
 
-    if (pkt->getAddr() != reg_flush_size || !pkt->isWrite() ||
-        pkt->getSize() != sizeof(uint32_t))
+    const Addr base = windowBase(pkt->getAddr());
+    CmdState &state = cmdStates[base / window_size];
+
+    if (flush_ring_entries &&
+        pkt->getAddr() == reg_flush_ring_count + base) {
+        const uint32_t count = pkt->getLE<uint32_t>();
+        if (!count)
+            return false;
+
+        fatal_if(count > flush_ring_entries, "Flush ring count %u exceeds "
+                 "the %u ring entries", count, flush_ring_entries);
+
+        const unsigned flushes = flushRing(base, count);
+        DPRINTF(ScratchpadMemory, "flushed %u descriptors as %u ranges\n",
+                count, flushes);
+
+        if (state.active) {
+            const FlushDesc *ring = (const FlushDesc *)
+                (pmemAddr + (flush_ring_addr + base - range.start()));
+            state.rec.flushes += count;
+            for (unsigned i = 0; i < count; ++i)
+                state.rec.flushBytes += ring[i].size;
+        }
+
+        return true;
+    }
+
+    if (pkt->getAddr() != reg_flush_size + base)
         return false;
 
     const uint32_t flush_size = pkt->getLE<uint32_t>();
     if (!flush_size)
         return false;
 
-    const uint64_t *flush_addr = readMem_q(reg_flush_addr);
+    const uint64_t *flush_addr = readMem_q(reg_flush_addr + base);
     assert(flush_addr);
 
     flushSystemDcaches(*flush_addr, flush_size);
 
+    if (state.active) {
+        ++state.rec.flushes;
+        state.rec.flushBytes += flush_size;
+    }
+
     return true;
 }
 
@@ -121,6 +456,7 @@ Tick
 ScratchpadMemory::recvAtomic(PacketPtr pkt)
 {
     needFlush(pkt);
+    profileCmd(pkt);
     return SimpleMemory::recvAtomic(pkt);
 }
 
@@ -128,6 +464,7 @@ Tick
 ScratchpadMemory::recvAtomicBackdoor(PacketPtr pkt, MemBackdoorPtr &_backdoor)
 {
     needFlush(pkt);
+    profileCmd(pkt);
     return SimpleMemory::recvAtomicBackdoor(pkt, _backdoor);
 }
 
@@ -141,7 +478,9 @@ ScratchpadMemory::recvFunctional(PacketPtr pkt)
 bool
 ScratchpadMemory::recvTimingReq(PacketPtr pkt)
 {
-    needFlush(pkt);
+    // SimpleMemory only performs an accepted request, through
+    // recvAtomic(), so the flush and the command are handled there. A
+    // rejected request is not flushed and recorded again on every retry.
     return SimpleMemory::recvTimingReq(pkt);
 }
 
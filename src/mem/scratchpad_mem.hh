@@ -6,10 +6,16 @@
 #ifndef __MEM_SCRATCHPAD_MEMORY_HH__
 #define __MEM_SCRATCHPAD_MEMORY_HH__
 
+#include <unordered_map>
+
+#include "base/compiler.hh"
+#include "base/statistics.hh"
 #include "mem/simple_mem.hh"
 #include "params/ScratchpadMemory.hh"
 
+class BaseCPU;
 class Cache;
+class OutputStream;
 
 /**
  * ScratchpadMemory
@@ -18,12 +24,77 @@ class Cache;
 class ScratchpadMemory : public SimpleMemory
 {
   private:
+    /** Register windows, the register addresses are those of window 0 */
+    const unsigned num_windows;
+    const Addr window_size;
+
     const bool support_flush;
     const Addr reg_flush_addr;
     const Addr reg_flush_size;
 
+    /** Batched cache flush through a ring of flush descriptors */
+    const Addr flush_ring_addr;
+    const unsigned flush_ring_entries;
+    const Addr reg_flush_ring_count;
+
+    /** Flush descriptor of the ring, as written by the PIM kernel */
+    struct FlushDesc
+    {
+        uint64_t addr;
+        uint32_t size;
+        uint32_t reserved;
+    } M5_ATTR_PACKED;
+
     std::vector<Cache *> dcaches;
 
+    /**
+     * PIM kernel command profiling. A command starts when a value other
+     * than cmd_done is written to the command register and ends when the
+     * PIM kernel writes cmd_done to it.
+     */
+    const bool profile_cmds;
+    const Addr reg_cmd_addr;
+    const std::vector<std::string> cmd_names;
+    const uint8_t cmd_done;
+    const std::vector<BaseCPU *> pimCpus;
+
+    /** Record of one command invocation in the binary command trace */
+    struct CmdRecord
+    {
+        uint8_t cmd;
+        uint8_t window;
+        uint64_t startTick;
+        uint64_t endTick;
+        uint64_t pimCycles;
+        uint32_t flushes;
+        uint64_t flushBytes;
+        uint64_t hostBytesRead;
+        uint64_t hostBytesWritten;
+    } M5_ATTR_PACKED;
+
+    /** Running command of a window */
+    struct CmdState
+    {
+        bool active;
+        CmdRecord rec;
+        Cycles startCycle;
+    };
+
+    std::vector<CmdState> cmdStates;
+    /** Window of the PIM CPU of a requester, -1 for other requesters */
+    std::unordered_map<MasterID, int> masterWindows;
+    OutputStream *cmdTrace;
+
+    Stats::Vector cmdInvocations;
+    Stats::Vector cmdWaitTicks;
+    Stats::Vector cmdPimCycles;
+    Stats::Vector cmdFlushes;
+    Stats::Vector cmdFlushBytes;
+    Stats::Vector cmdHostBytesRead;
+    Stats::Vector cmdHostBytesWritten;
+    Stats::Formula cmdAvgWaitTicks;
+    Stats::Formula cmdAvgPimCycles;
+
   public:
     ScratchpadMemory(const ScratchpadMemoryParams *p);
 
@@ -32,12 +103,25 @@ class ScratchpadMemory : public SimpleMemory
 
   public:
     void init() override;
+    void regStats() override;
+
+    /**
+     * Account a PIM access to the host memory to the running command.
+     * Called by the bridge from the PIM system to the host.
+     */
+    void recordHostAccess(const PacketPtr pkt);
 
   private:
     const uint32_t *readMem_l(const Addr addr) const;
     const uint64_t *readMem_q(const Addr addr) const;
+    Addr windowBase(const Addr addr) const;
+    int masterWindow(const MasterID master_id);
+    BaseCPU *windowCpu(const int window) const;
     void flushSystemDcaches(const Addr addr, const uint32_t size) const;
-    bool needFlush(const PacketPtr pkt) const;
+    unsigned flushRing(const Addr base, const unsigned count) const;
+    bool needFlush(const PacketPtr pkt);
+    void profileCmd(const PacketPtr pkt);
+    void closeCmdTrace();
 
   protected:
     Tick recvAtomic(PacketPtr pkt) override;
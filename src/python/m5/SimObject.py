@@ -1188,6 +1188,7 @@ class SimObject(object):
         self._ccObject = None  # pointer to C++ object
         self._ccParams = None
         self._instantiated = False # really "cloned"
+        self._descendants = None # set by cache_descendants()
 
         # Clone children specified at class level.  No need for a
         # multidict here since we will be cloning everything.
@@ -1363,6 +1364,7 @@ class SimObject(object):
         child = self._children[name]
         child.clear_parent(self)
         del self._children[name]
+        self._uncache_descendants()
 
     # Add a new child to this object.
     def add_child(self, name, child):
@@ -1379,6 +1381,7 @@ class SimObject(object):
         child.set_parent(self, name)
         if not isNullPointer(child):
             self._children[name] = child
+        self._uncache_descendants()
 
     # Take SimObject-valued parameters that haven't been explicitly
     # assigned as children and make them children of the object that
@@ -1622,6 +1625,11 @@ class SimObject(object):
         return self._ccObject
 
     def descendants(self):
+        if self._descendants is not None:
+            return iter(self._descendants)
+        return self._walk_descendants()
+
+    def _walk_descendants(self):
         yield self
         # The order of the dict is implementation dependent, so sort
         # it based on the key (name) to ensure the order is the same
@@ -1630,6 +1638,21 @@ class SimObject(object):
             for obj in child.descendants():
                 yield obj
 
+    # Walk the hierarchy once and keep the list of descendants, so that
+    # the many later walks (e.g. the phases of instantiate()) neither
+    # recurse nor sort the children again.  The list is dropped when a
+    # child is added to or removed from the hierarchy below this object.
+    def cache_descendants(self):
+        self._descendants = None
+        self._descendants = list(self._walk_descendants())
+        return self._descendants
+
+    def _uncache_descendants(self):
+        obj = self
+        while isinstance(obj, SimObject):
+            obj._descendants = None
+            obj = obj._parent
+
     # Call C++ to create C++ object corresponding to this object
     def createCCObject(self):
         self.getCCParams()
@@ -117,6 +117,8 @@ def parse_options():
     option("--dot-dvfs-config", metavar="FILE", default=None,
         help="Create DOT & pdf outputs of the DVFS configuration" + \
              " [Default: %default]")
+    option("--instantiate-timing", action="store_true", default=False,
+        help="Print the time spent in every phase of instantiate()")
 
     # Debugging options
     group("Debugging Options")
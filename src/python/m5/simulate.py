@@ -45,6 +45,7 @@ from __future__ import print_function
 import atexit
 import os
 import sys
+import time
 
 # import the wrapped C++ functions
 import _m5.drain
@@ -71,6 +72,24 @@ _memory_modes = {
 
 _drain_manager = _m5.drain.DrainManager.instance()
 
+class _PhaseTimer(object):
+    """Measure the wall clock time of the phases of instantiate()"""
+
+    def __init__(self):
+        self.phases = []
+        self.last = time.time()
+
+    def phase(self, name):
+        now = time.time()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self):
+        print("instantiate() took %.3fs" %
+              sum(t for name, t in self.phases))
+        for name, t in self.phases:
+            print("    %-24s %8.3fs" % (name, t))
+
 # The final hook to generate .ini files.  Called from the user script
 # once the config is built.
 def instantiate(ckpt_dir=None):
@@ -81,22 +100,30 @@ def instantiate(ckpt_dir=None):
     if not root:
         fatal("Need to instantiate Root() before calling instantiate()")
 
+    timer = _PhaseTimer()
+
     # we need to fix the global frequency
     ticks.fixGlobalFrequency()
 
     # Make sure SimObject-valued params are in the configuration
     # hierarchy so we catch them with future descendants() walks
     for obj in root.descendants(): obj.adoptOrphanParams()
+    timer.phase("adoptOrphanParams")
+
+    # The hierarchy is complete, walk it from a list from now on
+    objs = root.cache_descendants()
 
     # Unproxy in sorted order for determinism
-    for obj in root.descendants(): obj.unproxyParams()
+    for obj in objs: obj.unproxyParams()
+    timer.phase("unproxyParams")
 
     if options.dump_config:
         ini_file = open(os.path.join(options.outdir, options.dump_config), 'w')
         # Print ini sections in sorted order for easier diffing
-        for obj in sorted(root.descendants(), key=lambda o: o.path()):
+        for obj in sorted(objs, key=lambda o: o.path()):
             obj.print_ini(ini_file)
         ini_file.close()
+        timer.phase("dump_config")
 
     if options.json_config:
         try:
@@ -108,49 +135,64 @@ def instantiate(ckpt_dir=None):
             json_file.close()
         except ImportError:
             pass
+        timer.phase("json_config")
 
     do_dot(root, options.outdir, options.dot_config)
+    timer.phase("dot_config")
 
     # Initialize the global statistics
     stats.initSimStats()
 
     # Create the C++ sim objects and connect ports
-    for obj in root.descendants(): obj.createCCObject()
-    for obj in root.descendants(): obj.connectPorts()
+    for obj in objs: obj.createCCObject()
+    timer.phase("createCCObject")
+    for obj in objs: obj.connectPorts()
+    timer.phase("connectPorts")
 
     # Do a second pass to finish initializing the sim objects
-    for obj in root.descendants(): obj.init()
+    for obj in objs: obj.init()
+    timer.phase("init")
 
     # Do a third pass to initialize statistics
-    for obj in root.descendants(): obj.regStats()
+    for obj in objs: obj.regStats()
+    timer.phase("regStats")
 
     # Do a fourth pass to initialize probe points
-    for obj in root.descendants(): obj.regProbePoints()
+    for obj in objs: obj.regProbePoints()
 
     # Do a fifth pass to connect probe listeners
-    for obj in root.descendants(): obj.regProbeListeners()
+    for obj in objs: obj.regProbeListeners()
+    timer.phase("regProbes")
 
     # We want to generate the DVFS diagram for the system. This can only be
     # done once all of the CPP objects have been created and initialised so
     # that we are able to figure out which object belongs to which domain.
     if options.dot_dvfs_config:
         do_dvfs_dot(root, options.outdir, options.dot_dvfs_config)
+        timer.phase("dot_dvfs_config")
 
     # We're done registering statistics.  Enable the stats package now.
     stats.enable()
+    timer.phase("stats.enable")
+
     # Restore checkpoint (if any)
     if ckpt_dir:
         _drain_manager.preCheckpointRestore()
         ckpt = _m5.core.getCheckpoint(ckpt_dir)
         _m5.core.unserializeGlobals(ckpt);
-        for obj in root.descendants(): obj.loadState(ckpt)
+        for obj in objs: obj.loadState(ckpt)
+        timer.phase("loadState")
     else:
-        for obj in root.descendants(): obj.initState()
+        for obj in objs: obj.initState()
+        timer.phase("initState")
 
     # Check to see if any of the stat events are in the past after resuming from
     # a checkpoint, If so, this call will shift them to be at a valid time.
     updateStatEvents()
 
+    if getattr(options, 'instantiate_timing', False):
+        timer.report()
+
 need_startup = True
 def simulate(*args, **kwargs):
     global need_startup
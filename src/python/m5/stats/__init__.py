@@ -40,6 +40,9 @@
 # Authors: Nathan Binkert
 #          Andreas Sandberg
 
+import fnmatch
+import re
+
 import m5
 
 import _m5.stats
@@ -51,6 +54,12 @@ from _m5.stats import schedStatEvent as schedEvent
 from _m5.stats import periodicStatDump
 
 outputList = []
+# Stat filter of every output in outputList, None if it outputs all stats
+outputFilters = []
+# Stats visited for every output in outputList, selected at enable()
+outputStats = []
+# Stats prepared for a dump, the stats of all outputs
+dumpStats = []
 
 def _url_factory(func):
     """Wrap a plain Python function with URL parsing helpers
@@ -119,13 +128,105 @@ def _textFactory(fn, desc=True):
 
     return _m5.stats.initText(fn, desc)
 
+@_url_factory
+def _binaryFactory(fn):
+    """Output stats in a binary format.
+
+    Binary stat files contain a table of the stat names, written once,
+    followed by one fixed-layout row of values per dump. They are much
+    smaller and faster to write than text stat files when stats are
+    dumped often, and can be read with util/stats/statsfile.py.
+
+    Example: binary://stats.bin
+
+    """
+
+    return _m5.stats.initBinary(fn)
+
 factories = {
     # Default to the text factory if we're given a naked path
     "" : _textFactory,
     "file" : _textFactory,
     "text" : _textFactory,
+    "binary" : _binaryFactory,
 }
 
+class StatFilter(object):
+    """Select stats by name
+
+    A stat is selected if its name matches one of the include patterns,
+    if any, and none of the exclude patterns. Patterns are globs, or
+    regular expressions matched from the start of the name if they are
+    prefixed with 're:'.
+
+    """
+
+    def __init__(self, include=None, exclude=None):
+        self.include = self._compile(include)
+        self.exclude = self._compile(exclude)
+
+    @staticmethod
+    def _compile(patterns):
+        if patterns is None:
+            return None
+        return [ re.compile(p[3:] if p.startswith('re:') \
+                            else fnmatch.translate(p)) for p in patterns ]
+
+    def __call__(self, name):
+        if self.include is not None and \
+           not any(r.match(name) for r in self.include):
+            return False
+        if self.exclude is not None and \
+           any(r.match(name) for r in self.exclude):
+            return False
+        return True
+
+def _split_filter(url):
+    """Split the stat filter parameters off a stat visitor URL
+
+    Returns the URL without the include and exclude parameters, which
+    are comma separated lists of patterns, and a StatFilter for them or
+    None if there are none.
+
+    """
+
+    try:
+        from urllib.parse import parse_qsl, urlencode
+    except ImportError:
+        # Python 2 fallback
+        from urlparse import parse_qsl
+        from urllib import urlencode
+
+    patterns = {}
+    params = []
+    for key, value in parse_qsl(url.query, keep_blank_values=True):
+        if key in ('include', 'exclude'):
+            if not value:
+                fatal("%s: '%s' doesn't have a value." % (url.geturl(), key))
+            patterns[key] = value.split(',')
+        else:
+            params.append((key, value))
+
+    if not patterns:
+        return url, None
+
+    return url._replace(query=urlencode(params)), StatFilter(**patterns)
+
+def _select_stats():
+    """Select the stats of every output from stats_list"""
+
+    global outputStats, dumpStats
+
+    outputStats = [ stats_list if f is None else
+                    [ s for s in stats_list if f(s.name) ]
+                    for f in outputFilters ]
+
+    if None in outputFilters:
+        dumpStats = stats_list
+    else:
+        selected = set(s.id for stats in outputStats for s in stats)
+        dumpStats = [ s for s in stats_list if s.id in selected ]
+
 def addStatVisitor(url):
     """Add a stat visitor specified using a URL string
 
@@ -137,6 +238,12 @@ def addStatVisitor(url):
     parameters are keyword arguments. Parameter values must be valid
     Python literals.
 
+    The include and exclude parameters are handled for all formats and
+    restrict the output to the stats selected by a StatFilter. They are
+    comma separated lists of patterns, for example:
+    text://stats.txt?include=system.cpu*.ipc,system.mem_ctrls*
+    As in any URL query, a '+' in a pattern must be written as %2B.
+
     """
 
     try:
@@ -145,7 +252,7 @@ def addStatVisitor(url):
         # Python 2 fallback
         from urlparse import urlsplit
 
-    parsed = urlsplit(url)
+    parsed, stat_filter = _split_filter(urlsplit(url))
 
     try:
         factory = factories[parsed.scheme]
@@ -153,6 +260,11 @@ def addStatVisitor(url):
         fatal("Illegal stat file type specified.")
 
     outputList.append(factory(parsed))
+    outputFilters.append(stat_filter)
+
+    # Outputs added after enable() select their stats right away
+    if stats_list:
+        _select_stats()
 
 def initSimStats():
     _m5.stats.initSimStats()
@@ -182,6 +294,8 @@ def enable():
         stats_dict[stat.name] = stat
         stat.enable()
 
+    _select_stats()
+
     _m5.stats.enable();
 
 def prepare():
@@ -205,12 +319,14 @@ def dump():
 
     _m5.stats.processDumpQueue()
 
-    prepare()
+    # Only the stats of the outputs are prepared and visited
+    for stat in dumpStats:
+        stat.prepare()
 
-    for output in outputList:
+    for output, stats in zip(outputList, outputStats):
         if output.valid():
             output.begin()
-            for stat in stats_list:
+            for stat in stats:
                 stat.visit(output)
             output.end()
 
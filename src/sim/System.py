@@ -76,6 +76,20 @@ class System(SimObject):
     mmap_using_noreserve = Param.Bool(False, "mmap the backing store " \
                                           "without reserving swap")
 
+    # Checkpoints of large memories are mostly zero pages and pages that
+    # are the same in other checkpoints. When a page pool is set, only
+    # the unique non-zero pages are stored, in a pool that can be shared
+    # by many checkpoints (see src/mem/page_store.hh).
+    memory_page_pool = Param.String("", "Directory of a page pool to " \
+                                        "checkpoint the memory into, empty " \
+                                        "to write gzip memory images. A " \
+                                        "relative path is relative to the " \
+                                        "working directory and recorded " \
+                                        "as an absolute path")
+    memory_page_threads = Param.Unsigned(0, "Threads to save and load " \
+                                             "memory pages with, 0 for one " \
+                                             "per host CPU")
+
     # The memory ranges are to be populated when creating the system
     # such that these can be passed from the I/O subsystem through an
     # I/O bridge or cache
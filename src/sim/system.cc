@@ -107,7 +107,8 @@ System::System(Params *p)
 #else
       kvmVM(nullptr),
 #endif
-      physmem(name() + ".physmem", p->memories, p->mmap_using_noreserve),
+      physmem(name() + ".physmem", p->memories, p->mmap_using_noreserve,
+              p->memory_page_pool, p->memory_page_threads),
       memoryMode(p->mem_mode),
       _cacheLineSize(p->cache_line_size),
       workItemsBegin(0),
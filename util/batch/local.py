@@ -0,0 +1,317 @@
+#!/usr/bin/env python2.7
+# Copyright (c) 2026 The gem5 Authors
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met: redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer;
+# redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution;
+# neither the name of the copyright holders nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Run the jobs of a jobfile on the local machine instead of submitting them
+# to a batch system. At most -n jobs run at the same time, and a job that
+# starts from a checkpoint only runs once its checkpointing job succeeded.
+#
+# The job directories use the same status files as send.py and job.py, so
+# running the script again after a crash (or ^C) resumes where it stopped:
+# jobs that succeeded or whose directory holds a complete stats.txt are
+# skipped and the interrupted jobs are run again.
+
+import os, re, signal, sys
+from os import environ as env
+from os.path import basename, isdir, isfile, join as joinpath
+
+progname = basename(sys.argv[0])
+usage = """\
+Usage:
+    %(progname)s [-C] [-f] [-j <jobfile>] [-n <jobs>] [-b <binary>]
+        [-s <script>] [-v] <regexp>
+    -C           also run the checkpointing jobs
+    -b <binary>  gem5 binary to run (default is <rootdir>/Base/gem5.opt)
+    -e           only echo the jobs that would be run, don't run them
+    -f           force the jobs to run even if they are complete
+    -j <jobfile> specify the jobfile (default is <rootdir>/Test.py)
+    -n <jobs>    number of jobs to run at the same time
+                 (default is the number of CPUs)
+    -s <script>  config script to run (default is <rootdir>/Base/run.py)
+    -v           be verbose
+
+    %(progname)s -h
+    -h           display this help
+""" % locals()
+
+DUMP_END = "---------- End Simulation Statistics   ----------"
+
+try:
+    import getopt
+    opts, args = getopt.getopt(sys.argv[1:], '-Cb:efhj:n:s:v')
+except getopt.GetoptError:
+    sys.exit(usage)
+
+docpts = False
+onlyecho = False
+force = False
+jfile = 'Test.py'
+binary = None
+script = None
+numjobs = None
+verbose = False
+
+for opt,arg in opts:
+    if opt == '-C':
+        docpts = True
+    if opt == '-b':
+        binary = arg
+    if opt == '-e':
+        onlyecho = True
+    if opt == '-f':
+        force = True
+    if opt == '-h':
+        print usage
+        sys.exit(0)
+    if opt == '-j':
+        jfile = arg
+    if opt == '-n':
+        numjobs = int(arg)
+    if opt == '-s':
+        script = arg
+    if opt == '-v':
+        verbose = True
+
+exprs = [ re.compile(arg) for arg in args ]
+
+import jobfile
+from job import JobDir, date
+
+conf = jobfile.JobFile(jfile)
+rootdir = conf.rootdir
+
+if binary is None:
+    binary = joinpath(rootdir, 'Base', 'gem5.opt')
+if script is None:
+    script = joinpath(rootdir, 'Base', 'run.py')
+if numjobs is None:
+    import multiprocessing
+    numjobs = multiprocessing.cpu_count()
+if isfile(jfile):
+    jfile = os.path.abspath(jfile)
+
+def statscomplete(jobdir):
+    """
+    Check if the stats.txt of a job ends with a complete dump.
+    """
+    filename = jobdir.file('stats.txt')
+    if not isfile(filename):
+        return False
+
+    f = file(filename, 'r')
+    f.seek(0, 2)
+    f.seek(max(f.tell() - 4096, 0))
+    lines = [ line for line in f.read().splitlines() if line.strip() ]
+    f.close()
+    return bool(lines) and lines[-1].startswith(DUMP_END)
+
+def isrunning(jobdir):
+    """
+    Check if a job is run by another instance of this script.
+    """
+    if not jobdir.hasfile('.local_pid'):
+        return False
+    try:
+        os.kill(int(jobdir.readval('.local_pid')), 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+def iscomplete(jobdir):
+    if not jobdir.exists():
+        return False
+
+    status = jobdir.getstatus()
+    if status == 'success':
+        return True
+    # A job that failed or was interrupted may have dumped complete stats
+    # before it stopped, only trust the stats of jobs that were not run by
+    # this script
+    if status in ('running', 'failure', 'killed'):
+        return False
+    return statscomplete(jobdir)
+
+if docpts:
+    gen = conf.alljobs()
+else:
+    gen = conf.jobs()
+
+jobnames = set()
+joblist = []
+for job in gen:
+    if job.name in jobnames:
+        continue
+    if exprs and not [ expr for expr in exprs if expr.match(job.name) ]:
+        continue
+    jobnames.add(job.name)
+    joblist.append(job)
+
+# A job that starts from a checkpoint depends on its checkpointing job, run
+# the checkpointing jobs that are missing first
+cptlist = []
+for job in joblist:
+    cpt = job._checkpoint
+    if cpt is None or cpt.name in jobnames:
+        continue
+    jobnames.add(cpt.name)
+    cptlist.append(cpt)
+joblist = cptlist + joblist
+
+done = set()
+pending = []
+for job in joblist:
+    jobdir = JobDir(joinpath(rootdir, job.name))
+    if not force and iscomplete(jobdir):
+        if verbose:
+            print 'Job %s is complete' % job.name
+        done.add(job.name)
+        continue
+    if isrunning(jobdir):
+        print 'Job %s is run by process %s' % \
+              (job.name, jobdir.readval('.local_pid'))
+        continue
+    pending.append(job)
+
+def depends(job):
+    """
+    Return the name of the job that must succeed before job can run.
+    """
+    if job._checkpoint is None or job._checkpoint.name in done:
+        return None
+    return job._checkpoint.name
+
+if onlyecho:
+    for job in pending:
+        cpt = depends(job)
+        if cpt:
+            print '%s (after %s)' % (job.name, cpt)
+        else:
+            print job.name
+    sys.exit(0)
+
+def start(job):
+    jobdir = JobDir(joinpath(rootdir, job.name))
+    if jobdir.exists():
+        jobdir.clean()
+    jobdir.create()
+
+    jobenv = dict(env)
+    jobenv['ROOTDIR'] = rootdir
+    jobenv['JOBNAME'] = job.name
+    jobenv['JOBFILE'] = jfile
+    jobenv['OUTPUT_DIR'] = str(jobdir)
+
+    started = date()
+    jobdir.echofile('.running', started)
+    jobdir.setstatus('running on localhost on %s' % started)
+
+    args = [ binary, '--outdir=%s' % jobdir, script ]
+    if verbose:
+        print ' '.join(args)
+
+    pid = os.fork()
+    if not pid:
+        # Execute command
+        os.chdir(str(jobdir))
+        fd = os.open(jobdir.file('output'),
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, sys.stdin.fileno())
+        os.dup2(fd, sys.stdout.fileno())
+        os.dup2(fd, sys.stderr.fileno())
+        try:
+            os.execve(binary, args, jobenv)
+        finally:
+            os._exit(127)
+
+    jobdir.echofile('.local_pid', os.getpid())
+    print 'Job %s started' % job.name
+    return pid
+
+def finish(job, status):
+    jobdir = JobDir(joinpath(rootdir, job.name))
+    complete = date()
+    jobdir.echofile('.%s' % status, complete)
+    jobdir.rmfile('.running')
+    jobdir.rmfile('.local_pid')
+    jobdir.setstatus('%s on %s' % (status, complete))
+
+running = {}
+failed = set()
+
+def handler(signum, frame):
+    for pid in running:
+        os.kill(pid, signal.SIGTERM)
+    for job in running.values():
+        finish(job, 'killed')
+    sys.exit('Interrupted, %d jobs killed' % len(running))
+
+signal.signal(signal.SIGINT, handler)
+signal.signal(signal.SIGTERM, handler)
+signal.signal(signal.SIGHUP, handler)
+
+while pending or running:
+    for job in pending[:]:
+        cpt = depends(job)
+        if cpt in failed:
+            print 'Job %s skipped, %s failed' % (job.name, cpt)
+            pending.remove(job)
+            failed.add(job.name)
+        elif cpt is None and len(running) < numjobs:
+            pending.remove(job)
+            running[start(job)] = job
+
+    if not running:
+        # Only jobs whose checkpoint is neither complete nor run are left
+        for job in pending:
+            print 'Job %s skipped, %s is missing' % \
+                  (job.name, depends(job))
+        break
+
+    try:
+        pid, ec = os.wait()
+    except OSError:
+        continue
+    if pid not in running:
+        continue
+
+    job = running.pop(pid)
+    if ec:
+        if os.WIFSIGNALED(ec):
+            print 'Job %s failed, signal %d' % (job.name, os.WTERMSIG(ec))
+        else:
+            print 'Job %s failed, exit code %d' % \
+                  (job.name, os.WEXITSTATUS(ec))
+        status = 'failure'
+        failed.add(job.name)
+    else:
+        print 'Job %s succeeded' % job.name
+        status = 'success'
+        done.add(job.name)
+    finish(job, status)
+
+if failed:
+    sys.exit('%d jobs failed or were skipped' % len(failed))
@@ -31,9 +31,15 @@
 
 from ConfigParser import ConfigParser
 import gzip
+import multiprocessing
+import shutil
 
 import sys, re, os
 
+page_size = 1 << 12
+# The memory images are copied in chunks of this size
+chunk_size = 1 << 20
+
 class myCP(ConfigParser):
     def __init__(self):
         ConfigParser.__init__(self)
@@ -41,26 +47,57 @@ class myCP(ConfigParser):
     def optionxform(self, optionstr):
         return optionstr
 
-def aggregate(output_dir, cpts, no_compress, memory_size):
-    merged_config = None
-    page_ptr = 0
+def copy_pages(args):
+    """
+    Copy the first pages of the memory image of a checkpoint into the
+    aggregated image. Without compression, the pages are written in place
+    at page offset of the aggregated image, and chunks of zeros are skipped
+    to leave holes in the file. With compression, they are written to a
+    separate gzip member, which is appended to the aggregated image later.
+    """
+    (cpt, pages, offset, output, compress) = args
+
+    gf = gzip.GzipFile(cpt + "/system.physmem.store0.pmem", "rb")
+    if compress:
+        out = gzip.GzipFile(output, "wb")
+    else:
+        out = open(output, "r+b")
+        out.seek(offset * page_size)
+
+    zeros = "\0" * chunk_size
+    remaining = pages * page_size
+    while remaining > 0:
+        data = gf.read(min(remaining, chunk_size))
+        if not data:
+            # A short image is padded with zeros to keep the following
+            # checkpoints at their page offsets
+            data = zeros[:min(remaining, chunk_size)]
+        if not compress and data == zeros[:len(data)]:
+            out.seek(len(data), 1)
+        else:
+            out.write(data)
+        remaining -= len(data)
+
+    out.close()
+    gf.close()
 
+def aggregate(output_dir, cpts, no_compress, memory_size, jobs=None):
     output_path = output_dir
     if not os.path.isdir(output_path):
         os.system("mkdir -p " + output_path)
 
-    agg_mem_file = open(output_path + "/system.physmem.store0.pmem", "wb+")
-    agg_config_file = open(output_path + "/m5.cpt", "wb+")
-
-    if not no_compress:
-        merged_mem = gzip.GzipFile(fileobj= agg_mem_file, mode="wb")
+    mem_path = output_path + "/system.physmem.store0.pmem"
 
     max_curtick = 0
     num_digits = len(str(len(cpts)-1))
 
+    # Merge the configs in one pass, this also gives the page offset of
+    # every checkpoint in the aggregated memory image
+    merged_config = myCP()
+    offsets = []
+    page_ptr = 0
     for (i, arg) in enumerate(cpts):
         print arg
-        merged_config = myCP()
         config = myCP()
         config.readfp(open(cpts[i] + "/m5.cpt"))
 
@@ -91,42 +128,22 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
                     for item in config.items(sec):
                         merged_config.set(sec, item[0], item[1])
 
-        if i != len(cpts)-1:
-            merged_config.write(agg_config_file)
-
         ### memory stuff
         pages = int(config.get("system", "pagePtr"))
+        offsets.append((page_ptr, pages))
         page_ptr = page_ptr + pages
         print "pages to be read: ", pages
 
-        f = open(cpts[i] + "/system.physmem.store0.pmem", "rb")
-        gf = gzip.GzipFile(fileobj=f, mode="rb")
-
-        x = 0
-        while x < pages:
-            bytesRead = gf.read(1 << 12)
-            if not no_compress:
-                merged_mem.write(bytesRead)
-            else:
-                agg_mem_file.write(bytesRead)
-            x += 1
-
-        gf.close()
-        f.close()
-
     merged_config.add_section("system")
     merged_config.set("system", "pagePtr", page_ptr)
     merged_config.set("system", "nextPID", len(cpts))
 
-    file_size = page_ptr * 4 * 1024
-    dummy_data = "".zfill(4096)
-    while file_size < memory_size:
-        if not no_compress:
-            merged_mem.write(dummy_data)
-        else:
-            agg_mem_file.write(dummy_data)
-        file_size += 4 * 1024
-        page_ptr += 1
+    # The padding up to memory_size is never written. Without compression
+    # the image is extended to its full size as a sparse file, and a
+    # compressed image simply ends early, gem5 leaves the rest of the memory
+    # zero when it reads a short image.
+    if memory_size and page_ptr * page_size < memory_size:
+        page_ptr = (memory_size + page_size - 1) // page_size
 
     print "WARNING: "
     print "Make sure the simulation using this checkpoint has at least ",
@@ -136,12 +153,35 @@ def aggregate(output_dir, cpts, no_compress, memory_size):
     merged_config.add_section("Globals")
     merged_config.set("Globals", "curTick", max_curtick)
 
+    agg_config_file = open(output_path + "/m5.cpt", "wb+")
     merged_config.write(agg_config_file)
+    agg_config_file.close()
 
-    if not no_compress:
-        merged_mem.close()
+    # Decompress the memory images in parallel
+    if no_compress:
+        agg_mem_file = open(mem_path, "wb")
+        agg_mem_file.truncate(page_ptr * page_size)
         agg_mem_file.close()
+        work = [ (cpt, pages, offset, mem_path, False)
+                 for (cpt, (offset, pages)) in zip(cpts, offsets) ]
     else:
+        work = [ (cpt, pages, offset, "%s.%d" % (mem_path, i), True)
+                 for (i, (cpt, (offset, pages)))
+                 in enumerate(zip(cpts, offsets)) ]
+
+    pool = multiprocessing.Pool(jobs)
+    pool.map(copy_pages, work, 1)
+    pool.close()
+    pool.join()
+
+    # A sequence of gzip members is a valid gzip file
+    if not no_compress:
+        agg_mem_file = open(mem_path, "wb")
+        for (cpt, pages, offset, part, compress) in work:
+            f = open(part, "rb")
+            shutil.copyfileobj(f, agg_mem_file, chunk_size)
+            f.close()
+            os.remove(part)
         agg_mem_file.close()
 
 if __name__ == "__main__":
@@ -153,6 +193,9 @@ if __name__ == "__main__":
     parser.add_argument("-c", "--no-compress", action="store_true")
     parser.add_argument("--cpts", nargs='+')
     parser.add_argument("--memory-size", action="store", type=int)
+    parser.add_argument("-j", "--jobs", action="store", type=int,
+                        help="Number of memory images to copy in parallel "\
+                             "(default: number of CPUs)")
 
     # Assume x86 ISA.  Any other ISAs would need extra stuff in this script
     # to appropriately parse their page tables and understand page sizes.
@@ -163,4 +206,4 @@ if __name__ == "__main__":
                      "need to be combined.")
 
     aggregate(options.output_dir, options.cpts, options.no_compress,
-              options.memory_size)
+              options.memory_size, options.jobs)
@@ -0,0 +1,193 @@
+# This file is a library for a chunked, columnar binary format of gem5
+# packet traces. Unlike the protobuf traces, which can only be decoded from
+# the start, a columnar trace has an index of the tick range of every chunk,
+# so that a time window can be read without decoding the rest of the trace.
+#
+# File layout, all integers little endian:
+#
+#   MAGIC
+#   chunk 0: column 0 | column 1 | ... , each column packed of its type
+#   chunk 1: ...
+#   footer: JSON of the trace header, the columns and the chunk index
+#   footer offset (uint64) | MAGIC
+#
+# Every chunk entry of the index is [offset, packets, min tick, max tick].
+
+import json
+import struct
+
+MAGIC = "gem5pcol"
+VERSION = 1
+
+# Columns of a packet trace, optional fields that are not set are 0
+COLUMNS = [('tick', 'Q'), ('cmd', 'I'), ('addr', 'Q'), ('size', 'I'),
+           ('flags', 'I'), ('pkt_id', 'Q'), ('pc', 'Q')]
+
+# Default number of packets per chunk
+CHUNK_PACKETS = 1 << 16
+
+_TRAILER = struct.Struct('<Q8s')
+
+# NumPy types of the column formats
+_DTYPES = { 'I' : '<u4', 'Q' : '<u8' }
+
+class ColumnWriter(object):
+    """
+    Write packets into a columnar trace. The packets are buffered per
+    column and a chunk is written every chunk_packets packets.
+    """
+    def __init__(self, filename, header, chunk_packets = CHUNK_PACKETS):
+        self._out = open(filename, 'wb')
+        self._out.write(MAGIC)
+        self._header = header
+        self._chunk_packets = chunk_packets
+        self._columns = [[] for name, fmt in COLUMNS]
+        self._chunks = []
+
+    def add(self, packet):
+        """
+        Add a packet, given as a tuple of the fields in COLUMNS order.
+        """
+        for column, value in zip(self._columns, packet):
+            column.append(value)
+        if len(self._columns[0]) == self._chunk_packets:
+            self._flush()
+
+    def addMessage(self, packet):
+        """
+        Add a decoded protobuf Packet message.
+        """
+        self.add((packet.tick, packet.cmd, packet.addr, packet.size,
+                  packet.flags, packet.pkt_id, packet.pc))
+
+    def _flush(self):
+        count = len(self._columns[0])
+        if count == 0:
+            return
+
+        ticks = self._columns[0]
+        self._chunks.append([self._out.tell(), count, min(ticks),
+                             max(ticks)])
+        for (name, fmt), column in zip(COLUMNS, self._columns):
+            self._out.write(struct.pack('<%d%s' % (count, fmt), *column))
+        self._columns = [[] for name, fmt in COLUMNS]
+
+    def close(self):
+        self._flush()
+
+        footer = {
+            'version' : VERSION,
+            'header' : self._header,
+            'columns' : COLUMNS,
+            'chunks' : self._chunks,
+        }
+        offset = self._out.tell()
+        self._out.write(json.dumps(footer))
+        self._out.write(_TRAILER.pack(offset, MAGIC))
+        self._out.close()
+
+class ColumnReader(object):
+    """
+    Random access reader of a columnar trace. The columns are returned as
+    NumPy arrays if NumPy is available, and as tuples otherwise.
+    """
+    def __init__(self, filename):
+        self._in = open(filename, 'rb')
+
+        if self._in.read(len(MAGIC)) != MAGIC:
+            raise IOError("%s is not a columnar packet trace" % filename)
+
+        self._in.seek(-_TRAILER.size, 2)
+        trailer = self._in.tell()
+        offset, magic = _TRAILER.unpack(self._in.read(_TRAILER.size))
+        if magic != MAGIC:
+            raise IOError("%s is truncated" % filename)
+
+        self._in.seek(offset)
+        footer = json.loads(self._in.read(trailer - offset))
+        if footer['version'] != VERSION:
+            raise IOError("%s has unsupported version %d" %
+                          (filename, footer['version']))
+
+        self.header = footer['header']
+        self.columns = [(str(name), str(fmt))
+                        for name, fmt in footer['columns']]
+        self.chunks = footer['chunks']
+        self.num_packets = sum(chunk[1] for chunk in self.chunks)
+
+        try:
+            import numpy
+            self._np = numpy
+        except ImportError:
+            self._np = None
+
+    def _readChunk(self, chunk, fields):
+        offset, count = chunk[0], chunk[1]
+        result = {}
+        for name, fmt in self.columns:
+            size = struct.calcsize('<%s' % fmt) * count
+            if name not in fields:
+                offset += size
+                continue
+            self._in.seek(offset)
+            buf = self._in.read(size)
+            if self._np is not None:
+                result[name] = self._np.frombuffer(buf, _DTYPES[fmt])
+            else:
+                result[name] = struct.unpack('<%d%s' % (count, fmt), buf)
+            offset += size
+        return result
+
+    def _concat(self, parts):
+        if self._np is not None:
+            if not parts:
+                return self._np.zeros(0, dtype = 'u8')
+            return self._np.concatenate(parts)
+        result = []
+        for part in parts:
+            result.extend(part)
+        return tuple(result)
+
+    def read(self, start = 0, end = None, fields = None):
+        """
+        Return a dict of the columns in fields (all columns by default) of
+        the packets with start <= tick < end. Only the chunks that overlap
+        the tick range are read.
+        """
+        if fields is None:
+            fields = [name for name, fmt in self.columns]
+        wanted = set(fields) | set(['tick'])
+
+        parts = dict((name, []) for name in fields)
+        for chunk in self.chunks:
+            if chunk[3] < start or (end is not None and chunk[2] >= end):
+                continue
+
+            columns = self._readChunk(chunk, wanted)
+            ticks = columns['tick']
+            inside = chunk[2] >= start and (end is None or chunk[3] < end)
+
+            if self._np is not None:
+                mask = None
+                if not inside:
+                    mask = ticks >= start
+                    if end is not None:
+                        mask &= ticks < end
+                for name in fields:
+                    parts[name].append(columns[name] if mask is None
+                                       else columns[name][mask])
+            else:
+                if inside:
+                    for name in fields:
+                        parts[name].append(columns[name])
+                    continue
+                rows = [i for i, tick in enumerate(ticks)
+                        if tick >= start and (end is None or tick < end)]
+                for name in fields:
+                    column = columns[name]
+                    parts[name].append([column[i] for i in rows])
+
+        return dict((name, self._concat(parts[name])) for name in fields)
+
+    def close(self):
+        self._in.close()
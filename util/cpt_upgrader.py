@@ -184,13 +184,99 @@ class Upgrader:
                           "nonexistent tag '%s'" % (tag, dep)
                     sys.exit(1)
 
+def read_tags(path):
+    """
+    Read the version tags of a checkpoint without parsing the whole file.
+    Returns the set of tags and whether they come from a legacy version
+    number, or (None, False) if the checkpoint has no version information.
+    """
+    section = None
+    for line in file(path, 'r'):
+        line = line.strip()
+        if line.startswith('['):
+            section = line[1:line.find(']')]
+            continue
+        if section not in ('root', 'Globals'):
+            continue
+
+        key, sep, value = line.partition('=')
+        if not sep:
+            key, sep, value = line.partition(':')
+        key = key.strip()
+        if section == 'root' and key == 'cpt_ver':
+            return legacy_tags(int(value)), True
+        if section == 'Globals' and key == 'version_tags':
+            return set(value.split()), False
+
+    return None, False
+
+def legacy_tags(cpt_ver):
+    tags = set([])
+    for i in xrange(2, cpt_ver+1):
+        tags.add(Upgrader.legacy[i].tag)
+    return tags
+
+def plan_upgrades(tags):
+    """
+    Return the tags of the migrations a checkpoint with the given tags
+    needs, in the order they are applied.
+    """
+    # Apply migrations for tags not in checkpoint and tags present for which
+    # downgraders are present, respecting dependences
+    tags = set(tags)
+    to_apply = (Upgrader.tag_set - tags) | (Upgrader.untag_set & tags)
+    plan = []
+    while to_apply:
+        ready = set([ t for t in to_apply if Upgrader.get(t).ready(tags) ])
+        if not ready:
+            print "could not apply these upgrades:", ' '.join(to_apply)
+            print "update dependences impossible to resolve; aborting"
+            exit(1)
+
+        for tag in sorted(ready):
+            plan.append(tag)
+            if tag in Upgrader.tag_set:
+                tags.add(tag)
+            else:
+                tags.remove(tag)
+
+        to_apply -= ready
+
+    return plan
+
 def process_file(path, **kwargs):
+    """
+    Upgrade a checkpoint file. Returns the tags of the migrations that
+    were applied, or that would be applied if dry_run is set.
+    """
     if not osp.isfile(path):
         import errno
-        raise IOError(ennro.ENOENT, "No such file", path)
+        raise IOError(errno.ENOENT, "No such file", path)
 
     verboseprint("Processing file %s...." % path)
 
+    # Most checkpoints are current, check the tags before parsing
+    tags, legacy = read_tags(path)
+    if tags is None:
+        print "fatal: no version information in checkpoint"
+        exit(1)
+
+    verboseprint("has tags", ' '.join(tags))
+    # If the current checkpoint has a tag we don't know about, we have
+    # a divergence that (in general) must be addressed by (e.g.) merging
+    # simulator support for its changes.
+    unknown_tags = tags - (Upgrader.tag_set | Upgrader.untag_set)
+    if unknown_tags:
+        print "warning: upgrade script does not recognize the following "\
+              "tags in this checkpoint:", ' '.join(unknown_tags)
+
+    plan = plan_upgrades(tags)
+    if kwargs.get('dry_run', False):
+        return plan
+    if not plan and not legacy:
+        verboseprint("...nothing to do")
+        return plan
+
     if kwargs.get('backup', True):
         import shutil
         shutil.copyfile(path, path + '.bak')
@@ -205,61 +291,70 @@ def process_file(path, **kwargs):
     cpt.readfp(cpt_file)
     cpt_file.close()
 
-    change = False
-
     # Make sure we know what we're starting from
     if cpt.has_option('root','cpt_ver'):
-        cpt_ver = cpt.getint('root','cpt_ver')
-
         # Legacy linear checkpoint version
         # convert to list of tags before proceeding
-        tags = set([])
-        for i in xrange(2, cpt_ver+1):
-            tags.add(Upgrader.legacy[i].tag)
+        tags = legacy_tags(cpt.getint('root','cpt_ver'))
         verboseprint("performed legacy version -> tags conversion")
-        change = True
 
         cpt.remove_option('root', 'cpt_ver')
-    elif cpt.has_option('Globals','version_tags'):
-        tags = set((''.join(cpt.get('Globals','version_tags'))).split())
     else:
-        print "fatal: no version information in checkpoint"
-        exit(1)
-
-    verboseprint("has tags", ' '.join(tags))
-    # If the current checkpoint has a tag we don't know about, we have
-    # a divergence that (in general) must be addressed by (e.g.) merging
-    # simulator support for its changes.
-    unknown_tags = tags - (Upgrader.tag_set | Upgrader.untag_set)
-    if unknown_tags:
-        print "warning: upgrade script does not recognize the following "\
-              "tags in this checkpoint:", ' '.join(unknown_tags)
-
-    # Apply migrations for tags not in checkpoint and tags present for which
-    # downgraders are present, respecting dependences
-    to_apply = (Upgrader.tag_set - tags) | (Upgrader.untag_set & tags)
-    while to_apply:
-        ready = set([ t for t in to_apply if Upgrader.get(t).ready(tags) ])
-        if not ready:
-            print "could not apply these upgrades:", ' '.join(to_apply)
-            print "update dependences impossible to resolve; aborting"
-            exit(1)
-
-        for tag in ready:
-            Upgrader.get(tag).update(cpt, tags)
-            change = True
-
-        to_apply -= ready
+        tags = set((''.join(cpt.get('Globals','version_tags'))).split())
 
-    if not change:
-        verboseprint("...nothing to do")
-        return
+    for tag in plan:
+        Upgrader.get(tag).update(cpt, tags)
 
     cpt.set('Globals', 'version_tags', ' '.join(tags))
 
     # Write the old data back
     verboseprint("...completed")
     cpt.write(file(path, 'w'))
+    return plan
+
+# Options of the checkpoints processed by a pool of workers, the workers
+# are forked after the upgraders are loaded and inherit them
+pool_options = {}
+
+def process_worker(path):
+    try:
+        return path, process_file(path, **pool_options), None
+    except SystemExit:
+        return path, None, "failed"
+    except Exception as e:
+        return path, None, str(e)
+
+def process_files(paths, jobs=None, **kwargs):
+    """
+    Upgrade many checkpoint files with a pool of jobs processes. Returns
+    the number of checkpoints that failed.
+    """
+    import multiprocessing
+
+    pool_options.clear()
+    pool_options.update(kwargs)
+    dry_run = kwargs.get('dry_run', False)
+
+    failed = 0
+    upgraded = 0
+    pool = multiprocessing.Pool(jobs)
+    for path, plan, error in pool.imap_unordered(process_worker, paths):
+        if error is not None:
+            print "%s: %s" % (path, error)
+            failed += 1
+        elif plan:
+            upgraded += 1
+            print "%s: %s%s" % (path, "needs " if dry_run else "",
+                                ' '.join(plan))
+        elif dry_run or verbose_print:
+            print "%s: up to date" % path
+    pool.close()
+    pool.join()
+
+    print "%d checkpoints, %d %s, %d failed" % \
+        (len(paths), upgraded, "to upgrade" if dry_run else "upgraded",
+         failed)
+    return failed
 
 if __name__ == '__main__':
     from optparse import OptionParser, SUPPRESS_HELP
@@ -270,6 +365,11 @@ if __name__ == '__main__':
     parser.add_option("-N", "--no-backup", action="store_false",
                       dest="backup", default=True,
                       help="Do no backup each checkpoint before modifying it")
+    parser.add_option("-n", "--dry-run", action="store_true",
+                      help="Only report the upgrades each checkpoint needs")
+    parser.add_option("-j", "--jobs", type="int",
+                      help="Number of checkpoints to upgrade in parallel "\
+                           "with -r (default: number of CPUs)")
     parser.add_option("-v", "--verbose", action="store_true",
                       help="Print out debugging information as")
     parser.add_option("--get-cc-file", action="store_true",
@@ -298,26 +398,32 @@ if __name__ == '__main__':
     # Deal with shell variables and ~
     path = osp.expandvars(osp.expanduser(args[0]))
 
+    kwargs = { 'backup' : options.backup, 'dry_run' : options.dry_run }
+
     # Process a single file if we have it
     if osp.isfile(path):
-        process_file(path, **vars(options))
+        paths = [ path ]
     # Process an entire directory
     elif osp.isdir(path):
         cpt_file = osp.join(path, 'm5.cpt')
         if options.recurse:
             # Visit very file and see if it matches
-            for root,dirs,files in os.walk(path):
-                for name in files:
-                    if name == 'm5.cpt':
-                        process_file(osp.join(root,name), **vars(options))
-                for dir in dirs:
-                    pass
+            paths = [ osp.join(root, 'm5.cpt')
+                      for root,dirs,files in os.walk(path)
+                      if 'm5.cpt' in files ]
+            sys.exit(1 if process_files(paths, options.jobs, **kwargs) else 0)
         # Maybe someone passed a cpt.XXXXXXX directory and not m5.cpt
         elif osp.isfile(cpt_file):
-            process_file(cpt_file, **vars(options))
+            paths = [ cpt_file ]
         else:
             print "Error: checkpoint file not found at in %s " % path,
             print "and recurse not specified"
             sys.exit(1)
-    sys.exit(0)
+    else:
+        print "Error: %s not found" % path
+        sys.exit(1)
 
+    plan = process_file(paths[0], **kwargs)
+    if options.dry_run:
+        print "%s: %s" % (paths[0], ' '.join(plan) if plan else "up to date")
+    sys.exit(0)
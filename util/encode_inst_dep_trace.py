@@ -88,7 +88,13 @@
 # 7,35666,1,COMP,3000::,4
 # 8,35670,1,STORE,1748748,4,74,0:,6,3:,7
 # 9,35670,1,COMP,500::,7
+#
+# Large traces can be encoded in parallel with -j, and with --per-cpu
+# every line starts with a CPU id, e.g. 0,1,35652,1,COMP,8500::, and one
+# trace per CPU is written in a single pass, see protolib.encodeTrace.
 
+import argparse
+import multiprocessing
 import protolib
 import sys
 
@@ -111,96 +117,109 @@ except:
 
 DepRecord = inst_dep_record_pb2.InstDepRecord
 
-def main():
-    if len(sys.argv) != 3:
-        print "Usage: ", sys.argv[0], " <ASCII input> <protobuf output>"
-        exit(-1)
+# Enum name,value lookup from proto
+enumValues = {}
+for namestr, valdesc in DepRecord.DESCRIPTOR.enum_values_by_name.items():
+    enumValues[namestr] = valdesc.number
+
+def parseLine(line):
+    """
+    Create a dependency record message of a line of the ASCII trace.
+    """
+    inst_info_str, rob_dep_str, reg_dep_str = (line.strip()).split(':')
+    inst_info_list = inst_info_str.split(',')
+    dep_record = DepRecord()
+
+    dep_record.seq_num = long(inst_info_list[0])
+    dep_record.pc = long(inst_info_list[1])
+    dep_record.weight = long(inst_info_list[2])
+    # If the type is not one of the enum values, it should be a key error
+    try:
+        dep_record.type = enumValues[inst_info_list[3]]
+    except KeyError:
+        raise ValueError("Seq. num %d has unsupported type %s" %
+                         (dep_record.seq_num, inst_info_list[3]))
+
+    if dep_record.type == DepRecord.INVALID:
+        raise ValueError("Seq. num %d is of INVALID type" %
+                         dep_record.seq_num)
+
+    # If the instruction is a load or store record the physical addr,
+    # size flags in addition to recording the computation delay
+    if dep_record.type in [DepRecord.LOAD, DepRecord.STORE]:
+        p_addr, size, flags, comp_delay = inst_info_list[4:8]
+        dep_record.p_addr = long(p_addr)
+        dep_record.size = int(size)
+        dep_record.flags = int(flags)
+        dep_record.comp_delay = long(comp_delay)
+    else:
+        comp_delay = inst_info_list[4]
+        dep_record.comp_delay = long(comp_delay)
+
+    # Parse the register and order dependencies both of which are
+    # repeated fields. An empty list is valid.
+    rob_deps = rob_dep_str.strip().split(',')
+    for a_dep in rob_deps:
+        # if the string is empty, split(',') returns 1 item: ''
+        # if the string is ",4", split(',') returns 2 items: '', '4'
+        # long('') gives error, so check if the item is non-empty
+        if a_dep:
+            dep_record.rob_dep.append(long(a_dep))
+
+    reg_deps = reg_dep_str.split(',')
+    for a_dep in reg_deps:
+        if a_dep:
+            dep_record.reg_dep.append(long(a_dep))
+
+    return dep_record
 
-    # Open the file in write mode
-    proto_out = open(sys.argv[2], 'wb')
+def main():
+    parser = argparse.ArgumentParser(
+        description = "Encode an ASCII instruction dependency trace into a "
+                      "gem5 protobuf trace")
+    parser.add_argument("input", help = "ASCII input")
+    parser.add_argument("output", help = "protobuf output")
+    parser.add_argument("-j", "--jobs", type = int, default = 1,
+                        help = "number of parallel encoding processes, 0 "
+                               "for one per core")
+    parser.add_argument("--per-cpu", action = "store_true",
+                        help = "lines start with a CPU id, write one trace "
+                               "per CPU")
+    args = parser.parse_args()
 
     # Open the file in read mode
     try:
-        ascii_in = open(sys.argv[1], 'r')
+        open(args.input, 'r').close()
     except IOError:
-        print "Failed to open ", sys.argv[1], " for reading"
+        print "Failed to open ", args.input, " for reading"
         exit(-1)
 
-    # Write the magic number in 4-byte Little Endian, similar to what
-    # is done in src/proto/protoio.cc
-    proto_out.write("gem5")
-
     # Add the packet header
     header = inst_dep_record_pb2.InstDepRecordHeader()
-    header.obj_id = "Converted ASCII trace " + sys.argv[1]
+    header.obj_id = "Converted ASCII trace " + args.input
     # Assume the default tick rate
     header.tick_freq = 1000000000
     header.window_size = 120
-    protolib.encodeMessage(proto_out, header)
 
     print "Creating enum name,value lookup from proto"
-    enumValues = {}
-    for namestr, valdesc in DepRecord.DESCRIPTOR.enum_values_by_name.items():
-        print '\t', namestr, valdesc.number
-        enumValues[namestr] = valdesc.number
-
-    num_records = 0
-    # For each line in the ASCII trace, create a packet message and
-    # write it to the encoded output
-    for line in ascii_in:
-        inst_info_str, rob_dep_str, reg_dep_str = (line.strip()).split(':')
-        inst_info_list = inst_info_str.split(',')
-        dep_record = DepRecord()
-
-        dep_record.seq_num = long(inst_info_list[0])
-        dep_record.pc = long(inst_info_list[1])
-        dep_record.weight = long(inst_info_list[2])
-        # If the type is not one of the enum values, it should be a key error
-        try:
-            dep_record.type = enumValues[inst_info_list[3]]
-        except KeyError:
-            print "Seq. num", dep_record.seq_num, "has unsupported type", \
-                inst_info_list[3]
-            exit(-1)
-
-        if dep_record.type == DepRecord.INVALID:
-            print "Seq. num", dep_record.seq_num, "is of INVALID type"
-            exit(-1)
-
-        # If the instruction is a load or store record the physical addr,
-        # size flags in addition to recording the computation delay
-        if dep_record.type in [DepRecord.LOAD, DepRecord.STORE]:
-            p_addr, size, flags, comp_delay = inst_info_list[4:8]
-            dep_record.p_addr = long(p_addr)
-            dep_record.size = int(size)
-            dep_record.flags = int(flags)
-            dep_record.comp_delay = long(comp_delay)
-        else:
-            comp_delay = inst_info_list[4]
-            dep_record.comp_delay = long(comp_delay)
-
-        # Parse the register and order dependencies both of which are
-        # repeated fields. An empty list is valid.
-        rob_deps = rob_dep_str.strip().split(',')
-        for a_dep in rob_deps:
-            # if the string is empty, split(',') returns 1 item: ''
-            # if the string is ",4", split(',') returns 2 items: '', '4'
-            # long('') gives error, so check if the item is non-empty
-            if a_dep:
-                dep_record.rob_dep.append(long(a_dep))
-
-        reg_deps = reg_dep_str.split(',')
-        for a_dep in reg_deps:
-            if a_dep:
-                dep_record.reg_dep.append(long(a_dep))
-
-        protolib.encodeMessage(proto_out, dep_record)
-        num_records += 1
-
-    print "Converted", num_records, "records."
-    # We're done
-    ascii_in.close()
-    proto_out.close()
+    for namestr in sorted(enumValues, key = enumValues.get):
+        print '\t', namestr, enumValues[namestr]
+
+    jobs = args.jobs or multiprocessing.cpu_count()
+    try:
+        counts = protolib.encodeTrace(args.input, args.output, header,
+                                      parseLine, jobs, args.per_cpu)
+    except IOError, e:
+        print "Failed to encode ", args.output, ": ", e
+        exit(-1)
+    except ValueError, e:
+        print "Malformed line in", e
+        exit(-1)
+
+    for cpu in sorted(counts):
+        name = args.output if cpu is None else \
+            protolib.cpuFileName(args.output, cpu)
+        print "Converted", counts[cpu], "records to", name
 
 if __name__ == "__main__":
     main()
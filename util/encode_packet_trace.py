@@ -52,7 +52,13 @@
 #
 # This script can of course also be used as a template to convert
 # other trace formats into the gem5 protobuf format
+#
+# Large traces can be encoded in parallel with -j, and with --per-cpu
+# every line starts with a CPU id, e.g. 0,r,128,64,4000, and one trace
+# per CPU is written in a single pass, see protolib.encodeTrace.
 
+import argparse
+import multiprocessing
 import protolib
 import sys
 
@@ -80,49 +86,60 @@ except:
         print "Failed to import packet proto definitions"
         exit(-1)
 
-def main():
-    if len(sys.argv) != 3:
-        print "Usage: ", sys.argv[0], " <ASCII input> <protobuf output>"
-        exit(-1)
+def parseLine(line):
+    """
+    Create a packet message of a line of the ASCII trace.
+    """
+    cmd, addr, size, tick = line.split(',')
+    packet = packet_pb2.Packet()
+    packet.tick = long(tick)
+    # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
+    packet.cmd = 1 if cmd == 'r' else 4
+    packet.addr = long(addr)
+    packet.size = int(size)
+    return packet
 
-    try:
-        ascii_in = open(sys.argv[1], 'r')
-    except IOError:
-        print "Failed to open ", sys.argv[1], " for reading"
-        exit(-1)
+def main():
+    parser = argparse.ArgumentParser(
+        description = "Encode an ASCII packet trace into a gem5 protobuf "
+                      "packet trace")
+    parser.add_argument("input", help = "ASCII input")
+    parser.add_argument("output", help = "protobuf output")
+    parser.add_argument("-j", "--jobs", type = int, default = 1,
+                        help = "number of parallel encoding processes, 0 "
+                               "for one per core")
+    parser.add_argument("--per-cpu", action = "store_true",
+                        help = "lines start with a CPU id, write one trace "
+                               "per CPU")
+    args = parser.parse_args()
 
     try:
-        proto_out = open(sys.argv[2], 'wb')
+        open(args.input, 'r').close()
     except IOError:
-        print "Failed to open ", sys.argv[2], " for writing"
+        print "Failed to open ", args.input, " for reading"
         exit(-1)
 
-    # Write the magic number in 4-byte Little Endian, similar to what
-    # is done in src/proto/protoio.cc
-    proto_out.write("gem5")
-
     # Add the packet header
     header = packet_pb2.PacketHeader()
-    header.obj_id = "Converted ASCII trace " + sys.argv[1]
+    header.obj_id = "Converted ASCII trace " + args.input
     # Assume the default tick rate
     header.tick_freq = 1000000000000
-    protolib.encodeMessage(proto_out, header)
 
-    # For each line in the ASCII trace, create a packet message and
-    # write it to the encoded output
-    for line in ascii_in:
-        cmd, addr, size, tick = line.split(',')
-        packet = packet_pb2.Packet()
-        packet.tick = long(tick)
-        # ReadReq is 1 and WriteReq is 4 in src/mem/packet.hh Command enum
-        packet.cmd = 1 if cmd == 'r' else 4
-        packet.addr = long(addr)
-        packet.size = int(size)
-        protolib.encodeMessage(proto_out, packet)
+    jobs = args.jobs or multiprocessing.cpu_count()
+    try:
+        counts = protolib.encodeTrace(args.input, args.output, header,
+                                      parseLine, jobs, args.per_cpu)
+    except IOError, e:
+        print "Failed to encode ", args.output, ": ", e
+        exit(-1)
+    except ValueError, e:
+        print "Malformed line in", e
+        exit(-1)
 
-    # We're done
-    ascii_in.close()
-    proto_out.close()
+    for cpu in sorted(counts):
+        name = args.output if cpu is None else \
+            protolib.cpuFileName(args.output, cpu)
+        print "Converted", counts[cpu], "packets to", name
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python2.7
+
+# This script converts the memory images of a checkpoint between the gzip
+# format and the page pool format of src/mem/page_store.hh, in which only the
+# unique non-zero pages of the memory are stored in a pool directory that is
+# shared by many checkpoints, e.g.
+#
+#   memory_pages.py pack m5out/cpt.1234 --pool /dist/cpt_pages
+#   memory_pages.py unpack m5out/cpt.1234
+#
+# Checkpoints are written into a page pool directly by setting
+# memory_page_pool of the System.
+
+from ConfigParser import ConfigParser
+import binascii
+import gzip
+import multiprocessing
+import os
+import struct
+import zlib
+
+TABLE_MAGIC = "gem5pgtb"
+TABLE_VERSION = 1
+# magic, version, page size, number of pages
+_TABLE_HEADER = struct.Struct('<8sIIQ')
+
+PAGE_SIZE = 4096
+HASH_SIZE = 16
+ZERO_HASH = "\0" * HASH_SIZE
+
+# Pages per chunk handed to a worker
+CHUNK_PAGES = 4096
+
+_MASK = (1 << 64) - 1
+_C1 = 0x87c37b91114253d5
+_C2 = 0x4cf5ad432745937f
+
+class myCP(ConfigParser):
+    def __init__(self):
+        ConfigParser.__init__(self)
+
+    def optionxform(self, optionstr):
+        return optionstr
+
+def _numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+def _rotl(x, r):
+    return ((x << r) | (x >> (64 - r))) & _MASK
+
+def _fmix(k):
+    k ^= k >> 33
+    k = (k * 0xff51afd7ed558ccd) & _MASK
+    k ^= k >> 33
+    k = (k * 0xc4ceb9fe1a85ec53) & _MASK
+    k ^= k >> 33
+    return k
+
+def hash_page(page):
+    """
+    Return the 128 bit MurmurHash3 (x64 variant, seed 0) of a page as 16
+    bytes, h1 followed by h2 in little endian.
+    """
+    words = struct.unpack('<%dQ' % (len(page) // 8), page)
+    h1 = h2 = 0
+    for i in xrange(0, len(words), 2):
+        k1 = _rotl((words[i] * _C1) & _MASK, 31) * _C2 & _MASK
+        h1 ^= k1
+        h1 = (_rotl(h1, 27) + h2) & _MASK
+        h1 = (h1 * 5 + 0x52dce729) & _MASK
+
+        k2 = _rotl((words[i + 1] * _C2) & _MASK, 33) * _C1 & _MASK
+        h2 ^= k2
+        h2 = (_rotl(h2, 31) + h1) & _MASK
+        h2 = (h2 * 5 + 0x38495ab5) & _MASK
+
+    h1 ^= len(page)
+    h2 ^= len(page)
+    h1 = (h1 + h2) & _MASK
+    h2 = (h2 + h1) & _MASK
+    h1 = _fmix(h1)
+    h2 = _fmix(h2)
+    h1 = (h1 + h2) & _MASK
+    h2 = (h2 + h1) & _MASK
+    return struct.pack('<QQ', h1, h2)
+
+def hash_pages(data, page_size):
+    """
+    Return the hashes of the pages of data, ZERO_HASH for zero pages.
+    """
+    np = _numpy()
+    num_pages = len(data) // page_size
+    if np is None:
+        zero = "\0" * page_size
+        pages = [ data[i * page_size:(i + 1) * page_size]
+                  for i in xrange(num_pages) ]
+        return [ ZERO_HASH if page == zero else hash_page(page)
+                 for page in pages ]
+
+    # Hash all pages at once, one block of every page at a time
+    u64 = np.uint64
+    words = np.frombuffer(data, '<u8').reshape(num_pages, page_size // 8)
+
+    def rotl(x, r):
+        return (x << u64(r)) | (x >> u64(64 - r))
+
+    def fmix(k):
+        k ^= k >> u64(33)
+        k *= u64(0xff51afd7ed558ccd)
+        k ^= k >> u64(33)
+        k *= u64(0xc4ceb9fe1a85ec53)
+        k ^= k >> u64(33)
+        return k
+
+    c1, c2 = u64(_C1), u64(_C2)
+    h1 = np.zeros(num_pages, u64)
+    h2 = np.zeros(num_pages, u64)
+    with np.errstate(over = 'ignore'):
+        for i in xrange(0, page_size // 8, 2):
+            h1 ^= rotl(words[:, i] * c1, 31) * c2
+            h1 = (rotl(h1, 27) + h2) * u64(5) + u64(0x52dce729)
+
+            h2 ^= rotl(words[:, i + 1] * c2, 33) * c1
+            h2 = (rotl(h2, 31) + h1) * u64(5) + u64(0x38495ab5)
+
+        h1 ^= u64(page_size)
+        h2 ^= u64(page_size)
+        h1 += h2
+        h2 += h1
+        h1 = fmix(h1)
+        h2 = fmix(h2)
+        h1 += h2
+        h2 += h1
+
+    hashes = np.column_stack((h1, h2)).astype('<u8')
+    hashes[~words.any(axis = 1)] = 0
+    hashes = hashes.tostring()
+    return [ hashes[i * HASH_SIZE:(i + 1) * HASH_SIZE]
+             for i in xrange(num_pages) ]
+
+def page_path(pool, digest):
+    digits = binascii.hexlify(digest)
+    return os.path.join(pool, digits[0:2], digits[2:4], digits)
+
+def write_page(pool, digest, page):
+    path = page_path(pool, digest)
+    if os.path.exists(path):
+        return False
+
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError:
+        if not os.path.isdir(os.path.dirname(path)):
+            raise
+
+    data = zlib.compress(page, 1)
+    if len(data) >= len(page):
+        data = page
+
+    # Written to a temporary file and renamed, so that other writers
+    # sharing the pool never see a partly written page
+    tmp = "%s.tmp.%d" % (path, os.getpid())
+    f = open(tmp, 'wb')
+    f.write(data)
+    f.close()
+    os.rename(tmp, path)
+    return True
+
+def read_page(pool, digest, page_size):
+    path = page_path(pool, digest)
+    data = open(path, 'rb').read()
+    if len(data) != page_size:
+        data = zlib.decompress(data)
+    if len(data) != page_size:
+        raise IOError("%s is not a memory page" % path)
+    return data
+
+def pack_chunk(args):
+    """
+    Hash the pages of a chunk and store the new ones in the pool.
+    """
+    (pool, data, page_size) = args
+    hashes = hash_pages(data, page_size)
+    new = 0
+    for i, digest in enumerate(hashes):
+        if digest != ZERO_HASH:
+            page = data[i * page_size:(i + 1) * page_size]
+            new += write_page(pool, digest, page)
+    return "".join(hashes), new
+
+def unpack_chunk(args):
+    """
+    Read the pages of a chunk from the pool.
+    """
+    (pool, hashes, page_size) = args
+    zero = "\0" * page_size
+    pages = []
+    for i in xrange(0, len(hashes), HASH_SIZE):
+        digest = hashes[i:i + HASH_SIZE]
+        if digest == ZERO_HASH:
+            pages.append(zero)
+        else:
+            pages.append(read_page(pool, digest, page_size))
+    return "".join(pages)
+
+def read_chunks(f, size):
+    while True:
+        data = f.read(size)
+        if not data:
+            break
+        yield data
+
+def memory_stores(config):
+    """
+    Return the sections of the memory images of a checkpoint.
+    """
+    return [ sec for sec in config.sections()
+             if config.has_option(sec, "store_id") and
+                config.has_option(sec, "filename") and
+                config.has_option(sec, "range_size") ]
+
+def pack_store(pool, cpt, config, sec, workers):
+    filename = config.get(sec, "filename")
+    range_size = int(config.get(sec, "range_size"))
+    if range_size % PAGE_SIZE:
+        print "%s: memory size is not a multiple of the page size" % sec
+        return False
+
+    num_pages = range_size // PAGE_SIZE
+    table_name = filename[:-len(".pmem")] + ".pages"
+    image = gzip.open(os.path.join(cpt, filename), 'rb')
+    table = open(os.path.join(cpt, table_name), 'wb')
+    table.write(_TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, PAGE_SIZE,
+                                   num_pages))
+
+    def chunks():
+        size = 0
+        for data in read_chunks(image, CHUNK_PAGES * PAGE_SIZE):
+            data = data[:range_size - size]
+            size += len(data)
+            yield (pool, data, PAGE_SIZE)
+        # A short image is zero at the end
+        zero = "\0" * (CHUNK_PAGES * PAGE_SIZE)
+        while size < range_size:
+            data = zero[:range_size - size]
+            size += len(data)
+            yield (pool, data, PAGE_SIZE)
+
+    new = 0
+    for hashes, chunk_new in workers.imap(pack_chunk, chunks()):
+        table.write(hashes)
+        new += chunk_new
+    table.close()
+    image.close()
+
+    print "%s: %d pages, %d new in the pool" % (sec, num_pages, new)
+    config.set(sec, "filename", table_name)
+    config.set(sec, "page_pool", pool)
+    return filename
+
+def unpack_store(cpt, config, sec, workers):
+    filename = config.get(sec, "filename")
+    pool = config.get(sec, "page_pool")
+    if not os.path.isabs(pool):
+        pool = os.path.join(cpt, pool)
+
+    table = open(os.path.join(cpt, filename), 'rb')
+    magic, version, page_size, num_pages = \
+        _TABLE_HEADER.unpack(table.read(_TABLE_HEADER.size))
+    if magic != TABLE_MAGIC or version != TABLE_VERSION:
+        raise IOError("%s is not a memory page table" % filename)
+
+    image_name = filename[:-len(".pages")] + ".pmem"
+    image = gzip.open(os.path.join(cpt, image_name), 'wb')
+    chunks = ( (pool, hashes, page_size) for hashes in
+               read_chunks(table, CHUNK_PAGES * HASH_SIZE) )
+    for data in workers.imap(unpack_chunk, chunks):
+        image.write(data)
+    image.close()
+    table.close()
+
+    print "%s: %d pages" % (sec, num_pages)
+    config.set(sec, "filename", image_name)
+    config.remove_option(sec, "page_pool")
+    return filename
+
+def convert(cpt, pool, keep, jobs):
+    cpt_file = os.path.join(cpt, "m5.cpt")
+    config = myCP()
+    config.readfp(open(cpt_file))
+
+    workers = multiprocessing.Pool(jobs)
+    old_files = []
+    for sec in memory_stores(config):
+        packed = config.has_option(sec, "page_pool")
+        if pool is not None and not packed:
+            old = pack_store(pool, cpt, config, sec, workers)
+        elif pool is None and packed:
+            old = unpack_store(cpt, config, sec, workers)
+        else:
+            continue
+        if old:
+            old_files.append(old)
+    workers.close()
+    workers.join()
+
+    if not old_files:
+        print "%s: nothing to convert" % cpt
+        return
+
+    # Write the config before the old images are removed
+    tmp = cpt_file + ".tmp"
+    config.write(open(tmp, 'w'))
+    os.rename(tmp, cpt_file)
+
+    if not keep:
+        for filename in old_files:
+            os.remove(os.path.join(cpt, filename))
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description = "Convert the memory images of "
+                            "checkpoints between gzip images and a page pool")
+    parser.add_argument("-j", "--jobs", action = "store", type = int,
+                        help = "Number of processes to hash and copy pages "
+                               "with (default: number of CPUs)")
+    parser.add_argument("-k", "--keep", action = "store_true",
+                        help = "Keep the old memory files")
+    commands = parser.add_subparsers(dest = "command")
+    pack = commands.add_parser("pack", help = "Store the memory images of "
+                               "checkpoints in a page pool")
+    pack.add_argument("--pool", required = True,
+                      help = "Page pool directory")
+    pack.add_argument("cpts", nargs = '+', help = "Checkpoint directories")
+    unpack = commands.add_parser("unpack", help = "Write the memory images "
+                                 "of checkpoints from their page pool")
+    unpack.add_argument("cpts", nargs = '+', help = "Checkpoint directories")
+
+    options = parser.parse_args()
+    pool = None
+    if options.command == "pack":
+        pool = os.path.abspath(options.pool)
+
+    for cpt in options.cpts:
+        convert(cpt, pool, options.keep, options.jobs)
@@ -69,11 +69,21 @@ if __name__ == '__main__':
         help='time of last event to load from file')
     parser.add_argument('--mini-views', action='store_true', default=False,
         help='show tiny views of the next 10 time steps')
+    parser.add_argument('--margin', metavar='steps', type=int, default=1000,
+        help='number of time steps around the viewed time to load from an '
+            + 'index of the event file (default: 1000)')
+    parser.add_argument('--no-index', action='store_true', default=False,
+        help='load all events from the file instead of using an index')
     parser.add_argument('eventFile', metavar='event-file', default='ev')
 
     args = parser.parse_args(sys.argv[1:])
 
-    model = BlobModel(unitNamePrefix=args.prefix)
+    if args.no_index:
+        margin = None
+    else:
+        margin = args.margin
+
+    model = BlobModel(unitNamePrefix=args.prefix, margin=margin)
 
     if args.picture and os.access(args.picture, os.O_RDONLY):
         model.load_picture(args.picture)
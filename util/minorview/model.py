@@ -43,6 +43,9 @@ import re
 import blobs
 from time import time as wall_time
 import os
+import bisect
+import cPickle
+from array import array
 
 id_parts = "TSPLFE"
 
@@ -537,16 +540,169 @@ class BlobEvent(object):
             map(find_inst, blocks)
         return sorted(ret)
 
+match_line_re = re.compile(
+    '^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$')
+
+# Line and fetch sequence numbers of an id= pair
+match_id_re = re.compile('\\bid=(?:F;)?\d+/\d+\.\d+/(\d+)(?:/(\d+))?')
+
+class EventIndex(object):
+    """Time to file offset index of an event file.  times holds every time
+    at which there are unit events (MinorTrace lines or comments) and
+    offsets the offset of the first line at each of those times.  For every
+    unit, the times and offsets of its MinorTrace lines that differ from the
+    previous line of that unit and the times of its comments are kept, and
+    the offsets of the MinorInst and MinorLine lines by fetch and line
+    sequence number.  The index is stored next to the event file so it is
+    only built once"""
+    version = 2
+    suffix = '.mvidx'
+
+    def __init__(self):
+        self.times = array('l')
+        self.offsets = array('l')
+        self.unitTimes = {}
+        self.unitOffsets = {}
+        self.commentTimes = {}
+        self.instKeys = array('l')
+        self.instOffsets = array('l')
+        self.lineKeys = array('l')
+        self.lineOffsets = array('l')
+
+    def build(self, file, unitNamePrefix):
+        """Index the event file in a single pass"""
+        unit_prefix_re = re.compile('^' + unitNamePrefix + '\.?(.*)$')
+        time = -1
+        time_offset = 0
+        time_indexed = False
+        last_time_lines = {}
+        insts = []
+        lines = []
+
+        f = open(file)
+        offset = 0
+        for l in f:
+            match = match_line_re.match(l)
+            if match is not None:
+                event_time, unit, line_type, rest = match.groups()
+                event_time = int(event_time)
+
+                if event_time != time:
+                    time = event_time
+                    time_offset = offset
+                    time_indexed = False
+
+                if line_type is None or line_type == 'MinorTrace:':
+                    if not time_indexed:
+                        self.times.append(time)
+                        self.offsets.append(time_offset)
+                        time_indexed = True
+
+                    unit = unit_prefix_re.sub('\\1', unit)
+                    if line_type is None:
+                        if unit not in self.commentTimes:
+                            self.commentTimes[unit] = array('l')
+                        times = self.commentTimes[unit]
+                        if len(times) == 0 or times[-1] != time:
+                            times.append(time)
+                    elif last_time_lines.get(unit, None) != rest:
+                        if unit not in self.unitTimes:
+                            self.unitTimes[unit] = array('l')
+                            self.unitOffsets[unit] = array('l')
+                        self.unitTimes[unit].append(time)
+                        self.unitOffsets[unit].append(offset)
+                        last_time_lines[unit] = rest
+                elif line_type in ('MinorInst:', 'MinorLine:'):
+                    id_match = match_id_re.search(rest)
+                    if id_match is not None:
+                        line_seq_num, fetch_seq_num = id_match.groups()
+                        if line_type == 'MinorInst:':
+                            insts.append((int(fetch_seq_num or 0), offset))
+                        else:
+                            lines.append((int(line_seq_num), offset))
+            offset += len(l)
+        f.close()
+
+        insts.sort()
+        lines.sort()
+        self.instKeys.extend(key for key, offset in insts)
+        self.instOffsets.extend(offset for key, offset in insts)
+        self.lineKeys.extend(key for key, offset in lines)
+        self.lineOffsets.extend(offset for key, offset in lines)
+
+    def save(self, filename, key):
+        """Store the index with a key identifying the indexed file"""
+        arrays = {}
+        for name, value in self.__dict__.iteritems():
+            if isinstance(value, array):
+                arrays[name] = value.tostring()
+            else:
+                arrays[name] = dict((unit, a.tostring())
+                    for unit, a in value.iteritems())
+        f = open(filename, 'wb')
+        cPickle.dump((self.version, key, arrays), f, 2)
+        f.close()
+
+    def load(self, filename, key):
+        """Load a stored index, return False if it is missing or stale"""
+        try:
+            f = open(filename, 'rb')
+            version, stored_key, arrays = cPickle.load(f)
+            f.close()
+        except (IOError, EOFError, ValueError, cPickle.UnpicklingError):
+            return False
+
+        if version != self.version or stored_key != key:
+            return False
+
+        for name, value in arrays.iteritems():
+            if isinstance(value, dict):
+                units = {}
+                for unit, string in value.iteritems():
+                    units[unit] = array('l')
+                    units[unit].fromstring(string)
+                setattr(self, name, units)
+            else:
+                getattr(self, name).fromstring(value)
+        return True
+
+    @staticmethod
+    def open(file, unitNamePrefix):
+        """Load the index of file, building and storing it if needed"""
+        stat = os.stat(file)
+        key = (stat.st_size, stat.st_mtime, unitNamePrefix)
+        filename = file + EventIndex.suffix
+
+        index = EventIndex()
+        if index.load(filename, key):
+            return index
+
+        print 'Indexing file', file
+        start_wall_time = wall_time()
+        index = EventIndex()
+        index.build(file, unitNamePrefix)
+        print 'Time to index:', wall_time() - start_wall_time
+        try:
+            index.save(filename, key)
+        except IOError:
+            print 'Can\'t store index', filename
+        return index
+
 class BlobModel(object):
-    """Model bringing together blob definitions and parsed events"""
-    def __init__(self, unitNamePrefix=''):
+    """Model bringing together blob definitions and parsed events.  If a
+    margin is given, events are loaded from an index of the event file
+    only for a window of the margin number of times around the times
+    looked at"""
+    def __init__(self, unitNamePrefix='', margin=None):
         self.blobs = []
         self.unitNameToBlobs = {}
         self.unitEvents = {}
+        self.index = None
         self.clear_events()
         self.picSize = Point(20,10)
         self.lastTime = 0
         self.unitNamePrefix = unitNamePrefix
+        self.margin = margin
 
     def clear_events(self):
         """Drop all events and times"""
@@ -555,6 +711,11 @@ class BlobModel(object):
         self.insts = {}
         self.lines = {}
         self.numEvents = 0
+        # Loaded window of times and instruction/line keys when events are
+        #   loaded from the index
+        self.windowStart = None
+        self.windowEnd = None
+        self.loadedKeys = set()
 
         for unit, events in self.unitEvents.iteritems():
             self.unitEvents[unit] = []
@@ -584,6 +745,11 @@ class BlobModel(object):
         macroop_key = (id.fetchSeqNum, 0)
         full_key = (id.fetchSeqNum, id.execSeqNum)
 
+        if (self.index is not None and full_key not in self.insts and
+            macroop_key not in self.insts):
+            self.load_indexed_lines('inst', self.index.instKeys,
+                self.index.instOffsets, id.fetchSeqNum)
+
         if full_key in self.insts:
             return self.insts[full_key]
         elif macroop_key in self.insts:
@@ -619,6 +785,9 @@ class BlobModel(object):
     def find_line(self, id):
         """Find a line by id"""
         key = id.lineSeqNum
+        if self.index is not None and key not in self.lines:
+            self.load_indexed_lines('line', self.index.lineKeys,
+                self.index.lineOffsets, key)
         return self.lines.get(key, None)
 
     def find_event_bisection(self, unit, time, events,
@@ -650,6 +819,13 @@ class BlobModel(object):
 
     def find_unit_event_by_time(self, unit, time):
         """Find the last event for the given unit at time <= time"""
+        if self.index is not None:
+            self.load_window(time)
+
+        return self.find_loaded_unit_event_by_time(unit, time)
+
+    def find_loaded_unit_event_by_time(self, unit, time):
+        """Find the last loaded event for the given unit at time <= time"""
         if unit in self.unitEvents:
             events = self.unitEvents[unit]
             ret = self.find_event_bisection(unit, time, events,
@@ -662,11 +838,7 @@ class BlobModel(object):
     def find_time_index(self, time):
         """Find a time index close to the given time (where
         times[return] <= time and times[return+1] > time"""
-        ret = 0
-        lastIndex = len(self.times) - 1
-        while ret < lastIndex and self.times[ret + 1] <= time:
-            ret += 1
-        return ret
+        return max(0, bisect.bisect_right(self.times, time) - 1)
 
     def add_minor_inst(self, rest):
         """Parse and add a MinorInst line to the model"""
@@ -719,66 +891,52 @@ class BlobModel(object):
 
             self.add_line(LineFault(id, pairs['fault'], vaddr, other_pairs))
 
-    def load_events(self, file, startTime=0, endTime=None):
-        """Load an event file and add everything to this model"""
-        def update_comments(comments, time):
-            # Add a list of comments to an existing event, if there is one at
-            #   the given time, or create a new, correctly-timed, event from
-            #   the last event and attach the comments to that
-            for commentUnit, commentRest in comments:
-                event = self.find_unit_event_by_time(commentUnit, time)
-                # Find an event to which this comment can be attached
-                if event is None:
-                    # No older event, make a new empty one
-                    event = BlobEvent(commentUnit, time, {})
-                    self.add_unit_event(event)
-                elif event.time != time:
-                    # Copy the old event and make a new one with the right
-                    #   time and comment
-                    newEvent = BlobEvent(commentUnit, time, event.pairs)
-                    newEvent.visuals = dict(event.visuals)
-                    event = newEvent
-                    self.add_unit_event(event)
-                event.comments.append(commentRest)
+    def update_comments(self, comments, time):
+        """Add a list of comments to an existing event, if there is one at
+        the given time, or create a new, correctly-timed, event from the
+        last event and attach the comments to that"""
+        for commentUnit, commentRest in comments:
+            event = self.find_loaded_unit_event_by_time(commentUnit, time)
+            # Find an event to which this comment can be attached
+            if event is None:
+                # No older event, make a new empty one
+                event = BlobEvent(commentUnit, time, {})
+                self.add_unit_event(event)
+            elif event.time != time:
+                # Copy the old event and make a new one with the right
+                #   time and comment
+                newEvent = BlobEvent(commentUnit, time, event.pairs)
+                newEvent.visuals = dict(event.visuals)
+                event = newEvent
+                self.add_unit_event(event)
+            event.comments.append(commentRest)
+
+    def add_minor_trace(self, unit, time, rest):
+        """Parse and add a MinorTrace line to the model"""
+        event = BlobEvent(unit, time, {})
+        pairs = parse.parse_pairs(rest)
+        event.pairs = pairs
 
-        self.clear_events()
+        # Try to decode the colour data for this event
+        blobs = self.unitNameToBlobs.get(unit, [])
+        for blob in blobs:
+            if blob.visualDecoder is not None:
+                event.visuals[blob.picChar] = (
+                    blob.visualDecoder(pairs))
+
+        self.add_unit_event(event)
+
+    def parse_events(self, f, l, endTime, last_time_lines):
+        """Parse the lines of an events file from line l on until endTime,
+        accumulating comments to be attached to MinorTrace events when the
+        time changes.  Return the number of MinorTrace lines"""
+        unit_prefix_re = re.compile('^' + self.unitNamePrefix + '\.?(.*)$')
 
         # A negative time will *always* be different from an event time
         time = -1
-        time_events = {}
-        last_time_lines = {}
         minor_trace_line_count = 0
         comments = []
-
-        default_colour = [[colours.unknownColour]]
-        next_progress_print_event_count = 1000
-
-        if not os.access(file, os.R_OK):
-            print 'Can\'t open file', file
-            exit(1)
-        else:
-            print 'Opening file', file
-
-        f = open(file)
-
-        start_wall_time = wall_time()
-
-        # Skip leading events
-        still_skipping = True
-        l = f.readline()
-        while l and still_skipping:
-            match = re.match('^\s*(\d+):', l)
-            if match is not None:
-                event_time = match.groups()
-                if int(event_time[0]) >= startTime:
-                    still_skipping = False
-                else:
-                    l = f.readline()
-            else:
-                l = f.readline()
-
-        match_line_re = re.compile(
-            '^\s*(\d+):\s*([\w\.]+):\s*(Minor\w+:)?\s*(.*)$')
+        next_progress_print_event_count = self.numEvents + 1000
 
         # Parse each line of the events file, accumulating comments to be
         #   attached to MinorTrace events when the time changes
@@ -789,8 +947,7 @@ class BlobModel(object):
                 event_time, unit, line_type, rest = match.groups()
                 event_time = int(event_time)
 
-                unit = re.sub('^' + self.unitNamePrefix + '\.?(.*)$',
-                    '\\1', unit)
+                unit = unit_prefix_re.sub('\\1', unit)
 
                 # When the time changes, resolve comments
                 if event_time != time:
@@ -798,7 +955,7 @@ class BlobModel(object):
                         print ('Parsed to time: %d' % event_time)
                         next_progress_print_event_count = (
                             self.numEvents + 1000)
-                    update_comments(comments, time)
+                    self.update_comments(comments, time)
                     comments = []
                     time = event_time
 
@@ -811,18 +968,7 @@ class BlobModel(object):
                     # Only insert this event if it's not the same as
                     #   the last event we saw for this unit
                     if last_time_lines.get(unit, None) != rest:
-                        event = BlobEvent(unit, event_time, {})
-                        pairs = parse.parse_pairs(rest)
-                        event.pairs = pairs
-
-                        # Try to decode the colour data for this event
-                        blobs = self.unitNameToBlobs.get(unit, [])
-                        for blob in blobs:
-                            if blob.visualDecoder is not None:
-                                event.visuals[blob.picChar] = (
-                                    blob.visualDecoder(pairs))
-
-                        self.add_unit_event(event)
+                        self.add_minor_trace(unit, event_time, rest)
                         last_time_lines[unit] = rest
                 elif line_type == 'MinorInst:':
                     self.add_minor_inst(rest)
@@ -834,7 +980,46 @@ class BlobModel(object):
 
             l = f.readline()
 
-        update_comments(comments, time)
+        self.update_comments(comments, time)
+        return minor_trace_line_count
+
+    def load_events(self, file, startTime=0, endTime=None):
+        """Load an event file and add everything to this model.  With a
+        margin, only index the event file and load events on demand"""
+        self.clear_events()
+        if self.index is not None:
+            self.file.close()
+            self.index = None
+
+        if not os.access(file, os.R_OK):
+            print 'Can\'t open file', file
+            exit(1)
+        else:
+            print 'Opening file', file
+
+        if self.margin is not None:
+            self.open_index(file, startTime, endTime)
+            return
+
+        f = open(file)
+
+        start_wall_time = wall_time()
+
+        # Skip leading events
+        still_skipping = True
+        l = f.readline()
+        while l and still_skipping:
+            match = re.match('^\s*(\d+):', l)
+            if match is not None:
+                event_time = match.groups()
+                if int(event_time[0]) >= startTime:
+                    still_skipping = False
+                else:
+                    l = f.readline()
+            else:
+                l = f.readline()
+
+        minor_trace_line_count = self.parse_events(f, l, endTime, {})
         self.extract_times()
         f.close()
 
@@ -844,6 +1029,117 @@ class BlobModel(object):
             self.numEvents
         print 'Time to parse:', end_wall_time - start_wall_time
 
+    def open_index(self, file, startTime=0, endTime=None):
+        """Use the (stored) index of an event file, restricted to the
+        times between startTime and endTime"""
+        self.index = EventIndex.open(file, self.unitNamePrefix)
+        self.file = open(file)
+
+        # Only the times of events of units in the picture, as found by
+        #   extract_times when loading all events
+        times = set()
+        for unit in self.unitEvents:
+            times.update(self.index.unitTimes.get(unit, []))
+            times.update(self.index.commentTimes.get(unit, []))
+        self.times = [time for time in sorted(times)
+            if time >= startTime and (endTime is None or time <= endTime)]
+        self.timeOffsets = [
+            self.index.offsets[bisect.bisect_left(self.index.times, time)]
+            for time in self.times]
+        if len(self.times) != 0:
+            self.lastTime = self.times[-1]
+
+        print 'Indexed times:', len(self.times)
+
+    def load_window(self, time):
+        """Make sure the events around time are loaded"""
+        if len(self.times) == 0 or (self.windowStart is not None and
+            self.windowStart <= time <= self.windowEnd):
+            return
+
+        index = self.find_time_index(time)
+        first = max(0, index - self.margin)
+        last = min(len(self.times) - 1, index + self.margin)
+
+        # Drop the previous window
+        for unit in self.unitEvents:
+            self.unitEvents[unit] = []
+        self.insts = {}
+        self.lines = {}
+        self.loadedKeys = set()
+        self.numEvents = 0
+
+        # The window is set before parsing as comments look up events
+        self.windowStart = self.times[first]
+        self.windowEnd = self.times[last]
+        if first == 0:
+            self.windowStart = min(self.windowStart, time)
+        if last == len(self.times) - 1:
+            self.windowEnd = max(self.windowEnd, time)
+
+        # Start every unit with its last event before the window
+        last_time_lines = {}
+        for unit in self.unitEvents:
+            start = self.times[first]
+            times = self.index.unitTimes.get(unit, [])
+            i = bisect.bisect_left(times, start) - 1
+            trace_time = None
+            if i >= 0:
+                self.file.seek(self.index.unitOffsets[unit][i])
+                match = match_line_re.match(self.file.readline())
+                event_time, unused, line_type, rest = match.groups()
+                trace_time = int(event_time)
+                self.add_minor_trace(unit, trace_time, rest)
+                last_time_lines[unit] = rest
+
+            # A later comment makes a new event from that one
+            times = self.index.commentTimes.get(unit, [])
+            i = bisect.bisect_left(times, start) - 1
+            if i >= 0 and (trace_time is None or times[i] >= trace_time):
+                self.update_comments(self.read_comments(unit, times[i]),
+                    times[i])
+
+        self.file.seek(self.timeOffsets[first])
+        self.parse_events(self.file, self.file.readline(), self.times[last],
+            last_time_lines)
+
+    def read_comments(self, unit, time):
+        """Read the comments of a unit at the given time"""
+        unit_prefix_re = re.compile('^' + self.unitNamePrefix + '\.?(.*)$')
+        comments = []
+
+        self.file.seek(self.index.offsets[
+            bisect.bisect_left(self.index.times, time)])
+        for l in self.file:
+            match = match_line_re.match(l)
+            if match is not None:
+                event_time, line_unit, line_type, rest = match.groups()
+                if int(event_time) != time:
+                    break
+                if (line_type is None and
+                    unit_prefix_re.sub('\\1', line_unit) == unit):
+                    comments.append((unit, rest))
+        return comments
+
+    def load_indexed_lines(self, kind, keys, offsets, key):
+        """Load the MinorInst or MinorLine lines with the given key"""
+        if (kind, key) in self.loadedKeys:
+            return
+        self.loadedKeys.add((kind, key))
+
+        first = bisect.bisect_left(keys, key)
+        last = bisect.bisect_right(keys, key)
+        for i in xrange(first, last):
+            self.file.seek(offsets[i])
+            match = match_line_re.match(self.file.readline())
+            if match is None:
+                continue
+            unused, unused, line_type, rest = match.groups()
+            if line_type == 'MinorInst:':
+                self.add_minor_inst(rest)
+            elif line_type == 'MinorLine:':
+                self.add_minor_line(rest)
+
     def add_blob_picture(self, offset, pic, nameDict):
         """Add a parsed ASCII-art pipeline markup to the model"""
         pic_width = 0
@@ -39,19 +39,22 @@
 
 # Pipeline activity viewer for the O3 CPU model.
 
+import heapq
 import optparse
 import os
 import sys
-import copy
 
 # Temporary storage for instructions. The queue is filled in out-of-order
-# until it reaches 'max_threshold' number of instructions. It is then
-# sorted out and instructions are printed out until their number drops to
-# 'min_threshold'.
+# until it reaches 'max_threshold' number of instructions. Instructions are
+# then printed in sequence number order until their number drops to
+# 'min_threshold'. The queue is a min-heap of (sn, order, inst) entries,
+# where order keeps instructions with equal sequence numbers in the order
+# they were queued.
 # It is assumed that the instructions are not out of order for more then
 # 'min_threshold' places - otherwise they will appear out of order.
 insts = {
     'queue': [] ,         # Instructions to print.
+    'order': 0,           # Number of instructions queued so far.
     'max_threshold':2000, # Instructions are sorted out and printed when
                           # their number reaches this threshold.
     'min_threshold':1000, # Printing stops when this number is reached.
@@ -65,8 +68,12 @@ insts = {
                           # otherwise the print may not start/stop
                           # at the time specified by tick_start/stop.
     'only_committed':0,   # Set if only committed instructions are printed.
+    'stages': None,       # Pipeline stages, see get_stages().
 }
 
+# Size of the reads of the trace file
+READ_BUFFER_SIZE = 1 << 20
+
 def process_trace(trace, outfile, cycle_time, width, color, timestamps,
                   committed_only, store_completions, start_tick, stop_tick, start_sn, stop_sn):
     global insts
@@ -77,32 +84,36 @@ def process_trace(trace, outfile, cycle_time, width, color, timestamps,
     insts['tick_stop'] = stop_tick
     insts['tick_drift'] = insts['tick_drift'] * cycle_time
     insts['only_committed'] = committed_only
-    line = None
+    insts['stages'] = get_stages(color, store_completions)
     fields = None
 
+    # The trace is read through a single line iterator, which reads the
+    # file in large blocks
+    lines = iter(trace)
+
     # Skip lines up to the starting tick
     if start_tick != 0:
-        while True:
-            line = trace.readline()
-            if not line: return
+        for line in lines:
             fields = line.split(':')
             if fields[0] != 'O3PipeView': continue
             if int(fields[2]) >= start_tick: break
+        else:
+            return
     elif start_sn != 0:
-        while True:
-            line = trace.readline()
-            if not line: return
+        for line in lines:
             fields = line.split(':')
             if fields[0] != 'O3PipeView': continue
             if fields[1] == 'fetch' and int(fields[5]) >= start_sn: break
+        else:
+            return
     else:
-        line = trace.readline()
+        line = next(lines, None)
         if not line: return
         fields = line.split(':')
 
     # Skip lines up to next instruction fetch
     while fields[0] != 'O3PipeView' or fields[1] != 'fetch':
-        line = trace.readline()
+        line = next(lines, None)
         if not line: return
         fields = line.split(':')
 
@@ -125,50 +136,55 @@ def process_trace(trace, outfile, cycle_time, width, color, timestamps,
 
     # Region of interest
     curr_inst = {}
+    fetch_stop = stop_tick + insts['tick_drift']
+    sn_stop = stop_sn + insts['max_threshold']
     while True:
         if fields[0] == 'O3PipeView':
-            curr_inst[fields[1]] = int(fields[2])
-            if fields[1] == 'fetch':
-                if ((stop_tick > 0 and int(fields[2]) > stop_tick+insts['tick_drift']) or
-                    (stop_sn > 0 and int(fields[5]) > (stop_sn+insts['max_threshold']))):
-                    print_insts(outfile, cycle_time, width, color, timestamps, 0)
+            stage = fields[1]
+            tick = int(fields[2])
+            curr_inst[stage] = tick
+            if stage == 'fetch':
+                sn = int(fields[5])
+                if ((stop_tick > 0 and tick > fetch_stop) or
+                    (stop_sn > 0 and sn > sn_stop)):
+                    print_insts(outfile, cycle_time, width, color, timestamps, store_completions, 0)
                     return
-                (curr_inst['pc'], curr_inst['upc']) = fields[3:5]
-                curr_inst['sn'] = int(fields[5])
+                curr_inst['pc'] = fields[3]
+                curr_inst['upc'] = fields[4]
+                curr_inst['sn'] = sn
                 curr_inst['disasm'] = ' '.join(fields[6][:-1].split())
-            elif fields[1] == 'retire':
-                if curr_inst['retire'] == 0:
+            elif stage == 'retire':
+                if tick == 0:
                     curr_inst['disasm'] = '-----' + curr_inst['disasm']
                 if store_completions:
                     curr_inst[fields[3]] = int(fields[4])
                 queue_inst(outfile, curr_inst, cycle_time, width, color, timestamps, store_completions)
 
-        line = trace.readline()
+        line = next(lines, None)
         if not line:
             print_insts(outfile, cycle_time, width, color, timestamps, store_completions, 0)
             return
         fields = line.split(':')
 
 
-#Sorts out instructions according to sequence number
-def compare_by_sn(a, b):
-    return cmp(a['sn'], b['sn'])
-
 # Puts new instruction into the print queue.
-# Sorts out and prints instructions when their number reaches threshold value
+# Prints instructions when their number reaches threshold value
 def queue_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions):
     global insts
-    l_copy = copy.deepcopy(inst)
-    insts['queue'].append(l_copy)
+    # The stage ticks and strings of an instruction are immutable, so a
+    # shallow copy is enough
+    heapq.heappush(insts['queue'], (inst['sn'], insts['order'], dict(inst)))
+    insts['order'] += 1
     if len(insts['queue']) > insts['max_threshold']:
         print_insts(outfile, cycle_time, width, color, timestamps, store_completions, insts['min_threshold'])
 
-# Sorts out and prints instructions in print queue
+# Prints instructions of the print queue in sequence number order
 def print_insts(outfile, cycle_time, width, color, timestamps, store_completions, lower_threshold):
     global insts
-    insts['queue'].sort(compare_by_sn)
-    while len(insts['queue']) > lower_threshold:
-        print_item=insts['queue'].pop(0)
+    queue = insts['queue']
+    out = []
+    while len(queue) > lower_threshold:
+        print_item = heapq.heappop(queue)[2]
         # As the instructions are processed out of order the main loop starts
         # earlier then specified by start_sn/tick and finishes later then what
         # is defined in stop_sn/tick.
@@ -185,10 +201,12 @@ def print_insts(outfile, cycle_time, width, color, timestamps, store_completions
 
         if (insts['only_committed'] != 0 and print_item['retire'] == 0):
             continue; # retire is set to zero if it hasn't been completed
-        print_inst(outfile,  print_item, cycle_time, width, color, timestamps, store_completions)
+        print_inst(out, print_item, cycle_time, width, color, timestamps, store_completions)
+    # Write the printed instructions in one batch
+    outfile.write(''.join(out))
 
-# Prints a single instruction
-def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_completions):
+# Returns the pipeline stages to print
+def get_stages(color, store_completions):
     if color:
         from m5.util.terminal import termcap
     else:
@@ -221,6 +239,16 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
             {'name': 'store',
              'color': termcap.Yellow + termcap.Reverse,
              'shorthand': 's'})
+    return stages
+
+# Prints a single instruction into the list of strings out
+def print_inst(out, inst, cycle_time, width, color, timestamps, store_completions):
+    if color:
+        from m5.util.terminal import termcap
+    else:
+        from m5.util.terminal import no_termcap as termcap
+    stages = insts['stages']
+    write = out.append
 
     # Print
 
@@ -261,7 +289,7 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
                                    stages[stage_idx]['name'],
                                    stage_idx, tick))
         events.sort()
-        outfile.write('[')
+        write('[')
         pos = 0
         if num_lines == 1 and events[0][2] != 0:  # event is not fetch
             curr_color = stages[events[0][2] - 1]['color']
@@ -269,9 +297,9 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
             if (stages[event[2]]['name'] == 'dispatch' and
                 inst['dispatch'] == inst['issue']):
                 continue
-            outfile.write(curr_color + dot * ((event[0] / cycle_time) - pos))
-            outfile.write(stages[event[2]]['color'] +
-                          stages[event[2]]['shorthand'])
+            write(curr_color + dot * ((event[0] / cycle_time) - pos))
+            write(stages[event[2]]['color'] +
+                  stages[event[2]]['shorthand'])
 
             if event[3] != last_event_time:  # event is not the last one
                 curr_color = stages[event[2]]['color']
@@ -279,19 +307,19 @@ def print_inst(outfile, inst, cycle_time, width, color, timestamps, store_comple
                 curr_color = termcap.Normal
 
             pos = (event[0] / cycle_time) + 1
-        outfile.write(curr_color + dot * (width - pos) + termcap.Normal +
-                      ']-(' + str(base_tick + i * time_width).rjust(15) + ') ')
+        write(curr_color + dot * (width - pos) + termcap.Normal +
+              ']-(' + str(base_tick + i * time_width).rjust(15) + ') ')
         if i == 0:
-            outfile.write('%s.%s %s [%s]' % (
+            write('%s.%s %s [%s]' % (
                     inst['pc'].rjust(10),
                     inst['upc'],
                     inst['disasm'].ljust(25),
                     str(inst['sn']).rjust(10)))
             if timestamps:
-                outfile.write('  f=%s, r=%s' % (inst['fetch'], inst['retire']))
-            outfile.write('\n')
+                write('  f=%s, r=%s' % (inst['fetch'], inst['retire']))
+            write('\n')
         else:
-            outfile.write('...'.center(12) + '\n')
+            write('...'.center(12) + '\n')
 
 
 def validate_range(my_range):
@@ -361,7 +389,7 @@ def main():
         sys.exit(1)
     # Process trace
     print 'Processing trace... ',
-    with open(args[0], 'r') as trace:
+    with open(args[0], 'r', READ_BUFFER_SIZE) as trace:
         with open(options.outfile, 'w') as out:
             process_trace(trace, out, options.cycle_time, options.width,
                           options.color, options.timestamps,
@@ -0,0 +1,78 @@
+#!/usr/bin/env python2.7
+
+# This script converts a protobuf packet trace into the chunked, columnar
+# format of columnlib.py. A time window of the converted trace can then be
+# read without decoding the whole trace, e.g.
+#
+#   import columnlib
+#   trace = columnlib.ColumnReader("trace.pcol")
+#   window = trace.read(start = 10 * 10**12, end = 20 * 10**12,
+#                       fields = ['tick', 'addr', 'cmd'])
+
+import argparse
+import os
+import subprocess
+import sys
+
+import columnlib
+import protolib
+
+util_dir = os.path.dirname(os.path.realpath(__file__))
+# Make sure the proto definitions are up to date.
+subprocess.check_call(['make', '--quiet', '-C', util_dir, 'packet_pb2.py'])
+import packet_pb2
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = "Convert a protobuf packet trace into a columnar trace "
+                      "with a tick index")
+    parser.add_argument("input", help = "protobuf packet trace")
+    parser.add_argument("output", help = "columnar trace")
+    parser.add_argument("--chunk-packets", type = int,
+                        default = columnlib.CHUNK_PACKETS,
+                        help = "number of packets per chunk")
+    args = parser.parse_args()
+
+    # Open the file in read mode
+    proto_in = protolib.openFileRd(args.input)
+
+    # Read the magic number in 4-byte Little Endian
+    magic_number = proto_in.read(4)
+
+    if magic_number != "gem5":
+        print "Unrecognized file", args.input
+        exit(-1)
+
+    print "Parsing packet header"
+
+    header = packet_pb2.PacketHeader()
+    protolib.decodeMessage(proto_in, header)
+
+    trace_header = {
+        'obj_id' : header.obj_id,
+        'tick_freq' : header.tick_freq,
+        'id_strings' : dict((id_string.key, id_string.value)
+                            for id_string in header.id_strings),
+    }
+
+    print "Parsing packets"
+
+    try:
+        col_out = columnlib.ColumnWriter(args.output, trace_header,
+                                         args.chunk_packets)
+    except IOError:
+        print "Failed to open ", args.output, " for writing"
+        exit(-1)
+
+    num_packets = 0
+    for packet in protolib.iterMessages(proto_in, packet_pb2.Packet()):
+        col_out.addMessage(packet)
+        num_packets += 1
+
+    col_out.close()
+    proto_in.close()
+
+    print "Converted packets:", num_packets
+
+if __name__ == "__main__":
+    main()
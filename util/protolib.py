@@ -72,13 +72,159 @@
 # types of proto objects can use the same function to decode a single message
 
 import gzip
+import mmap
+import multiprocessing
+import os
+import shutil
 import struct
 
+# Size of the blocks read from a compressed trace
+CHUNK_SIZE = 1 << 20
+
+class MessageReader(object):
+    """
+    A block buffered reader of a file of length prefixed messages. The
+    length prefixes are decoded out of a large in-memory buffer instead of
+    reading the file a byte at a time. An uncompressed file is mapped into
+    memory as a whole, a gzipped file is read in blocks of CHUNK_SIZE.
+    """
+    def __init__(self, in_file):
+        self._file = in_file
+        self._map = None
+        self._pos = 0
+
+        if not isinstance(in_file, gzip.GzipFile):
+            try:
+                self._map = mmap.mmap(in_file.fileno(), 0,
+                                      access = mmap.ACCESS_READ)
+            except (ValueError, mmap.error, EnvironmentError):
+                # Empty files and pipes cannot be mapped
+                pass
+
+        if self._map is not None:
+            self._buf = self._map
+            self._end = len(self._map)
+        else:
+            self._buf = ''
+            self._end = 0
+
+    def _fill(self, size):
+        """
+        Make sure that at least size bytes are buffered from the current
+        position on, unless the end of the file is reached. Return the
+        number of buffered bytes.
+        """
+        avail = self._end - self._pos
+        if avail >= size or self._map is not None:
+            return avail
+
+        data = self._file.read(max(size - avail, CHUNK_SIZE))
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        self._end = len(self._buf)
+        return self._end
+
+    def read(self, size):
+        """
+        Read size raw bytes, e.g. the magic number at the start of a trace.
+        """
+        self._fill(size)
+        data = self._buf[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+    def _decodeVarint32(self):
+        """
+        Decode a Varint32 from the buffer like _DecodeVarint32 does from a
+        file. If the end of file is reached, return 0.
+        """
+        if self._fill(10) == 0:
+            return 0
+
+        buf = self._buf
+        pos = self._pos
+        end = self._end
+
+        # Nearly all messages are shorter than 128 bytes
+        b = ord(buf[pos])
+        if not (b & 0x80):
+            self._pos = pos + 1
+            return b
+
+        result = 0
+        shift = 0
+        # Use a 32-bit mask
+        mask = 0xffffffff
+        while 1:
+            if pos == end:
+                return 0
+            b = ord(buf[pos])
+            result |= ((b & 0x7f) << shift)
+            pos += 1
+            if not (b & 0x80):
+                self._pos = pos
+                if result > 0x7fffffffffffffff:
+                    result -= (1 << 64)
+                    result |= ~mask
+                else:
+                    result &= mask
+                return result
+            shift += 7
+            if shift >= 64:
+                raise IOError('Too many bytes when decoding varint.')
+
+    def readMessage(self):
+        """
+        Return the serialized next message, or None at the end of the file.
+        """
+        size = self._decodeVarint32()
+        if size == 0:
+            return None
+        if self._fill(size) < size:
+            raise IOError('Truncated message.')
+        buf = self._buf[self._pos:self._pos + size]
+        self._pos += size
+        return buf
+
+    def decodeMessage(self, message):
+        """
+        Decode the next message into message. Return False if no message
+        could be read.
+        """
+        try:
+            buf = self.readMessage()
+            if buf is None:
+                return False
+            message.ParseFromString(buf)
+            return True
+        except IOError:
+            return False
+
+    def __iter__(self):
+        """
+        Iterate over the serialized messages.
+        """
+        while 1:
+            try:
+                buf = self.readMessage()
+            except IOError:
+                return
+            if buf is None:
+                return
+            yield buf
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._buf = ''
+        self._file.close()
+
 def openFileRd(in_file):
     """
     This opens the file passed as argument for reading using an appropriate
-    function depending on if it is gzipped or not. It returns the file
-    handle.
+    function depending on if it is gzipped or not. It returns a
+    MessageReader of the file.
     """
     try:
         # First see if this file is gzipped
@@ -96,7 +242,7 @@ def openFileRd(in_file):
     except IOError:
         print "Failed to open ", in_file, " for reading"
         exit(-1)
-    return proto_in
+    return MessageReader(proto_in)
 
 def _DecodeVarint32(in_file):
     """
@@ -133,6 +279,9 @@ def decodeMessage(in_file, message):
     Attempt to read a message from the file and decode it. Return
     False if no message could be read.
     """
+    if isinstance(in_file, MessageReader):
+        return in_file.decodeMessage(message)
+
     try:
         size, pos = _DecodeVarint32(in_file)
         if size == 0:
@@ -143,6 +292,44 @@ def decodeMessage(in_file, message):
     except IOError:
         return False
 
+def iterMessages(in_file, message):
+    """
+    Iterate over the remaining messages of a MessageReader. The same
+    message object is decoded into and yielded for every message, copy it
+    to keep it beyond the next iteration.
+    """
+    for buf in in_file:
+        message.ParseFromString(buf)
+        yield message
+
+# Fields of the packets returned by decodePacketArrays
+PACKET_DTYPE = [('cmd', 'u4'), ('addr', 'u8'), ('size', 'u4'),
+                ('flags', 'u4'), ('tick', 'u8'), ('pc', 'u8')]
+
+def decodePacketArrays(in_file, packet, count = 1 << 16):
+    """
+    Decode the remaining packet messages of a MessageReader in bulk and
+    yield them as NumPy structured arrays of PACKET_DTYPE with up to count
+    packets each. Optional fields that are not set are 0. This requires
+    NumPy, unlike the rest of this library.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        print "Failed to import numpy"
+        exit(-1)
+
+    rows = []
+    for packet in iterMessages(in_file, packet):
+        rows.append((packet.cmd, packet.addr, packet.size, packet.flags,
+                     packet.tick, packet.pc))
+        if len(rows) == count:
+            yield np.array(rows, dtype = PACKET_DTYPE)
+            rows = []
+
+    if rows:
+        yield np.array(rows, dtype = PACKET_DTYPE)
+
 def _EncodeVarint32(out_file, value):
   """
   The encoding of the Varint32 is copied from
@@ -157,10 +344,166 @@ def _EncodeVarint32(out_file, value):
     value >>= 7
   out_file.write(struct.pack('<B', bits))
 
+def _VarintBytes(value):
+    """
+    Return the Varint32 encoding of value, as _EncodeVarint32 writes it.
+    """
+    if value < 0x80:
+        return chr(value)
+    out = []
+    while value > 0x7f:
+        out.append(chr(0x80 | (value & 0x7f)))
+        value >>= 7
+    out.append(chr(value))
+    return ''.join(out)
+
 def encodeMessage(out_file, message):
     """
     Encoded a message with the length prepended as a 32-bit varint.
     """
     out = message.SerializeToString()
-    _EncodeVarint32(out_file, len(out))
-    out_file.write(out)
+    out_file.write(_VarintBytes(len(out)) + out)
+
+def cpuFileName(out_filename, cpu):
+    """
+    Name of the trace of one CPU, e.g. trace.cpu0.proto for trace.proto.
+    """
+    root, ext = os.path.splitext(out_filename)
+    return "%s.cpu%s%s" % (root, cpu, ext)
+
+def _encodeShard(job):
+    """
+    Encode the lines of one shard of an ASCII trace, which are the lines
+    that start in [start, end). The messages of every output are written to
+    a shard file of their own. The shard files of the first shard are the
+    outputs themselves, so that they only need the header in front.
+    """
+    (in_filename, start, end, shard, out_filename, header, parse_line,
+     per_cpu) = job
+
+    outs = {}
+    counts = {}
+    error = None
+    ascii_in = open(in_filename, 'r')
+    try:
+        if start > 0:
+            # Skip the line that started in the previous shard
+            ascii_in.seek(start - 1)
+            start += len(ascii_in.readline()) - 1
+
+        pos = start
+        while pos < end:
+            line = ascii_in.readline()
+            if not line:
+                break
+            line_start = pos
+            pos += len(line)
+            if not line.strip():
+                continue
+
+            cpu = None
+            try:
+                if per_cpu:
+                    cpu, line = line.split(',', 1)
+                    cpu = int(cpu)
+                message = parse_line(line)
+            except (ValueError, IndexError, KeyError), e:
+                error = "%s at byte offset %d: %s" % \
+                    (in_filename, line_start, e)
+                break
+
+            out = outs.get(cpu)
+            if out is None:
+                name = out_filename if cpu is None else \
+                    cpuFileName(out_filename, cpu)
+                if shard == 0:
+                    out = open(name, 'wb')
+                    out.write(header)
+                else:
+                    out = open("%s.shard%d" % (name, shard), 'wb')
+                outs[cpu] = out
+                counts[cpu] = 0
+
+            encodeMessage(out, message)
+            counts[cpu] += 1
+    finally:
+        ascii_in.close()
+        for out in outs.values():
+            out.close()
+
+    if error:
+        if shard != 0:
+            for out in outs.values():
+                os.remove(out.name)
+        return (shard, {}, error)
+
+    return (shard, counts, None)
+
+def encodeTrace(in_filename, out_filename, header, parse_line, jobs = 1,
+                per_cpu = False):
+    """
+    Encode an ASCII trace into a protobuf trace. parse_line turns a line
+    into a message and raises ValueError for a malformed line. The input is
+    split into jobs shards that are encoded in parallel and concatenated
+    behind a single magic number and header.
+
+    With per_cpu every line starts with a CPU id, e.g. 0,r,128,64,4000, and
+    the messages of every CPU are written to a trace of their own, see
+    cpuFileName. Return a dict of the number of messages per CPU (a single
+    entry of None without per_cpu).
+    """
+    # The magic number in 4-byte Little Endian, similar to what is done in
+    # src/proto/protoio.cc, and the header
+    out = header.SerializeToString()
+    header = "gem5" + _VarintBytes(len(out)) + out
+
+    size = os.path.getsize(in_filename)
+    jobs = max(1, min(jobs, size / (1 << 20) + 1))
+    shards = [(in_filename, size * i / jobs, size * (i + 1) / jobs, i,
+               out_filename, header, parse_line, per_cpu)
+              for i in range(jobs)]
+
+    if jobs == 1:
+        results = [_encodeShard(shards[0])]
+    else:
+        pool = multiprocessing.Pool(jobs)
+        results = pool.map(_encodeShard, shards)
+        pool.close()
+        pool.join()
+
+    errors = [error for shard, counts, error in results if error]
+    totals = {}
+    for shard, counts, error in sorted(results):
+        for cpu, count in counts.items():
+            name = out_filename if cpu is None else \
+                cpuFileName(out_filename, cpu)
+            if shard == 0:
+                totals[cpu] = count
+                continue
+
+            shard_name = "%s.shard%d" % (name, shard)
+            if not errors:
+                if cpu not in totals:
+                    # The first messages of this CPU are in a later shard
+                    out = open(name, 'wb')
+                    out.write(header)
+                    totals[cpu] = 0
+                else:
+                    out = open(name, 'ab')
+                with open(shard_name, 'rb') as shard_in:
+                    shutil.copyfileobj(shard_in, out, 1 << 20)
+                out.close()
+                totals[cpu] += count
+            os.remove(shard_name)
+
+    if errors:
+        raise ValueError(errors[0])
+
+    if not per_cpu and None not in totals:
+        # An empty trace still has a header
+        out = open(out_filename, 'wb')
+        out.write(header)
+        out.close()
+        totals[None] = 0
+
+    return totals
@@ -26,7 +26,7 @@
 #
 # Authors: Nathan Binkert
 
-import MySQLdb, re, string
+import math, re, string
 
 def statcmp(a, b):
     v1 = a.split('.')
@@ -43,6 +43,26 @@ def statcmp(a, b):
     else:
         return cmp(len(v1), len(v2))
 
+class StdDev(object):
+    """Population standard deviation aggregate for SQLite, which has no
+    STDDEV like MySQL"""
+    def __init__(self):
+        self.samples = 0
+        self.sums = 0.0
+        self.squares = 0.0
+
+    def step(self, value):
+        if value is not None:
+            self.samples += 1
+            self.sums += value
+            self.squares += value * value
+
+    def finalize(self):
+        if self.samples == 0:
+            return None
+        mean = self.sums / self.samples
+        return math.sqrt(max(self.squares / self.samples - mean * mean, 0.0))
+
 class RunData:
     def __init__(self, row):
         self.run = int(row[0])
@@ -50,6 +70,9 @@ class RunData:
         self.user = row[2]
         self.project = row[3]
 
+    def __str__(self):
+        return self.name
+
 class SubData:
     def __init__(self, row):
         self.stat = int(row[0])
@@ -125,6 +148,7 @@ class Database(object):
         self.user = ''
         self.passwd = ''
         self.db = 'm5stats'
+        self.dbfile = None
         self.cursor = None
 
         self.allStats = []
@@ -170,7 +194,7 @@ class Database(object):
 
         return None
 
-    def query(self, sql):
+    def execute(self, sql):
         self.cursor.execute(sql)
 
     def update_dict(self, dict):
@@ -198,24 +222,29 @@ class Database(object):
         self.statlist.append(statname)
 
     def connect(self):
-        # connect
-        self.thedb = MySQLdb.connect(db=self.db,
-                                     host=self.host,
-                                     user=self.user,
-                                     passwd=self.passwd)
+        # connect, to a SQLite file if one is given
+        if self.dbfile is not None:
+            import sqlite3
+            self.thedb = sqlite3.connect(self.dbfile)
+            self.thedb.create_aggregate('stddev', 1, StdDev)
+        else:
+            import MySQLdb
+            self.thedb = MySQLdb.connect(db=self.db,
+                                         host=self.host,
+                                         user=self.user,
+                                         passwd=self.passwd)
 
         # create a cursor
         self.cursor = self.thedb.cursor()
 
-        self.query('''select rn_id,rn_name,rn_sample,rn_user,rn_project
-                   from runs''')
+        self.execute('select rn_id,rn_name,rn_user,rn_project from runs')
         for result in self.cursor.fetchall():
             run = RunData(result);
             self.allRuns.append(run)
             self.allRunIds[run.run] = run
             self.allRunNames[run.name] = run
 
-        self.query('select sd_stat,sd_x,sd_y,sd_name,sd_descr from subdata')
+        self.execute('select sd_stat,sd_x,sd_y,sd_name,sd_descr from subdata')
         for result in self.cursor.fetchall():
             subdata = SubData(result)
             if self.allSubData.has_key(subdata.stat):
@@ -223,12 +252,15 @@ class Database(object):
             else:
                 self.allSubData[subdata.stat] = [ subdata ]
 
-        self.query('select * from formulas')
+        self.execute('select * from formulas')
         for id,formula in self.cursor.fetchall():
-            self.allFormulas[int(id)] = formula.tostring()
+            # MySQLdb returns blobs as arrays, sqlite3 as buffers
+            if hasattr(formula, 'tostring'):
+                formula = formula.tostring()
+            self.allFormulas[int(id)] = str(formula)
 
         StatData.db = self
-        self.query('select * from stats')
+        self.execute('select * from stats')
         import info
         for result in self.cursor.fetchall():
             stat = info.NewStat(self, StatData(result))
@@ -252,35 +284,18 @@ class Database(object):
     def listTicks(self, runs=None):
         print "tick"
         print "----------------------------------------"
-        sql = 'select distinct dt_tick from data where dt_stat=1180 and ('
-        if runs != None:
-            first = True
-            for run in runs:
-               if first:
-            #       sql += ' where'
-                   first = False
-               else:
-                   sql += ' or'
-               sql += ' dt_run=%s' % run.run
-            sql += ')'
-        self.query(sql)
-        for r in self.cursor.fetchall():
-            print r[0]
+        for tick in self.retTicks(runs):
+            print tick
 
     # Name: retTicks
-    # Desc: Prints all samples for a given run
+    # Desc: Returns all samples for a given run
     def retTicks(self, runs=None):
-        sql = 'select distinct dt_tick from data where dt_stat=1180 and ('
+        sql = 'select distinct dt_tick from data'
         if runs != None:
-            first = True
-            for run in runs:
-               if first:
-                   first = False
-               else:
-                   sql += ' or'
-               sql += ' dt_run=%s' % run.run
-            sql += ')'
-        self.query(sql)
+            sql += ' where dt_run in (%s)' % \
+                   ','.join([ '%d' % run.run for run in runs ])
+        sql += ' order by dt_tick'
+        self.execute(sql)
         ret = []
         for r in self.cursor.fetchall():
             ret.append(r[0])
@@ -356,18 +371,18 @@ class Database(object):
         sql += 'where '
 
         if isinstance(stat, list):
-            val = ' or '.join([ 'dt_stat=%d' % s.stat for s in stat ])
-            sql += ' (%s)' % val
+            val = ','.join([ '%d' % s.stat for s in stat ])
+            sql += ' dt_stat in (%s)' % val
         else:
             sql += ' dt_stat=%d' % stat.stat
 
         if self.runs != None and len(self.runs):
-            val = ' or '.join([ 'dt_run=%d' % r for r in self.runs ])
-            sql += ' and (%s)' % val
+            val = ','.join([ '%d' % r for r in self.runs ])
+            sql += ' and dt_run in (%s)' % val
 
         if ticks != None and len(ticks):
-            val = ' or '.join([ 'dt_tick=%d' % s for s in ticks ])
-            sql += ' and (%s)' % val
+            val = ','.join([ '%d' % s for s in ticks ])
+            sql += ' and dt_tick in (%s)' % val
 
         sql += ' group by dt_stat,dt_run,dt_x,dt_y'
         if group:
@@ -381,13 +396,13 @@ class Database(object):
 
     # Name: avg
     # Desc: given a run, a stat and an array of samples, average the samples
-    def avg(self, stat, ticks):
+    def avg(self, *args, **kwargs):
         return self.query('avg', *args, **kwargs)
 
     # Name: stdev
     # Desc: given a run, a stat and an array of samples, get the standard
     #       deviation
-    def stdev(self, stat, ticks):
+    def stdev(self, *args, **kwargs):
         return self.query('stddev', *args, **kwargs)
 
     def __setattr__(self, attr, value):
@@ -396,11 +411,11 @@ class Database(object):
             return
 
         if value == 'sum':
-            self._method = self.sum
+            self._method = type(self).sum
         elif value == 'avg':
-            self._method = self.avg
+            self._method = type(self).avg
         elif value == 'stdev':
-            self._method = self.stdev
+            self._method = type(self).stdev
         else:
             raise AttributeError, "can only set get to: sum | avg | stdev"
 
@@ -408,7 +423,7 @@ class Database(object):
         if ticks is None:
             ticks = self.ticks
         sql = self._method(self, stat, ticks)
-        self.query(sql)
+        self.execute(sql)
 
         runs = {}
         xmax = 0
@@ -26,7 +26,7 @@
 #
 # Authors: Nathan Binkert
 
-import MySQLdb
+import os
 
 class MyDB(object):
     def __init__(self, options):
@@ -38,12 +38,14 @@ class MyDB(object):
         self.cursor = None
 
     def admin(self):
+        import MySQLdb
         self.close()
         self.mydb = MySQLdb.connect(db='mysql', host=self.host, user=self.user,
                                     passwd=self.passwd)
         self.cursor = self.mydb.cursor()
 
     def connect(self):
+        import MySQLdb
         self.close()
         self.mydb = MySQLdb.connect(db=self.name, host=self.host,
                                     user=self.user, passwd=self.passwd)
@@ -383,3 +385,246 @@ class MyDB(object):
         FROM event_names
         LEFT JOIN events ON en_id=ev_event
         WHERE ev_event IS NULL''')
+
+class SQLiteDB(MyDB):
+    """
+    The stats database in a SQLite file, for hosts without a MySQL server.
+    The tables are the ones of MyDB, see MyDB.populate() for their
+    description.
+    """
+    def __init__(self, options):
+        self.name = options.dbfile
+        self.mydb = None
+        self.cursor = None
+
+    def admin(self):
+        self.close()
+
+    def connect(self):
+        import sqlite3
+        self.close()
+        self.mydb = sqlite3.connect(self.name)
+        self.cursor = self.mydb.cursor()
+
+    def close(self):
+        if self.mydb is not None:
+            self.mydb.commit()
+        super(SQLiteDB, self).close()
+        self.mydb = None
+
+    def drop(self):
+        if os.path.exists(self.name):
+            os.remove(self.name)
+
+    def create(self):
+        pass
+
+    def populate(self):
+        self.query('''
+        CREATE TABLE runs(
+            rn_id	INTEGER PRIMARY KEY,
+            rn_name	TEXT			NOT NULL,
+            rn_sample	TEXT			NOT NULL,
+            rn_user	TEXT			NOT NULL,
+            rn_project	TEXT			NOT NULL,
+            rn_date	TIMESTAMP		DEFAULT CURRENT_TIMESTAMP,
+            rn_expire	TIMESTAMP,
+            UNIQUE (rn_name,rn_sample)
+        )''')
+
+        self.query('''
+        CREATE TABLE stats(
+            st_id	INTEGER PRIMARY KEY,
+            st_name	TEXT			NOT NULL,
+            st_descr	TEXT			NOT NULL,
+            st_type	TEXT			NOT NULL,
+            st_print	BOOL			NOT NULL,
+            st_prereq	INTEGER			NOT NULL,
+            st_prec	INTEGER			NOT NULL,
+            st_nozero	BOOL			NOT NULL,
+            st_nonan	BOOL			NOT NULL,
+            st_total	BOOL			NOT NULL,
+            st_pdf	BOOL			NOT NULL,
+            st_cdf	BOOL			NOT NULL,
+            st_min	DOUBLE			NOT NULL,
+            st_max	DOUBLE			NOT NULL,
+            st_bktsize	DOUBLE			NOT NULL,
+            st_size	INTEGER			NOT NULL,
+            UNIQUE (st_name)
+        )''')
+
+        #
+        # The queries select by stat, run and tick, so the unique key is
+        # ordered that way to serve as their index.
+        #
+        self.query('''
+        CREATE TABLE data(
+            dt_stat	INTEGER			NOT NULL,
+            dt_x	INTEGER			NOT NULL,
+            dt_y	INTEGER			NOT NULL,
+            dt_run	INTEGER			NOT NULL,
+            dt_tick	INTEGER			NOT NULL,
+            dt_data	DOUBLE			NOT NULL,
+            UNIQUE (dt_stat,dt_run,dt_tick,dt_x,dt_y)
+        )''')
+        self.query('CREATE INDEX data_run ON data(dt_run,dt_tick)')
+
+        self.query('''
+        CREATE TABLE subdata(
+            sd_stat	INTEGER			NOT NULL,
+            sd_x	INTEGER			NOT NULL,
+            sd_y	INTEGER			NOT NULL,
+            sd_name	TEXT			NOT NULL,
+            sd_descr	TEXT,
+            UNIQUE (sd_stat,sd_x,sd_y)
+        )''')
+
+        self.query('''
+        CREATE TABLE formulas(
+            fm_stat	INTEGER PRIMARY KEY,
+            fm_formula	BLOB			NOT NULL
+        )''')
+
+        self.query('''
+        CREATE TABLE formula_ref(
+            fr_stat	INTEGER			NOT NULL,
+            fr_run	INTEGER			NOT NULL,
+            UNIQUE (fr_stat,fr_run)
+        )''')
+        self.query('CREATE INDEX formula_ref_run ON formula_ref(fr_run)')
+
+        self.query('''
+        CREATE TABLE events(
+            ev_event	INTEGER			NOT NULL,
+            ev_run	INTEGER			NOT NULL,
+            ev_tick	INTEGER			NOT NULL,
+            UNIQUE(ev_event,ev_run,ev_tick)
+        )''')
+        self.query('CREATE INDEX events_run ON events(ev_run)')
+        self.query('CREATE INDEX events_tick ON events(ev_tick)')
+
+        self.query('''
+        CREATE TABLE event_names(
+            en_id	INTEGER PRIMARY KEY,
+            en_name	TEXT			NOT NULL,
+            UNIQUE (en_name)
+        )''')
+
+    def clean(self):
+        self.query('''
+        DELETE FROM data
+        WHERE dt_run NOT IN (SELECT rn_id FROM runs)''')
+
+        self.query('''
+        DELETE FROM formula_ref
+        WHERE fr_run NOT IN (SELECT rn_id FROM runs)''')
+
+        self.query('''
+        DELETE FROM formulas
+        WHERE fm_stat NOT IN (SELECT fr_stat FROM formula_ref)''')
+
+        self.query('''
+        DELETE FROM stats
+        WHERE st_id NOT IN (SELECT DISTINCT dt_stat FROM data)''')
+
+        self.query('''
+        DELETE FROM subdata
+        WHERE sd_stat NOT IN (SELECT DISTINCT dt_stat FROM data)''')
+
+        self.query('''
+        DELETE FROM events
+        WHERE ev_run NOT IN (SELECT rn_id FROM runs)''')
+
+        self.query('''
+        DELETE FROM event_names
+        WHERE en_id NOT IN (SELECT DISTINCT ev_event FROM events)''')
+
+    def load(self, runs, user='', project='', replace=False):
+        """
+        Load the stats files of runs, a list of (run name, stats file)
+        pairs. A run that is already in the database is replaced if replace
+        is set and skipped otherwise. Every dump is a sample at its
+        final_tick. The subfields of a stat in the
+        stats file (name::0, name::samples, name::total, ...) are loaded as
+        the elements of a VECTOR stat.
+        """
+        from statsfile import StatsFile
+
+        self.query('PRAGMA synchronous = OFF')
+
+        stat_ids = {}
+        self.query('SELECT st_id, st_name FROM stats')
+        for stat, name in self.cursor.fetchall():
+            stat_ids[name] = stat
+
+        subdata = {}
+        self.query('SELECT sd_stat, sd_x, sd_name FROM subdata')
+        for stat, x, name in self.cursor.fetchall():
+            subdata.setdefault(stat, {})[name] = x
+
+        def stat_id(name, desc, type):
+            if name not in stat_ids:
+                self.cursor.execute('''
+                INSERT INTO stats VALUES
+                    (NULL, ?, ?, ?, 1, 0, -1, 0, 0, 0, 0, 0, 0, 0, 0, 0)''',
+                    (name, desc, type))
+                stat_ids[name] = self.cursor.lastrowid
+            return stat_ids[name]
+
+        def element(stat, field, desc):
+            fields = subdata.setdefault(stat, {})
+            if field not in fields:
+                fields[field] = len(fields)
+                self.cursor.execute(
+                    'INSERT INTO subdata VALUES (?, ?, 0, ?, ?)',
+                    (stat, fields[field], field, desc))
+            return fields[field]
+
+        for name, filename in runs:
+            self.cursor.execute(
+                "SELECT rn_id FROM runs WHERE rn_name=? AND rn_sample=''",
+                (name,))
+            loaded = self.cursor.fetchall()
+            if loaded and not replace:
+                print 'Run %s is already loaded, skipping %s' % \
+                      (name, filename)
+                continue
+            for old, in loaded:
+                print 'Replacing run %s' % name
+                self.cursor.execute('DELETE FROM data WHERE dt_run=?', (old,))
+                self.cursor.execute('DELETE FROM runs WHERE rn_id=?', (old,))
+
+            # Don't leave a cache file next to every loaded stats file
+            stats = StatsFile(filename, cache=False)
+
+            self.cursor.execute('''
+            INSERT INTO runs (rn_name, rn_sample, rn_user, rn_project)
+            VALUES (?, '', ?, ?)''', (name, user, project))
+            run = self.cursor.lastrowid
+
+            ticks = stats.ticks or range(len(stats))
+            vectors = set(stat.split('::', 1)[0] for stat in stats.names
+                          if '::' in stat)
+
+            rows = []
+            for stat in stats.names:
+                desc = stats.desc(stat)
+                if '::' in stat:
+                    base, field = stat.split('::', 1)
+                    id = stat_id(base, desc, 'VECTOR')
+                    x = element(id, field, desc)
+                elif stat in vectors:
+                    continue
+                else:
+                    id = stat_id(stat, desc, 'SCALAR')
+                    x = 0
+
+                rows.extend((id, x, run, tick, float(value))
+                            for tick, value in zip(ticks, stats.stat(stat))
+                            if value == value)
+
+            self.cursor.executemany('''
+            INSERT OR REPLACE INTO data VALUES (?, ?, 0, ?, ?, ?)''', rows)
+            self.mydb.commit()
+            print 'Loaded run %s: %d dumps, %d values' % \
+                  (name, len(stats), len(rows))
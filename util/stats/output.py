@@ -46,7 +46,13 @@ class StatOutput(ChartOptions):
         else:
             valformat = '%f'
 
-        for job in self.jobfile.jobs():
+        # Without a jobfile, display every run of the database
+        if self.jobfile:
+            jobs = self.jobfile.jobs()
+        else:
+            jobs = self.info.allRuns
+
+        for job in jobs:
             value = self.info.get(job, self.stat)
             if value is None:
                 return
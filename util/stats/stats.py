@@ -28,13 +28,13 @@
 #
 # Authors: Nathan Binkert
 
-import re, sys, math
+import os, re, sys, math
 
 def usage():
     print '''\
-Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-g <graphdir> ] [-h <host>] [-p]
-       [-s <system>] [-r <runs> ] [-T <samples>] [-u <username>]
-       <command> [command args]
+Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-f <dbfile>] [-g <graphdir> ]
+       [-h <host>] [-p] [-s <system>] [-r <runs> ] [-T <samples>]
+       [-u <username>] <command> [command args]
 
        commands    extra parameters   description
        ----------- ------------------ ---------------------------------------
@@ -47,6 +47,14 @@ Usage: %s [-E] [-F] [ -G <get> ] [-d <db> ] [-g <graphdir> ] [-h <host>] [-p]
        stats       [regex]            List all stats (only matching regex)
 
        database    <command>          Where command is drop, init, or clean
+       database    load [-r] <stats>...
+                                      Load stats.txt files (or directories
+                                      holding one) as runs named after their
+                                      directory, -f only. -r replaces runs
+                                      of the same name instead of skipping
+                                      loaded runs and refusing duplicates
+
+       -f <dbfile> uses a SQLite database file instead of a MySQL server
 
 ''' % sys.argv[0]
     sys.exit(1)
@@ -68,7 +76,10 @@ def commands(options, command, args):
         if len(args) == 0: raise CommandException
 
         import dbinit
-        mydb = dbinit.MyDB(options)
+        if options.dbfile:
+            mydb = dbinit.SQLiteDB(options)
+        else:
+            mydb = dbinit.MyDB(options)
 
         if args[0] == 'drop':
             if len(args) > 2: raise CommandException
@@ -94,6 +105,41 @@ def commands(options, command, args):
             if len(args) > 1: raise CommandException
             mydb.connect()
             mydb.clean()
+            mydb.close()
+            return
+
+        if args[0] == 'load':
+            opts, args = getopts(args[1:], '-r')
+            if len(args) < 1 or not options.dbfile: raise CommandException
+            replace = False
+            for o,a in opts:
+                if o == '-r':
+                    replace = True
+
+            # A run is named after the directory of its stats file, which
+            # is the job name for the job directories of a jobfile
+            jobs = None
+            if options.jobfile:
+                jobs = set(job.name for job in options.jobfile.alljobs())
+            runs = []
+            paths = {}
+            for path in args:
+                if os.path.isdir(path):
+                    rundir, path = path, os.path.join(path, 'stats.txt')
+                else:
+                    rundir = os.path.dirname(path)
+                name = os.path.basename(os.path.abspath(rundir))
+                if jobs is not None and name not in jobs:
+                    print 'Run %s is not a job of the jobfile' % name
+                if name in paths and not replace:
+                    sys.exit('Run %s is loaded from both %s and %s, use -r '
+                             'to let the last one replace the others' %
+                             (name, paths[name], path))
+                paths[name] = path
+                runs.append((name, path))
+            mydb.connect()
+            mydb.load(runs, options.user, replace=replace)
+            mydb.close()
             return
 
         raise CommandException
@@ -104,6 +150,7 @@ def commands(options, command, args):
     source.db = options.db
     source.passwd = options.passwd
     source.user = options.user
+    source.dbfile = options.dbfile
     source.connect()
     #source.update_dict(globals())
 
@@ -168,6 +215,8 @@ def commands(options, command, args):
         stats = source.getStat(args[1])
         source.method = 'sum'
 
+        from info import value
+
         def disp(*args):
             print "%-35s %12s %12s %4s %5s %5s %5s %10s" % args
 
@@ -416,6 +465,7 @@ if __name__ == '__main__':
     options = Options()
     options.host = None
     options.db = None
+    options.dbfile = None
     options.passwd = ''
     options.user = getpass.getuser()
     options.runs = None
@@ -428,7 +478,7 @@ if __name__ == '__main__':
     options.jobfile = None
     options.all = False
 
-    opts, args = getopts(sys.argv[1:], '-EFJad:g:h:j:m:pr:s:u:T:')
+    opts, args = getopts(sys.argv[1:], '-EFJad:f:g:h:j:m:pr:s:u:T:')
     for o,a in opts:
         if o == '-E':
             options.printmode = 'E'
@@ -438,6 +488,8 @@ if __name__ == '__main__':
             options.all = True
         if o == '-d':
             options.db = a
+        if o == '-f':
+            options.dbfile = a
         if o == '-g':
             options.graph = True;
             options.graphdir = a
@@ -468,11 +520,12 @@ if __name__ == '__main__':
         if not options.db:
             options.db = options.jobfile.statdb
 
-    if not options.host:
-        sys.exit('Database server must be provided from a jobfile or -h')
+    if not options.dbfile:
+        if not options.host:
+            sys.exit('Database server must be provided from a jobfile or -h')
 
-    if not options.db:
-        sys.exit('Database name must be provided from a jobfile or -d')
+        if not options.db:
+            sys.exit('Database name must be provided from a jobfile or -d')
 
     if len(args) == 0:
         usage()
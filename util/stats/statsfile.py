@@ -0,0 +1,292 @@
+# This file is a library to read the text stats output of gem5 (stats.txt).
+# The file is parsed once into a table of the value of every stat in every
+# dump, which is cached next to the stats file so that opening it again only
+# loads the table, e.g.
+#
+#   from statsfile import StatsFile
+#   stats = StatsFile("m5out/stats.txt")
+#   ipc = stats.stat("system.cpu.ipc")            # one value per dump
+#   misses = stats.select("system.cpu*.dcache.overall_misses::total")
+#   hist = stats.subfields("system.mem_ctrls.rdQLenPdf")
+#
+# Vector, distribution and formula subfields are stats of their own, named
+# like in the stats file (name::0, name::total, name::samples, name::10-19,
+# ...). A stat that is missing in a dump has the value NaN. The values are
+# returned as NumPy arrays if NumPy is available, and as lists otherwise.
+#
+# BinaryStatsFile reads the binary stats output of gem5 (binary://stats.bin,
+# see src/base/stats/binary.hh) with the same interface. Its rows of values
+# are mapped into NumPy without parsing or caching.
+
+import cPickle
+import fnmatch
+import gzip
+import os
+import struct
+from array import array
+
+DUMP_BEGIN = "---------- Begin Simulation Statistics ----------"
+DUMP_END = "---------- End Simulation Statistics   ----------"
+
+CACHE_SUFFIX = ".statcache"
+CACHE_VERSION = 1
+
+BINARY_MAGIC = "gem5stat"
+BINARY_VERSION = 1
+# magic, version, values per row, name table size
+_BINARY_HEADER = struct.Struct('<8sIIQ')
+
+NAN = float('nan')
+
+def _numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+class StatsFile(object):
+    """
+    The stats of every dump of a stats file. names holds the stat names in
+    the order they first appear, ticks the final_tick of every dump.
+    """
+    def __init__(self, filename, cache = True):
+        self.filename = filename
+
+        stat = os.stat(filename)
+        key = (stat.st_size, stat.st_mtime)
+        cache_file = filename + CACHE_SUFFIX
+
+        if not cache or not self._load(cache_file, key):
+            self._parse()
+            if cache:
+                try:
+                    self._save(cache_file, key)
+                except IOError:
+                    pass
+
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        self.num_dumps = len(self._values) // max(len(self.names), 1)
+
+        self._np = _numpy()
+        if self._np is not None:
+            self._table = self._np.frombuffer(self._values, 'd').reshape(
+                self.num_dumps, len(self.names))
+
+        if 'final_tick' in self.index:
+            self.ticks = [int(tick) for tick in self.stat('final_tick')]
+        else:
+            self.ticks = []
+
+    def _parse(self):
+        """
+        Read the stats file in one pass. Every dump is a row of values in
+        the order of names, rows are padded with NaN for stats that first
+        appear in a later dump.
+        """
+        if self.filename.endswith(".gz"):
+            f = gzip.open(self.filename, 'rb')
+        else:
+            f = open(self.filename, 'rb')
+
+        self.names = []
+        self.descs = []
+        index = {}
+        rows = []
+        row = None
+
+        for line in f:
+            if line.startswith(DUMP_BEGIN):
+                row = []
+                rows.append(row)
+                continue
+            if row is None or line.startswith(DUMP_END):
+                row = None
+                continue
+
+            fields = line.split(None, 2)
+            if len(fields) < 2:
+                continue
+            try:
+                value = float(fields[1])
+            except ValueError:
+                continue
+
+            name = fields[0]
+            i = index.get(name)
+            if i is None:
+                i = index[name] = len(self.names)
+                self.names.append(name)
+                desc = ''
+                if len(fields) == 3 and '#' in fields[2]:
+                    desc = fields[2].split('#', 1)[1].strip()
+                self.descs.append(desc)
+
+            if i >= len(row):
+                row.extend([NAN] * (i + 1 - len(row)))
+            row[i] = value
+        f.close()
+
+        num_names = len(self.names)
+        self._values = array('d')
+        for row in rows:
+            self._values.extend(row)
+            self._values.extend([NAN] * (num_names - len(row)))
+
+    def _save(self, cache_file, key):
+        f = open(cache_file, 'wb')
+        cPickle.dump((CACHE_VERSION, key, self.names, self.descs,
+                      self._values.tostring()), f, 2)
+        f.close()
+
+    def _load(self, cache_file, key):
+        """
+        Load a cached table, return False if it is missing or stale.
+        """
+        try:
+            f = open(cache_file, 'rb')
+            version, stored_key, names, descs, values = cPickle.load(f)
+            f.close()
+        except (IOError, EOFError, ValueError, cPickle.UnpicklingError):
+            return False
+
+        if version != CACHE_VERSION or stored_key != key:
+            return False
+
+        self.names = names
+        self.descs = descs
+        self._values = array('d')
+        self._values.fromstring(values)
+        return True
+
+    def __len__(self):
+        return self.num_dumps
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def desc(self, name):
+        return self.descs[self.index[name]]
+
+    def find(self, pattern):
+        """
+        Return the names matching the glob pattern, in file order.
+        """
+        if pattern in self.index:
+            return [pattern]
+        return [name for name in self.names
+                if fnmatch.fnmatchcase(name, pattern)]
+
+    def stat(self, name):
+        """
+        Return the values of a stat over all dumps.
+        """
+        i = self.index[name]
+        if self._np is not None:
+            return self._table[:, i]
+        num_names = len(self.names)
+        return [self._values[dump * num_names + i]
+                for dump in xrange(self.num_dumps)]
+
+    def select(self, pattern):
+        """
+        Return a dict of the values over all dumps of the stats matching the
+        glob pattern.
+        """
+        return dict((name, self.stat(name)) for name in self.find(pattern))
+
+    def subfields(self, name):
+        """
+        Return the subfield names of a vector, distribution or formula stat
+        and their values as a table of dumps x subfields.
+        """
+        prefix = name + "::"
+        columns = [(i, stat[len(prefix):])
+                   for i, stat in enumerate(self.names)
+                   if stat.startswith(prefix)]
+        fields = [field for i, field in columns]
+
+        if self._np is not None:
+            return fields, self._table[:, [i for i, field in columns]]
+        num_names = len(self.names)
+        return fields, [[self._values[dump * num_names + i]
+                         for i, field in columns]
+                        for dump in xrange(self.num_dumps)]
+
+    def dump(self, dump):
+        """
+        Return a dict of the stats of one dump, without the stats that are
+        missing in it or NaN.
+        """
+        if self._np is not None:
+            row = self._table[dump]
+        else:
+            num_names = len(self.names)
+            row = self._values[dump * num_names:(dump + 1) * num_names]
+        return dict((name, value) for name, value in zip(self.names, row)
+                    if value == value)
+
+class BinaryStatsFile(StatsFile):
+    """
+    The stats of every dump of a binary stats file. The stat names are the
+    ones of the text output, there are no descriptions.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+        f = open(filename, 'rb')
+        header = f.read(_BINARY_HEADER.size)
+        if len(header) < _BINARY_HEADER.size:
+            raise IOError("%s is not a binary stats file" % filename)
+        magic, version, num_names, table_size = _BINARY_HEADER.unpack(header)
+        if magic != BINARY_MAGIC:
+            raise IOError("%s is not a binary stats file" % filename)
+        if version != BINARY_VERSION:
+            raise IOError("%s has unsupported version %d" %
+                          (filename, version))
+
+        self.names = f.read(table_size).split('\n')[:num_names]
+        self.descs = [''] * num_names
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+
+        # Every row is the tick and the values of a dump, a partly written
+        # last row is ignored
+        offset = _BINARY_HEADER.size + table_size
+        row_size = 8 * (num_names + 1)
+        self.num_dumps = (os.fstat(f.fileno()).st_size - offset) // row_size
+
+        self._np = _numpy()
+        if self._np is not None and self.num_dumps == 0:
+            f.close()
+            self.ticks = []
+            self._table = self._np.zeros((0, num_names))
+            return
+        if self._np is not None:
+            f.close()
+            rows = self._np.memmap(filename, mode = 'r', offset = offset,
+                                   shape = (self.num_dumps,),
+                                   dtype = [('tick', '<u8'),
+                                            ('values', '<f8', (num_names,))])
+            self.ticks = [int(tick) for tick in rows['tick']]
+            self._table = rows['values']
+            return
+
+        self.ticks = []
+        self._values = array('d')
+        f.seek(offset)
+        for dump in xrange(self.num_dumps):
+            self.ticks.append(struct.unpack('<Q', f.read(8))[0])
+            self._values.fromfile(f, num_names)
+        f.close()
+
+def openStatsFile(filename):
+    """
+    Open a text or binary stats file.
+    """
+    f = open(filename, 'rb')
+    magic = f.read(len(BINARY_MAGIC))
+    f.close()
+
+    if magic == BINARY_MAGIC:
+        return BinaryStatsFile(filename)
+    return StatsFile(filename)